@@ -13,6 +13,35 @@ from Simulate_Poisson import Poissrnd
 class InvalidParameter(Exception): pass
 class IllegalSetting(Exception): pass
 
+# --------------------------------------------------------------------------
+##
+# @brief  the last points of a curve in a ring, indexed by time point like
+#         the full list, for simulations that hand the points on as they
+#         are computed
+# ----------------------------------------------------------------------------
+class History:
+    # --------------------------------------------------------------------------
+    ##
+    # @brief  make the ring
+    #
+    # @param size   points kept, more than any curve looks back
+    # @param ini    concen at the first time point
+    #
+    # --------------------------------------------------------------------------
+    def __init__(self, size, ini):
+        self.size   = size
+        self.values = [0] * size
+        self.values[0] = ini
+    def __getitem__(self, n):
+        # nothing was there before the first time point
+        if n < 0:
+            return 0
+        return self.values[n % self.size]
+    def __setitem__(self, n, value):
+        self.values[n % self.size] = value
+    def Points(self, start, end):
+        return [self[n] for n in xrange(start, end)]
+
 # --------------------------------------------------------------------------
 ##
 # @brief  calculating DNA simulation result
@@ -146,6 +175,7 @@ class DNA_Simulate:
 #
 # --------------------------------------------------------------------------
 class mRNA_Simulate:
+    Delay   = 40 # [Time-delay: 40s]
     Dt      = None
     TimeLen = None
     TimeDelay = None
@@ -173,17 +203,21 @@ class mRNA_Simulate:
             self.DNA = dna
         else:
             raise IllegalSetting
-    def IniConcen(self, isDelay, timelen, dt, ini):
+    # window: keep only that many points in a History
+    def IniConcen(self, isDelay, timelen, dt, ini, window = None):
         if timelen <= 0 or dt <= 0 or ini < 0:
             raise InvalidParameter
         self.Dt        = dt
         self.TimeLen   = timelen
-        self.Concen    = [0] * self.TimeLen
-        self.Concen[0] = ini
         if isDelay:
-            self.TimeDelay = int(ceil(40 / self.Dt)) # [Time-delay: 40s]
+            self.TimeDelay = int(ceil(self.Delay / self.Dt))
         else:
             self.TimeDelay = 1
+        if window:
+            self.Concen = History(window, ini)
+            return
+        self.Concen    = [0] * self.TimeLen
+        self.Concen[0] = ini
 
     def Compute_Concen(self, n, isStochastic = False):
         if self.DNA.Type == 'Constitutive':
@@ -269,6 +303,7 @@ self.DNA.LeakageRate) / (1 + Repressor) + self.Dt * self.DNA.CopyNumber * self.D
         #self.Concen[n] = self.Concen[n-1] + production - degradation
 
 class Protein_Simulate:
+    Delay     = 20 # [Time-delay: 20s]
     Dt        = None
     TimeLen   = None
     TimeDelay = None
@@ -279,17 +314,21 @@ class Protein_Simulate:
         if degrate < 0:
             raise InvalidParameter
         self.DegRate = degrate
-    def IniConcen(self, isDelay, timelen, dt, ini):
+    # window: keep only that many points in a History
+    def IniConcen(self, isDelay, timelen, dt, ini, window = None):
         if timelen <= 0 or dt <= 0 or ini < 0:
             raise InvalidParameter
         self.Dt        = dt
         self.TimeLen   = timelen
-        self.Concen    = [0] * self.TimeLen
-        self.Concen[0] = ini
         if isDelay:
-            self.TimeDelay = int(ceil(20 / self.Dt)) # [Time-delay: 20s]
+            self.TimeDelay = int(ceil(self.Delay / self.Dt))
         else:
             self.TimeDelay = 1
+        if window:
+            self.Concen = History(window, ini)
+            return
+        self.Concen    = [0] * self.TimeLen
+        self.Concen[0] = ini
 
     def Connect(self, mrna):
         if isinstance(mrna, mRNA_Simulate):
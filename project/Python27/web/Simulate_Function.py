@@ -10,11 +10,154 @@
 
 from math import floor
 from math import ceil
+from time import time as clock
 from Simulate_Class import InvalidParameter
 from Simulate_Class import IllegalSetting
 from Simulate_Class import DNA_Simulate
 from Simulate_Class import mRNA_Simulate
 from Simulate_Class import Protein_Simulate
+import mlog
+
+logging = mlog.logging
+
+# --------------------------------------------------------------------------
+##
+# @brief build the models of the proteins of a circuit
+#
+# @param isDelay   whether to simulate the transcription and translation delay
+# @param circuit   the gene circuit to simulate
+# @param corepind  the time to add corepressor and inducer
+# @param database  database instance
+# @param time      time period to simulate
+# @param dt        a time delta for two points in the curve
+# @param window    keep only the last window points of the curves, the
+#                  whole curves are kept when it is None
+#
+# @returns         dict with the models, the protein names and the number of
+#                  time points
+#
+# --------------------------------------------------------------------------
+def Prepare(isDelay, circuit, corepind, database, time, dt, window = None):
+    if time <=0 or dt <= 0:
+        raise InvalidParameter
+    timelen  = int(ceil(time / dt) + 1)
+    if window:
+        # the curves look back at each other by up to the longest delay
+        lookback = ceil(max(mRNA_Simulate.Delay, Protein_Simulate.Delay) / dt) if isDelay else 1
+        window = max(window, int(lookback) + 1)
+    operate  = {'grp_id':[], 'index':[]}
+    DNAdict  = {}
+    mRNAdict = {}
+    Prodict  = {}
+    dictkey  = []
+    pro_name = []
+    DegRate = 0.00288
+    for i in circuit["proteins"]:
+      if i not in corepind:
+        corepind[i] = {"time": 0}
+    plasid   = [x for sublist in circuit['plasmids'] for x in sublist]
+    # the number of proteins in a group
+    plassize = {}
+    plaspro  = {}
+    for n in range(len(plasid)):
+        plassize[plasid[n]] = int(len(circuit['groups'][plasid[n]]['sbol']) / 2 - 1)
+    for n in range(len(plasid)):
+        group      = circuit['groups'][plasid[n]]
+        promoter   = database.select_with_name('Promoter', group['sbol'][0]['name'])
+        terminator = database.select_with_name('terminator', group['sbol'][-1]['name'])
+        plaspro[plasid[n]] = []
+        for k in range(plassize[plasid[n]]):
+            rbs   = database.select_with_name('RBS', group['sbol'][2*k+1]['name'])
+            proid = group['sbol'][2*k+2]['id']
+            plaspro[plasid[n]].append(proid)
+            dictkey.append(proid)
+            pro_name.append(circuit['proteins'][proid]['name'])
+            DNAdict [proid] = DNA_Simulate()
+            mRNAdict[proid] = mRNA_Simulate()
+            Prodict [proid] = Protein_Simulate()
+            DNAdict [proid].SetData(ty = group['type'], copynumber = circuit['proteins'][proid]['copy'],
+                                    tspromoter = promoter['MPPromoter'], leakagerate = promoter['LeakageRate'],
+                                    tere = terminator['Efficiency'])
+            mRNAdict[proid].SetData(transle = rbs['MPRBS'], degrate = DegRate)
+            Prodict [proid].SetData(degrate = DegRate)
+            mRNAdict[proid].IniConcen(isDelay, timelen, dt, ini = 0, window = window)
+            Prodict [proid].IniConcen(isDelay, timelen, dt, ini = 0, window = window)
+            mRNAdict[proid].Connect(DNAdict [proid])
+            Prodict [proid].Connect(mRNAdict[proid])
+        if group['corep_ind_type'] == 'Corepressor' or group['corep_ind_type'] == 'Inducer':
+            operate['grp_id'].append(plasid[n])
+            print floor(corepind[plasid[n]]['time'] / dt)
+            operate['index'].append(floor(corepind[plasid[n]]['time'] / dt))
+    for n in range(len(dictkey)):
+        grpid = circuit['proteins'][dictkey[n]]['grp_id']
+        Type = circuit['groups'][grpid]['type']
+        iden = circuit['groups'][grpid]['from']
+        regulator = None
+        if iden in dictkey:
+            if Type == 'Positive':
+                activator = database.select_with_name('Activator', circuit['proteins'][iden]['name'])
+                regulator = activator
+                DNAdict[dictkey[n]].SetActivator(Prodict[iden], activator['K1'], activator['HillCoeff1'])
+            elif Type == 'Negative':
+                repressor = database.select_with_name('Repressor', circuit['proteins'][iden]['name'])
+                regulator = repressor
+                DNAdict[dictkey[n]].SetRepressor(Prodict[iden], repressor['K1'], repressor['HillCoeff1'])
+    return {'timelen': timelen, 'operate': operate, 'DNAdict': DNAdict,
+            'mRNAdict': mRNAdict, 'Prodict': Prodict, 'dictkey': dictkey,
+            'pro_name': pro_name, 'plassize': plassize, 'plaspro': plaspro}
+
+# --------------------------------------------------------------------------
+##
+# @brief compute the concentrations at one time point
+#
+# @param model         what Prepare returned
+# @param t             index of the time point
+# @param isStochastic  whether to add a stochastic optimization
+# @param circuit       the gene circuit to simulate
+# @param database      database instance
+#
+# --------------------------------------------------------------------------
+def Step(model, t, isStochastic, circuit, database):
+    operate  = model['operate']
+    DNAdict  = model['DNAdict']
+    mRNAdict = model['mRNAdict']
+    Prodict  = model['Prodict']
+    dictkey  = model['dictkey']
+    for n in range(len(operate['index'])):
+        if t != operate['index'][n]: continue
+        grpid = operate['grp_id'][n]
+        Type = circuit['groups'][grpid]['corep_ind_type']
+        print "grpid: %s" % grpid
+        promoter = circuit['groups'][grpid]['sbol'][0]['name']
+        prev_node = circuit['groups'][grpid]['from']
+        if prev_node != -1:
+            regulator = circuit['proteins'][prev_node]['name']
+        if Type == 'Corepressor':
+            #corepressor = database.select_with_name('Corepressor', circuit['groups'][grpid]['corep_ind'])
+            corepressor = database.find_cor_ind('Corepressed',\
+                regulator, promoter)
+            for k in range(model['plassize'][grpid]):
+                proid = model['plaspro'][grpid][k]
+                concen = circuit['proteins'][proid]['concen']
+                print "Concen: %f" % concen
+                K2 = corepressor['K2']
+                HillCoeff2 = corepressor['HillCoeff2']
+                DNAdict[proid].SetCorepressor(concen, K2, HillCoeff2)
+        elif Type == 'Inducer':
+            inducer = database.find_cor_ind('Induced',\
+                regulator, promoter)
+            print inducer
+            for k in range(model['plassize'][grpid]):
+                proid = model['plaspro'][grpid][k]
+                concen = circuit['proteins'][proid]['concen']
+                print "Concen: %f" % concen
+                K2 = inducer['K2']
+                HillCoeff2 = inducer['HillCoeff2']
+                DNAdict[proid].SetInducer(concen, K2, HillCoeff2)
+    if t == 0: return
+    for n in range(len(dictkey)):
+        mRNAdict[dictkey[n]].Compute_Concen(t, isStochastic)
+        Prodict [dictkey[n]].Compute_Concen(t, isStochastic)
 
 # --------------------------------------------------------------------------
 ##
@@ -33,110 +176,15 @@ from Simulate_Class import Protein_Simulate
 def Simulate(isStochastic, isDelay, circuit, corepind, database, time, dt):
     try:
         cnt = 0
-        if time <=0 or dt <= 0:
-            raise InvalidParameter
-        timelen  = int(ceil(time / dt) + 1)
-        timeaxis = [None] * timelen
-        operate  = {'grp_id':[], 'index':[]}
-        DNAdict  = {}
-        mRNAdict = {}
-        Prodict  = {}
-        dictkey  = []
-        pro_name = []
-        DegRate = 0.00288
-        for i in circuit["proteins"]:
-          if i not in corepind:
-            corepind[i] = {"time": 0}
-        plasid   = [x for sublist in circuit['plasmids'] for x in sublist]
-        # the number of proteins in a group
-        plassize = {}
-        plaspro  = {}
-        for n in range(len(plasid)):
-            plassize[plasid[n]] = int(len(circuit['groups'][plasid[n]]['sbol']) / 2 - 1)
-        for n in range(len(plasid)):
-            group      = circuit['groups'][plasid[n]]
-            promoter   = database.select_with_name('Promoter', group['sbol'][0]['name'])
-            terminator = database.select_with_name('terminator', group['sbol'][-1]['name'])
-            plaspro[plasid[n]] = []
-            for k in range(plassize[plasid[n]]):
-                rbs   = database.select_with_name('RBS', group['sbol'][2*k+1]['name'])
-                proid = group['sbol'][2*k+2]['id']
-                plaspro[plasid[n]].append(proid)
-                dictkey.append(proid)
-                pro_name.append(circuit['proteins'][proid]['name'])
-                DNAdict [proid] = DNA_Simulate()
-                mRNAdict[proid] = mRNA_Simulate()
-                Prodict [proid] = Protein_Simulate()
-                DNAdict [proid].SetData(ty = group['type'], copynumber = circuit['proteins'][proid]['copy'],
-                                        tspromoter = promoter['MPPromoter'], leakagerate = promoter['LeakageRate'],
-                                        tere = terminator['Efficiency'])
-                mRNAdict[proid].SetData(transle = rbs['MPRBS'], degrate = DegRate)
-                Prodict [proid].SetData(degrate = DegRate)
-                mRNAdict[proid].IniConcen(isDelay, timelen, dt, ini = 0)
-                Prodict [proid].IniConcen(isDelay, timelen, dt, ini = 0)
-                mRNAdict[proid].Connect(DNAdict [proid])
-                Prodict [proid].Connect(mRNAdict[proid])
-            if group['corep_ind_type'] == 'Corepressor' or group['corep_ind_type'] == 'Inducer':
-                operate['grp_id'].append(plasid[n])
-                print floor(corepind[plasid[n]]['time'] / dt)
-                operate['index'].append(floor(corepind[plasid[n]]['time'] / dt))
-        for n in range(len(dictkey)):
-            grpid = circuit['proteins'][dictkey[n]]['grp_id']
-            Type = circuit['groups'][grpid]['type']
-            iden = circuit['groups'][grpid]['from']
-            regulator = None
-            if iden in dictkey:
-                if Type == 'Positive':
-                    activator = database.select_with_name('Activator', circuit['proteins'][iden]['name'])
-                    regulator = activator
-                    DNAdict[dictkey[n]].SetActivator(Prodict[iden], activator['K1'], activator['HillCoeff1'])
-                elif Type == 'Negative':
-                    repressor = database.select_with_name('Repressor', circuit['proteins'][iden]['name'])
-                    regulator = repressor
-                    DNAdict[dictkey[n]].SetRepressor(Prodict[iden], repressor['K1'], repressor['HillCoeff1'])
-        for t in range(timelen):
-            for n in range(len(operate['index'])):
-                if t != operate['index'][n]: continue
-                grpid = operate['grp_id'][n]
-                Type = circuit['groups'][grpid]['corep_ind_type']
-                print "grpid: %s" % grpid
-                promoter = circuit['groups'][grpid]['sbol'][0]['name']
-                prev_node = circuit['groups'][grpid]['from']
-                if prev_node != -1:
-                    regulator = circuit['proteins'][prev_node]['name']
-                if Type == 'Corepressor':
-                    #corepressor = database.select_with_name('Corepressor', circuit['groups'][grpid]['corep_ind'])
-                    corepressor = database.find_cor_ind('Corepressed',\
-                        regulator, promoter)
-                    for k in range(plassize[grpid]):
-                        proid = plaspro[grpid][k]
-                        concen = circuit['proteins'][proid]['concen']
-                        print "Concen: %f" % concen
-                        K2 = corepressor['K2']
-                        HillCoeff2 = corepressor['HillCoeff2']
-                        DNAdict[proid].SetCorepressor(concen, K2, HillCoeff2)
-                elif Type == 'Inducer':
-                    inducer = database.find_cor_ind('Induced',\
-                        regulator, promoter)
-                    print inducer
-                    for k in range(plassize[grpid]):
-                        proid = plaspro[grpid][k]
-                        concen = circuit['proteins'][proid]['concen']
-                        print "Concen: %f" % concen
-                        K2 = inducer['K2']
-                        HillCoeff2 = inducer['HillCoeff2']
-                        DNAdict[proid].SetInducer(concen, K2, HillCoeff2)
-            timeaxis[t] = t * dt
-            if t == 0: continue
-            for n in range(len(dictkey)):
-                mRNAdict[dictkey[n]].Compute_Concen(t, isStochastic)
-                Prodict [dictkey[n]].Compute_Concen(t, isStochastic)
+        model = Prepare(isDelay, circuit, corepind, database, time, dt)
+        for t in range(model['timelen']):
+            Step(model, t, isStochastic, circuit, database)
         ret = {}
         data = {}
         ret['dt'] = dt
         ret['time'] = time
-        for n in range(len(dictkey)):
-            data[pro_name[n] + "," + str(cnt)] = Prodict[dictkey[n]].Concen
+        for n in range(len(model['dictkey'])):
+            data[model['pro_name'][n] + "," + str(cnt)] = model['Prodict'][model['dictkey'][n]].Concen
             cnt += 1
         for i in data:
           data[i] = [float('%0.3f'%x) for x in data[i]]
@@ -151,6 +199,74 @@ def Simulate(isStochastic, isDelay, circuit, corepind, database, time, dt):
     #except Exception as e:
         #return 'Something Unexpected Happened!'
 
+# --------------------------------------------------------------------------
+##
+# @brief Simulate the curve of protein concen in a time period and yield it
+#        in chunks while it is computed
+#
+# @param isStochastic  whether to add a stochastic optimization
+# @param circuit       the gene circuit to simulate
+# @param corepind      the time to add corepressor and inducer
+# @param database      database instance
+# @param time          time period to simulate
+# @param dt            a time delta for two points in the curve
+# @param chunk_steps   time points after which a chunk is yielded
+# @param interval      seconds after which a chunk is yielded even if it
+#                      has fewer points
+#
+# @returns             generator of chunks with their sequence number, the
+#                      index of their first point, dt and time like Simulate
+#                      and the points of every curve, keyed like the data
+#                      of Simulate, the last item has done set and the min,
+#                      max, mean and final value of every curve
+#
+#                      only the points of one chunk and the delays are kept,
+#                      memory does not grow with the time period
+#
+# --------------------------------------------------------------------------
+def Simulate_Stream(isStochastic, isDelay, circuit, corepind, database, time, dt,
+                    chunk_steps = 200, interval = 0.25):
+    chunk_steps = max(1, chunk_steps)
+    try:
+        model = Prepare(isDelay, circuit, corepind, database, time, dt,
+                        window = chunk_steps)
+    except IllegalSetting as e:
+        logging.warning("illegal setting %s" % e)
+        yield {'seq': 0, 'done': True, 'error': 'Illegal Setting!'}
+        return
+    keys = [model['pro_name'][n] + "," + str(n) for n in range(len(model['dictkey']))]
+    curves = [model['Prodict'][key].Concen for key in model['dictkey']]
+    # min, max, sum and last point of every curve so far
+    stats = [None] * len(keys)
+    seq = 0
+    start = 0
+    last = clock()
+    for t in range(model['timelen']):
+        Step(model, t, isStochastic, circuit, database)
+        if t + 1 - start < chunk_steps and t + 1 < model['timelen'] and\
+                clock() - last < interval:
+            continue
+        data = {}
+        for n in range(len(keys)):
+            points = curves[n].Points(start, t + 1)
+            data[keys[n]] = [float('%0.3f'%x) for x in points]
+            low, high, total, final = stats[n] or (points[0], points[0], 0, None)
+            stats[n] = (min(low, min(points)), max(high, max(points)),
+                        total + sum(points), points[-1])
+        yield {'seq': seq, 'start': start, 'dt': dt, 'time': time, 'data': data}
+        seq += 1
+        start = t + 1
+        last = clock()
+    summary = {}
+    for n in range(len(keys)):
+        low, high, total, final = stats[n]
+        summary[keys[n]] = {'min': float('%0.3f'%low),
+                            'max': float('%0.3f'%high),
+                            'mean': float('%0.3f'%(total / model['timelen'])),
+                            'final': float('%0.3f'%final)}
+    yield {'seq': seq, 'done': True, 'dt': dt, 'time': time,
+           'points': model['timelen'], 'summary': summary}
+
 if __name__ == "__main__":
 
     import database
@@ -0,0 +1,222 @@
+##
+# @file api_registry.py
+# @brief the table of the websocket apis, built once at import time, with
+#        the arguments every api takes and how long the apis run
+# @author SYSU-Software
+# @version 1.0
+# @date 2026-10-19
+# @copyright 2013 SYSU-Software. All rights reserved.
+# This project is released under MIT License.
+#
+# usage: class apis(object):
+#          @takes(name = value, Efficiency = number, page = optional(integer))
+#          def addATerminator(self, message): ...
+#        REGISTRY = Registry(apis)
+#        message = REGISTRY.validate(message)
+#
+
+import json
+import time
+from contextlib import contextmanager
+
+class InvalidRequest(ValueError):
+  pass
+
+class UnknownRequest(InvalidRequest):
+  pass
+
+# --------------------------------------------------------------------------
+##
+# @brief coercions of the argument values, each returns the value to pass
+#        on or raises ValueError or TypeError
+#
+# --------------------------------------------------------------------------
+def value(v):
+  return v
+
+def text(v):
+  if not isinstance(v, basestring):
+    raise TypeError("expected a string")
+  return v
+
+def number(v):
+  if isinstance(v, bool):
+    raise TypeError("expected a number")
+  # numbers sent as strings are taken, like string.atof did
+  return float(v)
+
+def integer(v):
+  if isinstance(v, bool):
+    raise TypeError("expected an integer")
+  if isinstance(v, float):
+    if not v.is_integer():
+      raise ValueError("expected an integer")
+    return int(v)
+  return int(v)
+
+def boolean(v):
+  # strict, 0 and 1 are numbers like everywhere else in the registry
+  if isinstance(v, bool):
+    return v
+  raise TypeError("expected true or false")
+
+def array(v):
+  if not isinstance(v, list):
+    raise TypeError("expected a list")
+  return v
+
+def obj(v):
+  if not isinstance(v, dict):
+    raise TypeError("expected an object")
+  return v
+
+def json_value(v):
+  # sent either as json text inside the message, like the pages always did,
+  # or as the value itself
+  if isinstance(v, basestring):
+    return json.loads(v)
+  return v
+
+def choice(*values):
+  def coerce(v):
+    if v not in values:
+      raise ValueError("expected one of %s" % ", ".join(values))
+    return v
+  return coerce
+
+class Field(object):
+  def __init__(self, coerce, required = True, default = None):
+    self.coerce = coerce
+    self.required = required
+    self.default = default
+
+# --------------------------------------------------------------------------
+##
+# @brief an argument that may be left out
+#
+# @param coerce   coercion of the value when it is given
+# @param default  value when it is left out or null, not coerced
+#
+# @returns   the Field
+#
+# --------------------------------------------------------------------------
+def optional(coerce, default = None):
+  return Field(coerce, False, default)
+
+# --------------------------------------------------------------------------
+##
+# @brief declare the arguments of an api, as coercions for the required
+#        ones and optional() fields for the others, arguments it does not
+#        declare are passed on untouched
+#
+# --------------------------------------------------------------------------
+def takes(**fields):
+  def declare(function):
+    function.schema = dict((name, f if isinstance(f, Field) else Field(f))
+        for name, f in fields.iteritems())
+    return function
+  return declare
+
+# --------------------------------------------------------------------------
+##
+# @brief  one api, its arguments and how long its calls took
+# ----------------------------------------------------------------------------
+class Handler(object):
+  def __init__(self, name, function):
+    self.name = name
+    self.function = function
+    self.schema = function.schema
+    self.calls = 0
+    self.errors = 0
+    self.seconds = 0.0
+    self.max_seconds = 0.0
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief check and coerce the arguments of a message
+  #
+  # @param message  the decoded message
+  #
+  # @returns   a copy of the message with the coerced arguments and the
+  #            defaults of the missing optional ones
+  #
+  # @throws InvalidRequest  naming the first bad argument
+  #
+  # --------------------------------------------------------------------------
+  def validate(self, message):
+    checked = dict(message)
+    for name, field in self.schema.iteritems():
+      if message.get(name) is None:
+        if field.required:
+          raise InvalidRequest("%s needs %s" % (self.name, name))
+        checked[name] = field.default
+        continue
+      try:
+        checked[name] = field.coerce(message[name])
+      except (ValueError, TypeError) as e:
+        raise InvalidRequest("%s of %s: %s" % (name, self.name, e))
+    return checked
+
+  @contextmanager
+  def timed(self):
+    start = time.time()
+    try:
+      yield
+    except BaseException:
+      self.errors += 1
+      raise
+    finally:
+      seconds = time.time() - start
+      self.calls += 1
+      self.seconds += seconds
+      self.max_seconds = max(self.max_seconds, seconds)
+
+  def stats(self):
+    return {"calls": self.calls, "errors": self.errors,
+        "mean_ms": 1000 * self.seconds / self.calls if self.calls else 0.0,
+        "max_ms": 1000 * self.max_seconds}
+
+# --------------------------------------------------------------------------
+##
+# @brief  the apis of a class that declared their arguments with takes(),
+#         methods without a declaration cannot be requested
+# ----------------------------------------------------------------------------
+class Registry(object):
+  def __init__(self, cls):
+    self.handlers = dict((name, Handler(name, f))
+        for name, f in vars(cls).iteritems() if hasattr(f, "schema"))
+
+  def __contains__(self, name):
+    return name in self.handlers
+
+  def __getitem__(self, name):
+    try:
+      return self.handlers[name]
+    except (KeyError, TypeError):
+      raise UnknownRequest("unknown request %s" % (name, ))
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief check a message before any work is done for it
+  #
+  # @param message  the decoded message
+  #
+  # @returns   the message with coerced arguments
+  #
+  # @throws InvalidRequest  for malformed messages and unknown requests
+  #
+  # --------------------------------------------------------------------------
+  def validate(self, message):
+    if not isinstance(message, dict):
+      raise InvalidRequest("a request is a json object")
+    return self[message.get("request")].validate(message)
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief get the calls, errors and mean and longest run of the apis that
+  #        have been called
+  #
+  # --------------------------------------------------------------------------
+  def stats(self):
+    return dict((name, handler.stats())
+        for name, handler in self.handlers.iteritems() if handler.calls)
@@ -11,10 +11,57 @@ import user
 import xmlParse
 import string
 from sharedFile import sharedFiles
+import part_index
+import part_store
+import part_search
+import sequence_search
+import similarity
+import dir_snapshot
+import json_cache
+import process_pool
+import wire_format
+import prefork
+import scheduler
+import argparse
+from gevent.pool import Pool
 
 sql = db.SqliteDatabase()
 
+# --------------------------------------------------------------------------
+##
+# @brief build the indexes before the server starts, called from main and
+#        not at import time, as windows imports this file again in every
+#        worker process it starts
+#
+# --------------------------------------------------------------------------
+def load_indexes():
+  # walk the biobrick corpus once, every part lookup afterwards is a dict get
+  part_index.default_index(cache = "part_index.json")
+  # compile the xml files that changed since the last start into the store
+  part_store.default_store("parts.store")
+  part_search.default_search()
+  sequence_search.default_index()
+  similarity.default_index()
+  dir_snapshot.default_snapshot()
+
+# --------------------------------------------------------------------------
+##
+# @brief load the part files added or changed since the indexes were built,
+#        the master calls it on HUP so the new workers are forked with them
+#
+# --------------------------------------------------------------------------
+def refresh_indexes():
+  index = part_index.refresh_index()
+  part_store.update_store(part_store.default_store().path, index)
+  part_store.reopen_store()
+  # the indexes of the store are built again when it changed
+  load_indexes()
+
 app = Flask(__name__)
+
+@app.teardown_request
+def releaseConnection(exception):
+	sql.release()
 	
 @app.route("/")
 def login():
@@ -109,13 +156,80 @@ def goToSimulation():
 def documentation():
   return render_template("html/index.html")
 
+@app.route("/part.json")
+def partJson():
+  path = request.args.get('path', '')
+  fields = [f for f in request.args.get('fields', '').split(',') if f]
+  root = os.path.join(part_index.BIOBRICK_ROOT, '')
+  if not os.path.abspath(path).startswith(root) or not os.path.isfile(path):
+    abort(404)
+  entry = json_cache.part_entry(path, fields)
+  etag = '"%x-%s"' % (int(entry.mtime * 1000), ','.join(fields))
+  if request.headers.get('If-None-Match') == etag:
+    return Response(status = 304, headers = {'ETag': etag})
+  headers = {'ETag': etag, 'Vary': 'Accept-Encoding',
+      'Cache-Control': 'no-cache'}
+  if 'gzip' in request.headers.get('Accept-Encoding', ''):
+    headers['Content-Encoding'] = 'gzip'
+    body = entry.gzip()
+  else:
+    body = entry.text
+  return Response(body, mimetype = 'application/json', headers = headers)
+
+@app.route("/health")
+def health():
+  # for load balancers and monitors, every worker answers for itself
+  status = {'pid': os.getpid(), 'scheduler': scheduler.SCHEDULER.stats()}
+  try:
+    sql.getCx().execute('SELECT 1').fetchone()
+    status['status'] = 'ok'
+  except Exception as e:
+    status['status'] = 'database: %s' % e
+  return Response(json.dumps(status), mimetype = 'application/json',
+      status = 200 if status['status'] == 'ok' else 503)
+
 @app.route("/ws")
 def webSocket():
   if request.environ.get('wsgi.websocket'):
-    handle_websocket(request.environ["wsgi.websocket"], sql)
+    ws = request.environ["wsgi.websocket"]
+    # the client picks json or msgpack and compression in the url
+    # the scheduler counts its quotas per connection, or per address for
+    # remote browsers
+    handle_websocket(ws, sql, wire_format.negotiate(request.args, ws),
+        scheduler.client_key(request.remote_addr, id(ws)))
   return
 
+# connections one server process handles at once, stopping it waits for them
+MAX_CONNECTIONS = 1000
+
+def make_server(listener):
+  return WSGIServer(listener, app, handler_class=WebSocketHandler,
+      spawn=Pool(MAX_CONNECTIONS))
+
 if __name__ == "__main__":
-    http_server = WSGIServer(('0.0.0.0',5000), app, handler_class=WebSocketHandler)
-    http_server.serve_forever()
+    parser = argparse.ArgumentParser(description = "serve the web pages")
+    parser.add_argument("--host", default = "0.0.0.0")
+    parser.add_argument("-p", "--port", type = int, default = 5000)
+    parser.add_argument("-w", "--workers", type = int, default = 1,
+        help = "server processes sharing the port, one on windows")
+    args = parser.parse_args()
+    load_indexes()
+    listener = prefork.listen((args.host, args.port))
+    if args.workers > 1 and prefork.can_fork():
+        # the login and the saved index must be the same in every worker
+        sql.shareState()
+        # every worker opens its own database connections
+        sql.pool.close_all()
+        def run(heartbeat):
+            # forked after the indexes are loaded, so every worker and its
+            # process pool start with them
+            process_pool.start(sql.URL,
+                close_fds = [listener.fileno(), heartbeat])
+            prefork.serve(make_server(listener), heartbeat)
+        prefork.Supervisor(run, args.workers, refresh_indexes).supervise()
+    else:
+        # the number of workers per api is process_pool.POOL_SIZES, forked
+        # with the indexes or, on windows, loading what they need themselves
+        process_pool.start(sql.URL, close_fds = [listener.fileno()])
+        prefork.serve(make_server(listener))
     # app.run(debug=True)
@@ -0,0 +1,270 @@
+##
+# @file bulk_import.py
+# @brief import part characterization rows from csv or json in batches
+# @author SYSU-Software
+# @version 1.0
+# @date 2026-10-19
+# @copyright 2013 SYSU-Software. All rights reserved.
+# This project is released under MIT License.
+#
+# usage: python web/bulk_import.py [-d igem.db] [-b 1000] [-s] table file
+#
+
+import csv
+import json
+import sys
+import argparse
+from itertools import islice
+
+# --------------------------------------------------------------------------
+##
+# @brief columns accepted for every importable table, each column is
+#        (name, type, min value, max value, required)
+#
+# --------------------------------------------------------------------------
+TABLE_COLUMNS = {
+  "promoter": [("Name", str, None, None, True),
+    ("Number", str, None, None, True),
+    ("MPPromoter", float, 0, None, True),
+    ("LeakageRate", float, 0, 1, True),
+    ("K1", float, 0, None, True),
+    ("Type", str, None, None, False),
+    ("Source", str, None, None, False),
+    ("PoPS", float, 0, None, True),
+    ("Cluster", str, None, None, False),
+    ("Repressor", str, None, None, False)],
+  "RBS": [("Name", str, None, None, True),
+    ("Number", str, None, None, True),
+    ("MPRBS", float, 0, None, True),
+    ("RIPS", float, 0, None, False),
+    ("Source", str, None, None, False)],
+  "terminator": [("Name", str, None, None, True),
+    ("Number", str, None, None, True),
+    ("Efficiency", float, 0, 1, True),
+    ("Source", str, None, None, False)],
+  "repressor": [("Name", str, None, None, True),
+    ("Number", str, None, None, True),
+    ("HillCoeff1", float, 0, None, True),
+    ("K1", float, 0, None, True)],
+  "activator": [("Name", str, None, None, True),
+    ("Number", str, None, None, True),
+    ("HillCoeff1", float, 0, None, True),
+    ("K1", float, 0, None, True),
+    ("K2", float, 0, None, False)],
+  "Inducer": [("Name", str, None, None, True),
+    ("Number", str, None, None, True),
+    ("HillCoeff2", int, 1, None, True),
+    ("K2", float, 0, None, True)],
+  "Corepressor": [("Name", str, None, None, True),
+    ("Number", str, None, None, True),
+    ("HillCoeff2", int, 1, None, True),
+    ("K2", float, 0, None, True)],
+  "plasmid_backbone": [("Name", str, None, None, True),
+    ("Number", str, None, None, True),
+    ("CopyNumber", float, 0, None, True)],
+  "Protein": [("Name", str, None, None, True),
+    ("Number", str, None, None, True),
+    ("DegRatemRNA", float, 0, None, True),
+    ("DegRatePro", float, 0, None, True)],
+  "relation": [("PromoterNumber", str, None, None, True),
+    ("ActRreType", str, None, None, True),
+    ("ActRreNumber", str, None, None, True),
+    ("ActRreName", str, None, None, False),
+    ("Cluster", str, None, None, False),
+    ("HillCoeff1", float, 0, None, False),
+    ("K1", float, 0, None, False),
+    ("IncCorType", str, None, None, False),
+    ("IncCorName", str, None, None, False),
+    ("HillCoeff2", float, 0, None, False),
+    ("K2", float, 0, None, False)],
+}
+
+# --------------------------------------------------------------------------
+##
+# @brief raised for a row that does not fit the table
+# ----------------------------------------------------------------------------
+class InvalidRow(Exception):
+  def __init__(self, line, reason):
+    Exception.__init__(self, "row %d: %s" % (line, reason))
+    self.line = line
+    self.reason = reason
+
+# --------------------------------------------------------------------------
+##
+# @brief read rows of a csv file, the first line names the columns
+#
+# @param fp  an opened file
+#
+# @returns   generator of dicts
+#
+# --------------------------------------------------------------------------
+def read_csv(fp):
+  for row in csv.DictReader(fp):
+    yield row
+
+# --------------------------------------------------------------------------
+##
+# @brief read rows of a json file, either one array of objects or one object
+#        per line (json lines), json lines are streamed
+#
+# @param fp  an opened file
+#
+# @returns   generator of dicts
+#
+# --------------------------------------------------------------------------
+def read_json(fp):
+  first = fp.read(1)
+  while first.isspace():
+    first = fp.read(1)
+  if first == "[":
+    for row in json.loads(first + fp.read()):
+      yield row
+    return
+  line = first + fp.readline()
+  while line:
+    if line.strip():
+      yield json.loads(line)
+    line = fp.readline()
+
+# --------------------------------------------------------------------------
+##
+# @brief check one row and convert its values to the column types
+#
+# @param table  table name
+# @param row    dict of column name to value
+# @param line   number of the row, for error messages
+#
+# @returns   tuple of values in the order of TABLE_COLUMNS[table]
+#
+# --------------------------------------------------------------------------
+def validate_row(table, row, line = 0):
+  values = []
+  for name, c_type, low, high, required in TABLE_COLUMNS[table]:
+    value = row.get(name)
+    if isinstance(value, basestring):
+      value = value.strip()
+    if value is None or value == "":
+      if required:
+        raise InvalidRow(line, "%s is missing" % name)
+      values.append(None)
+      continue
+    try:
+      if c_type is str:
+        value = value if isinstance(value, unicode) else str(value)\
+            .decode("utf-8")
+      else:
+        value = float(value)
+      if c_type is int:
+        if value != int(value):
+          raise ValueError(value)
+        value = int(value)
+    except (TypeError, ValueError, UnicodeDecodeError):
+      raise InvalidRow(line, "%s is not a %s: %r" % (name, c_type.__name__,
+        value))
+    if low is not None and value < low:
+      raise InvalidRow(line, "%s = %s is below %s" % (name, value, low))
+    if high is not None and value > high:
+      raise InvalidRow(line, "%s = %s is above %s" % (name, value, high))
+    values.append(value)
+  return tuple(values)
+
+# --------------------------------------------------------------------------
+##
+# @brief validate rows lazily, bad rows are either raised or recorded
+#
+# @param table         table name
+# @param rows          iterable of dicts
+# @param errors        list to record InvalidRow in, None to raise them
+#
+# @returns   generator of value tuples
+#
+# --------------------------------------------------------------------------
+def validated(table, rows, errors = None):
+  for line, row in enumerate(rows, 1):
+    try:
+      yield validate_row(table, row, line)
+    except InvalidRow as e:
+      if errors is None:
+        raise
+      errors.append(e)
+
+# --------------------------------------------------------------------------
+##
+# @brief import rows into a catalog table, every batch is written with one
+#        executemany, all of them in one transaction so readers see either
+#        none or all of the rows, without WAL (sqlite older than 3.7.0, as
+#        on windows) readers of the catalog wait for the import to commit
+#
+# @param db            database instance
+# @param table         table name, one of TABLE_COLUMNS
+# @param rows          iterable of dicts, e.g. read_csv(fp)
+# @param batch_size    rows per executemany
+# @param skip_invalid  skip bad rows instead of aborting the whole import
+#
+# @returns   report of the import
+#
+# --------------------------------------------------------------------------
+def import_rows(db, table, rows, batch_size = 1000, skip_invalid = False):
+  if table not in TABLE_COLUMNS:
+    raise ValueError("table %s can not be imported" % table)
+  columns = [c[0] for c in TABLE_COLUMNS[table]]
+  sql_cmd = "INSERT INTO [%s] (%s) VALUES (%s)" % (table,
+      ",".join(["[%s]" % c for c in columns]), ",".join("?" * len(columns)))
+  errors = [] if skip_invalid else None
+  values = validated(table, rows, errors)
+  inserted = 0
+  with db.pool.write_catalog() as cx:
+    while True:
+      batch = list(islice(values, batch_size))
+      if not batch:
+        break
+      cx.executemany(sql_cmd, batch)
+      inserted += len(batch)
+  db.logger.debug('bulk import %d rows into %s' % (inserted, table))
+  return {"table": table, "inserted": inserted,
+      "rejected": len(errors or []),
+      "errors": [str(e) for e in (errors or [])[:100]]}
+
+# --------------------------------------------------------------------------
+##
+# @brief import a csv or json file, the format is told by the extension
+#
+# @param db            database instance
+# @param table         table name
+# @param path          path to the file
+# @param batch_size    rows per executemany
+# @param skip_invalid  skip bad rows instead of aborting
+#
+# @returns   report of the import
+#
+# --------------------------------------------------------------------------
+def import_file(db, table, path, batch_size = 1000, skip_invalid = False):
+  fp = open(path, "rb")
+  try:
+    if path.lower().endswith((".json", ".jsonl")):
+      rows = read_json(fp)
+    else:
+      rows = read_csv(fp)
+    return import_rows(db, table, rows, batch_size, skip_invalid)
+  finally:
+    fp.close()
+
+if __name__ == "__main__":
+  import database
+  parser = argparse.ArgumentParser(description = "import part "
+      "characterization data into the catalog")
+  parser.add_argument("table", choices = sorted(TABLE_COLUMNS))
+  parser.add_argument("file", help = "csv with a header line, or json")
+  parser.add_argument("-d", "--database", default = "igem.db")
+  parser.add_argument("-b", "--batch-size", type = int, default = 1000)
+  parser.add_argument("-s", "--skip-invalid", action = "store_true",
+      help = "skip bad rows instead of aborting")
+  args = parser.parse_args()
+  db = database.SqliteDatabase(args.database)
+  try:
+    report = import_file(db, args.table, args.file, args.batch_size,
+        args.skip_invalid)
+  except InvalidRow as e:
+    print "import aborted, nothing written: %s" % e
+    sys.exit(1)
+  print json.dumps(report, indent = 2)
@@ -0,0 +1,141 @@
+##
+# @file change_log.py
+# @brief per-table change sequence numbers for cache invalidation
+# @author SYSU-Software
+# @version 1.0
+# @date 2026-10-19
+# @copyright 2013 SYSU-Software. All rights reserved.
+# This project is released under MIT License.
+#
+
+# every database keeps a row per table in change_seq, the triggers installed
+# by install() bump it on every insert, update and delete so the number only
+# ever grows
+TRIGGER_SQL = """
+CREATE TRIGGER IF NOT EXISTS [change_seq_%(table)s_%(event)s]
+AFTER %(event)s ON [%(table)s]
+BEGIN
+  UPDATE change_seq SET seq = seq + 1 WHERE tbl = '%(table)s';
+END
+"""
+
+# --------------------------------------------------------------------------
+##
+# @brief create change_seq and its triggers in a database if missing
+#
+# @param cx  connection to the database
+#
+# @returns   whether anything had to be created
+#
+# --------------------------------------------------------------------------
+def install(cx):
+  tables = [t[0] for t in cx.execute("""SELECT name FROM sqlite_master
+      WHERE type = 'table' AND name != 'change_seq'
+      AND name NOT LIKE 'sqlite_%'""")]
+  triggers = set([t[0] for t in cx.execute("""SELECT name FROM sqlite_master
+      WHERE type = 'trigger'""")])
+  wanted = ["change_seq_%s_%s" % (t, e) for t in tables
+      for e in ("INSERT", "UPDATE", "DELETE")]
+  if all(w in triggers for w in wanted):
+    return False
+  cx.execute("""CREATE TABLE IF NOT EXISTS change_seq (
+      tbl TEXT PRIMARY KEY, seq INTEGER NOT NULL DEFAULT 0)""")
+  for table in tables:
+    cx.execute("INSERT OR IGNORE INTO change_seq (tbl, seq) VALUES (?, 0)",
+        (table, ))
+    for event in ("INSERT", "UPDATE", "DELETE"):
+      cx.execute(TRIGGER_SQL % {"table": table, "event": event})
+  cx.commit()
+  return True
+
+# --------------------------------------------------------------------------
+##
+# @brief in-memory copy of the change sequence of every table
+#
+#        caches remember seq(table) when they fill and compare it later,
+#        or subscribe to be told which of their tables changed
+# ----------------------------------------------------------------------------
+class ChangeLog(object):
+  # --------------------------------------------------------------------------
+  ##
+  # @brief init an empty change log
+  #
+  # @param with_catalog  whether the connections have the catalog attached
+  #
+  # --------------------------------------------------------------------------
+  def __init__(self, with_catalog = True):
+    self.sql_cmd = "SELECT tbl, seq FROM main.change_seq"
+    if with_catalog:
+      self.sql_cmd += " UNION ALL SELECT tbl, seq FROM catalog.change_seq"
+    self.vector = {}
+    self.__subscribers = {}
+    self.__next_token = 0
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief get the change sequence of a table
+  #
+  # @param table  table name
+  #
+  # @returns   an integer that grows whenever the table changes
+  #
+  # --------------------------------------------------------------------------
+  def seq(self, table):
+    return self.vector.get(table, 0)
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief get the change sequences of several tables at once
+  #
+  # @param tables  table names
+  #
+  # @returns   tuple of sequences, compare it to tell if any table changed
+  #
+  # --------------------------------------------------------------------------
+  def version(self, tables):
+    return tuple([self.vector.get(t, 0) for t in tables])
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief call back when one of the tables changes
+  #
+  # @param tables    table names, None for every table
+  # @param callback  called with the set of changed tables it watches
+  #
+  # @returns   token for unsubscribe()
+  #
+  # --------------------------------------------------------------------------
+  def subscribe(self, tables, callback):
+    self.__next_token += 1
+    watched = None if tables is None else frozenset(tables)
+    self.__subscribers[self.__next_token] = (watched, callback)
+    return self.__next_token
+
+  def unsubscribe(self, token):
+    self.__subscribers.pop(token, None)
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief read the change sequences again and notify subscribers of every
+  #        table that moved, called by the pool after commits, a cache calls
+  #        it before it is used to see the commits of other processes too
+  #
+  # @param cx  a pooled connection with the catalog attached
+  #
+  # @returns   set of tables that changed
+  #
+  # --------------------------------------------------------------------------
+  def refresh(self, cx):
+    rows = cx.execute(self.sql_cmd).fetchall()
+    first = not self.vector
+    changed = set([t for t, s in rows if self.vector.get(t) != s])
+    if not changed:
+      return changed
+    self.vector = dict(rows)
+    if first:
+      return changed
+    for watched, callback in self.__subscribers.values():
+      hit = changed if watched is None else changed & watched
+      if hit:
+        callback(hit)
+    return changed
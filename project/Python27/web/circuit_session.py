@@ -0,0 +1,213 @@
+##
+# @file circuit_session.py
+# @brief keep the gene circuit of a page on the server and exchange json
+#        patches of it instead of the whole circuit
+# @author SYSU-Software
+# @version 1.0
+# @date 2026-10-19
+# @copyright 2013 SYSU-Software. All rights reserved.
+# This project is released under MIT License.
+#
+
+import copy
+import uuid
+from collections import OrderedDict
+
+# --------------------------------------------------------------------------
+##
+# @brief escape a key for a json pointer
+#
+# --------------------------------------------------------------------------
+def escape(key):
+  return unicode(key).replace(u"~", u"~0").replace(u"/", u"~1")
+
+def unescape(token):
+  return token.replace(u"~1", u"/").replace(u"~0", u"~")
+
+# --------------------------------------------------------------------------
+##
+# @brief get the json patch (RFC 6902, add, remove and replace) that turns
+#        one document into another, lists of the same length are compared
+#        item by item and other changed lists are replaced
+#
+# @param old   the document the client has
+# @param new   the document it should get
+# @param path  json pointer of the documents
+#
+# @returns   list of operations
+#
+# --------------------------------------------------------------------------
+def diff(old, new, path = u""):
+  ops = []
+  diff_into(ops, old, new, path)
+  return ops
+
+def diff_into(ops, old, new, path):
+  if isinstance(old, dict) and isinstance(new, dict):
+    for key in old:
+      if key not in new:
+        ops.append({u"op": u"remove", u"path": path + u"/" + escape(key)})
+    for key, value in new.iteritems():
+      if key not in old:
+        ops.append({u"op": u"add", u"path": path + u"/" + escape(key),
+          u"value": value})
+      else:
+        diff_into(ops, old[key], value, path + u"/" + escape(key))
+  elif isinstance(old, list) and isinstance(new, list) and\
+      len(old) == len(new):
+    for i in xrange(len(old)):
+      diff_into(ops, old[i], new[i], u"%s/%d" % (path, i))
+  elif old != new or isinstance(old, bool) != isinstance(new, bool):
+    ops.append({u"op": u"replace", u"path": path, u"value": new})
+
+class PatchError(ValueError):
+  pass
+
+# --------------------------------------------------------------------------
+##
+# @brief apply a json patch of add, remove and replace operations
+#
+# @param doc  the document, changed in place
+# @param ops  list of operations
+#
+# @returns   the patched document, a new one when the root was replaced
+#
+# @throws PatchError  for an operation that does not fit the document, the
+#                     operations before it have been applied
+#
+# --------------------------------------------------------------------------
+def apply_patch(doc, ops):
+  for op in ops:
+    try:
+      doc = apply_op(doc, op)
+    except PatchError:
+      raise
+    except (KeyError, IndexError, TypeError, ValueError, AttributeError) as e:
+      raise PatchError("cannot apply %r: %r" % (op, e))
+  return doc
+
+def apply_op(doc, op):
+  if op["path"] == "":
+    if op["op"] == "remove":
+      raise PatchError("cannot remove the whole document")
+    return op["value"]
+  if not op["path"].startswith("/"):
+    raise PatchError("bad path %s" % op["path"])
+  tokens = [unescape(t) for t in op["path"].split("/")[1:]]
+  parent = doc
+  for token in tokens[:-1]:
+    parent = parent[int(token) if isinstance(parent, list) else token]
+  key = tokens[-1]
+  if isinstance(parent, list):
+    index = len(parent) if key == "-" else int(key)
+    if not 0 <= index <= len(parent) - (op["op"] != "add"):
+      raise PatchError("index out of range in %s" % op["path"])
+    if op["op"] == "add":
+      parent.insert(index, op["value"])
+    elif op["op"] == "remove":
+      del parent[index]
+    elif op["op"] == "replace":
+      parent[index] = op["value"]
+    else:
+      raise PatchError("unsupported patch operation %s" % op["op"])
+  elif isinstance(parent, dict):
+    if op["op"] in ("add", "replace"):
+      if op["op"] == "replace" and key not in parent:
+        raise PatchError("no %s to replace" % op["path"])
+      parent[key] = op["value"]
+    elif op["op"] == "remove":
+      del parent[key]
+    else:
+      raise PatchError("unsupported patch operation %s" % op["op"])
+  else:
+    raise PatchError("%s is not in a list or an object" % op["path"])
+  return doc
+
+class VersionConflict(Exception):
+  pass
+
+# --------------------------------------------------------------------------
+##
+# @brief the circuit of one page and its version, which counts the updates
+# ----------------------------------------------------------------------------
+class CircuitSession(object):
+  def __init__(self, circuit):
+    self.id = uuid.uuid4().hex
+    self.circuit = circuit
+    self.version = 0
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief get a copy of the circuit with the edits of a client
+  #
+  # @param version  version the client edited
+  # @param patch    the edits, a json patch
+  #
+  # @returns   the edited copy
+  #
+  # @throws VersionConflict  when the session is at another version
+  # @throws PatchError       when the patch does not fit the circuit
+  #
+  # --------------------------------------------------------------------------
+  def edited(self, version, patch):
+    if version != self.version:
+      raise VersionConflict(self.version)
+    return apply_patch(copy.deepcopy(self.circuit), patch or [])
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief store the circuit an update computed from an edited copy
+  #
+  # @param version  version the edits were made on
+  # @param edited   the edited copy, as the client has it now
+  # @param circuit  the new circuit
+  #
+  # @returns   reply with the new version and the patch from the edited
+  #            copy to the new circuit
+  #
+  # --------------------------------------------------------------------------
+  def commit(self, version, edited, circuit):
+    if version != self.version:
+      # another update of the page finished first
+      raise VersionConflict(self.version)
+    self.circuit = circuit
+    self.version += 1
+    return {"session": self.id, "version": self.version,
+        "patch": diff(edited, circuit)}
+
+# --------------------------------------------------------------------------
+##
+# @brief  least recently used circuit sessions
+# ----------------------------------------------------------------------------
+class SessionStore(object):
+  def __init__(self, capacity = 256):
+    self.capacity = capacity
+    self.__sessions = OrderedDict()
+
+  def open(self, circuit):
+    session = CircuitSession(circuit)
+    self.__sessions[session.id] = session
+    while len(self.__sessions) > self.capacity:
+      self.__sessions.popitem(last = False)
+    return session
+
+  def get(self, session_id):
+    session = self.__sessions.pop(session_id, None)
+    if session is None:
+      raise KeyError("unknown circuit session %s" % session_id)
+    self.__sessions[session_id] = session
+    return session
+
+SESSIONS = SessionStore()
+
+# --------------------------------------------------------------------------
+##
+# @brief get a copy of the current circuit of a session
+#
+# @param session_id  id of the session
+#
+# @returns   the circuit
+#
+# --------------------------------------------------------------------------
+def current_circuit(session_id):
+  return copy.deepcopy(SESSIONS.get(session_id).circuit)
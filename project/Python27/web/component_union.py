@@ -9,7 +9,7 @@
 #
 
 import sys
-import xml.etree.ElementTree as ET
+import part_cache
 
 # --------------------------------------------------------------------------
 ##
@@ -73,9 +73,7 @@ class RFC21():
 #
 # --------------------------------------------------------------------------
 def get_part_type(xml_file):
-  t = ET.parse(xml_file)
-  path = "part_list/part/"
-  return t.find(path + "part_type").text
+  return part_cache.get_part(xml_file).type
 
 # --------------------------------------------------------------------------
 ##
@@ -90,25 +88,23 @@ def get_part_type(xml_file):
 def union(rule_name, file_list):
   rule = globals()[rule_name]()
   ret = []
-  path = "part_list/part/"
   current_pos = len(rule.prefix)
   first = True
 
   for xml_file in file_list:
     dna_component = {}
     sequence_annotation = {}
-    t = ET.parse(xml_file)
+    part = part_cache.get_part(xml_file)
 
     # get info for dna_component
-    dna_component["uri"] = t.find(path + "part_url").text
-    dna_component["displayId"] = t.find(path + "part_id").text
-    dna_component["name"] = t.find(path + "part_name").text
-    dna_component["description"] = t.find(path + "part_short_desc").text
-    dna_component["type"] = t.find(path + "part_type").text
+    dna_component["uri"] = part.url
+    dna_component["displayId"] = part.part_id
+    dna_component["name"] = part.name
+    dna_component["description"] = part.short_desc
+    dna_component["type"] = part.type
 
     # get info for sequence_annotation
-    sequence = t.find(path + "sequences/seq_data").text
-    sequence = filter(lambda x: x != '\n', sequence)
+    sequence = part.sequence
 
     if rule_name == "RFC10" and first and dna_component["type"] == "Coding":
       first = False
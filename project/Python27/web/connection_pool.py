@@ -0,0 +1,262 @@
+##
+# @file connection_pool.py
+# @brief hand out one sqlite3 connection per greenlet
+# @author SYSU-Software
+# @version 1.0
+# @date 2026-10-19
+# @copyright 2013 SYSU-Software. All rights reserved.
+# This project is released under MIT License.
+#
+
+import sqlite3
+import weakref
+import threading
+from contextlib import contextmanager
+
+try:
+  from greenlet import getcurrent
+  owner_map = weakref.WeakKeyDictionary
+except ImportError:
+  from thread import get_ident as getcurrent
+  owner_map = dict
+
+# sqlite features are only switched on when the linked library has them, the
+# sqlite3.dll shipped for windows is 3.6.21 which knows neither WAL nor mmap
+WAL_VERSION = (3, 7, 0)
+MMAP_VERSION = (3, 7, 17)
+
+CATALOG_WRITES = frozenset([sqlite3.SQLITE_INSERT, sqlite3.SQLITE_UPDATE,
+  sqlite3.SQLITE_DELETE, sqlite3.SQLITE_CREATE_TABLE,
+  sqlite3.SQLITE_CREATE_INDEX, sqlite3.SQLITE_DROP_TABLE,
+  sqlite3.SQLITE_DROP_INDEX, sqlite3.SQLITE_ALTER_TABLE])
+
+# --------------------------------------------------------------------------
+##
+# @brief a connection that keeps the attached catalog read-only outside of
+#        pool.write_catalog()
+# ----------------------------------------------------------------------------
+class PooledConnection(sqlite3.Connection):
+  pool = None
+  # depth of the pool.deferred_commit() blocks running on this connection,
+  # commits inside them wait for the outermost block to end
+  deferred = 0
+  # depth of the pool.write_catalog() blocks running on this connection
+  catalog_writes = 0
+
+  # authorizer of the connection, statements that would write the catalog
+  # are not even prepared outside of write_catalog()
+  def authorize(self, action, arg1, arg2, db_name, source):
+    if db_name == "catalog" and action in CATALOG_WRITES and\
+        not self.catalog_writes:
+      return sqlite3.SQLITE_DENY
+    return sqlite3.SQLITE_OK
+
+  def commit(self):
+    if self.deferred:
+      return
+    sqlite3.Connection.commit(self)
+    if self.pool is not None:
+      self.pool.notify(self)
+
+# --------------------------------------------------------------------------
+##
+# @brief  a pool of sqlite3 connections, every greenlet (or thread when
+#         greenlet is not installed) owns its own connection and cursor
+#         until it calls release()
+#
+#         the user database is the main schema, the catalog is attached as
+#         "catalog" so unqualified table names resolve to either of them
+# ----------------------------------------------------------------------------
+class ConnectionPool(object):
+  # --------------------------------------------------------------------------
+  ##
+  # @brief init the pool, no connection is opened until it is asked for
+  #
+  # @param path       path to the user database file
+  # @param catalog    path to the catalog database file, None for no catalog
+  # @param size       max number of idle connections kept for reuse
+  # @param timeout    seconds a writer waits for a lock before giving up
+  # @param mmap_size  bytes of the database file to memory map
+  #
+  # --------------------------------------------------------------------------
+  def __init__(self, path, catalog = None, size = 8, timeout = 30.0,
+      mmap_size = 64 << 20):
+    self.path = path
+    self.catalog = catalog
+    self.size = size
+    self.timeout = timeout
+    self.mmap_size = mmap_size
+    self.__idle = []
+    self.__owners = owner_map()
+    self.__lock = threading.Lock()
+    # called with a connection after commits, e.g. ChangeLog.refresh
+    self.listeners = []
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief open a new connection and tune it for concurrent access
+  #
+  # @returns   the new connection
+  #
+  # --------------------------------------------------------------------------
+  def open_connection(self):
+    cx = sqlite3.connect(self.path, timeout = self.timeout,
+        check_same_thread = False, factory = PooledConnection)
+    if sqlite3.sqlite_version_info >= WAL_VERSION:
+      # readers never wait for the writer in WAL mode, and NORMAL is
+      # durable enough there as the WAL is synced on checkpoint
+      cx.execute("PRAGMA journal_mode = WAL")
+      cx.execute("PRAGMA synchronous = NORMAL")
+    if sqlite3.sqlite_version_info >= MMAP_VERSION:
+      cx.execute("PRAGMA mmap_size = %d" % self.mmap_size)
+    cx.execute("PRAGMA temp_store = MEMORY")
+    if self.catalog is not None:
+      self.attach_catalog(cx)
+    cx.pool = self
+    # values read for the request that holds the connection, cleared when it
+    # gives the connection back
+    cx.request_cache = {}
+    return cx
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief attach the catalog, read-only until write_catalog() and memory
+  #        mapped when sqlite supports it, in WAL mode its readers never wait
+  #        for a catalog write, not even one of another process
+  #
+  #        the file is attached writable and kept read-only by the
+  #        authorizer, it is not opened immutable and new versions are not
+  #        published by swapping files: windows does not let a file sqlite
+  #        has open be replaced, and the other processes would keep reading
+  #        the old one
+  #
+  #        the sqlite3.dll shipped for windows (3.6.21) has no WAL, there the
+  #        catalog keeps its rollback journal and a write_catalog() block,
+  #        e.g. a bulk import, makes the catalog readers of every process
+  #        wait while it commits, or from the moment it outgrows the page
+  #        cache, for up to timeout seconds before they fail with "database
+  #        is locked"
+  #
+  # @param cx  the connection
+  #
+  # --------------------------------------------------------------------------
+  def attach_catalog(self, cx):
+    cx.execute("ATTACH DATABASE ? AS catalog", (self.catalog, ))
+    if sqlite3.sqlite_version_info >= WAL_VERSION:
+      cx.execute("PRAGMA catalog.journal_mode = WAL")
+    if sqlite3.sqlite_version_info >= MMAP_VERSION:
+      cx.execute("PRAGMA catalog.mmap_size = %d" % self.mmap_size)
+    cx.set_authorizer(cx.authorize)
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief get the (connection, cursor) pair of the current greenlet
+  #
+  # @returns   the pair, taken from the idle list or newly opened
+  #
+  # --------------------------------------------------------------------------
+  def acquire(self):
+    owner = getcurrent()
+    entry = self.__owners.get(owner)
+    if entry is not None:
+      return entry
+    with self.__lock:
+      cx = self.__idle.pop() if self.__idle else None
+    if cx is None:
+      cx = self.open_connection()
+    entry = (cx, cx.cursor())
+    self.__owners[owner] = entry
+    return entry
+
+  def notify(self, cx):
+    for listener in self.listeners:
+      listener(cx)
+
+  def connection(self):
+    return self.acquire()[0]
+
+  def cursor(self):
+    return self.acquire()[1]
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief give the connection of the current greenlet back to the pool,
+  #        anything it left uncommitted is rolled back
+  #
+  # --------------------------------------------------------------------------
+  def release(self):
+    entry = self.__owners.pop(getcurrent(), None)
+    if entry is None:
+      return
+    cx, cursor = entry
+    cursor.close()
+    cx.rollback()
+    cx.request_cache.clear()
+    with self.__lock:
+      if len(self.__idle) < self.size:
+        self.__idle.append(cx)
+        return
+    cx.close()
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief write to the catalog in place, in the transaction of the current
+  #        greenlet, it commits when the outermost deferred_commit() or
+  #        write_catalog() block ends and rolls back on an error, sqlite
+  #        locks the file against the writers of other processes
+  #
+  #        with pool.write_catalog() as cx:
+  #          cx.execute("INSERT INTO promoter ...")
+  #
+  # @returns   the connection of the greenlet, allowed to write the catalog
+  #
+  # --------------------------------------------------------------------------
+  @contextmanager
+  def write_catalog(self):
+    with self.deferred_commit() as cx:
+      cx.catalog_writes += 1
+      try:
+        yield cx
+      finally:
+        cx.catalog_writes -= 1
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief run several writes of the current greenlet as one transaction,
+  #        their commits are held back and done once when the block ends,
+  #        an error escaping the block rolls all of them back
+  #
+  #        with pool.deferred_commit():
+  #          db.addAUserPart(...)
+  #          db.saveUserData(...)
+  #
+  # @returns   the connection of the greenlet
+  #
+  # --------------------------------------------------------------------------
+  @contextmanager
+  def deferred_commit(self):
+    cx = self.connection()
+    cx.deferred += 1
+    try:
+      yield cx
+    except:
+      cx.deferred -= 1
+      if not cx.deferred:
+        cx.rollback()
+      raise
+    cx.deferred -= 1
+    cx.commit()
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief close every connection, used when the database object goes away
+  #
+  # --------------------------------------------------------------------------
+  def close_all(self):
+    with self.__lock:
+      idle, self.__idle = self.__idle, []
+    for cx, cursor in self.__owners.values():
+      idle.append(cx)
+    self.__owners.clear()
+    for cx in idle:
+      cx.close()
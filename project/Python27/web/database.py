@@ -15,17 +15,24 @@ import json
 import os, sys
 import logging
 import logging.handlers
+from connection_pool import ConnectionPool
+import storage
+from change_log import ChangeLog
 
 # --------------------------------------------------------------------------
 ##
 # @brief  the class that contain all the database control method
 # ----------------------------------------------------------------------------
-class SqliteDatabase:
+class SqliteDatabase(object):
 	URL=''
-	userId=-1
 	logger=None
 	encrypt=None
-	indexSave=None
+	pool=None
+	changes=None
+	# every greenlet gets its own connection and cursor from the pool, so
+	# queries of different users never share a cursor
+	__cx=property(lambda self: self.pool.connection())
+	__cursor=property(lambda self: self.pool.cursor())
 	# --------------------------------------------------------------------------
   ##
   # @brief     to get the database class's connection
@@ -37,10 +44,64 @@ class SqliteDatabase:
 		return self.__cx
 	def getCuror(self):
 		return self.__cursor
+	# --------------------------------------------------------------------------
+  ##
+  # @brief     give the connection of the current greenlet back to the pool
+  #
+  # --------------------------------------------------------------------------
+	def release(self):
+		if self.pool is not None:
+			self.pool.release()
+	# --------------------------------------------------------------------------
+  ##
+  # @brief     keep the login and the saved index in the user database from
+  #            now on, so every process of a pre-forked server sees them,
+  #            they start out empty
+  #
+  # --------------------------------------------------------------------------
+	def shareState(self):
+		self.__cursor.execute('CREATE TABLE IF NOT EXISTS server_state (name TEXT PRIMARY KEY, value TEXT)')
+		self.__cursor.execute('DELETE FROM server_state')
+		self.__cx.commit()
+		self.sharedState=True
+	sharedState=False
+	# a request reads a shared value once, it sees the changes of other
+	# processes from its next request on
+	def _getState(self,name,default):
+		if not self.sharedState:
+			return self.__dict__.get('_state_'+name,default)
+		cache=self.__cx.request_cache
+		if name not in cache:
+			self.__cursor.execute('SELECT value FROM server_state WHERE name=?',(name,))
+			row=self.__cursor.fetchone()
+			cache[name]=default if row is None else json.loads(row[0])
+		return cache[name]
+	def _setState(self,name,value):
+		if not self.sharedState:
+			self.__dict__['_state_'+name]=value
+			return
+		self.__cursor.execute('REPLACE INTO server_state (name,value) VALUES (?,?)',(name,json.dumps(value)))
+		self.__cx.commit()
+		self.__cx.request_cache[name]=value
+	# id of the logged in user, -1 for none
+	userId=property(lambda self: self._getState('userId',-1),
+		lambda self,value: self._setState('userId',value))
+	# the circuit the index page saved for the gene circuit page
+	indexSave=property(lambda self: self._getState('indexSave',None),
+		lambda self,value: self._setState('indexSave',value))
+	# --------------------------------------------------------------------------
+  ##
+  # @brief     run a write on the catalog, which is read-only otherwise
+  #
+  # @param sql_cmd  the sql to execute
+  #
+  # --------------------------------------------------------------------------
+	def writeCatalog(self,sql_cmd):
+		with self.pool.write_catalog() as cx:
+			cx.execute(sql_cmd)
 	def addAPromoter(self,name,number,MPPromoter,LeakageRate,K1,Type,Repressor,Source,Activator,PoPS):
 		sql_cmd='INSERT INTO promoter (Name,Number,MPPromoter,LeakageRate,K1,Type,Repressor,Source,Activator,PoPS) VALUES ("%s","%s",%f,%f,%f,"%s","%s","%s","%s",%f)'%(name,number,MPPromoter,LeakageRate,K1,Type,Repressor,Source,Activator,PoPS)		
-		self.__cursor.execute(sql_cmd)
-		self.__cx.commit()		
+		self.writeCatalog(sql_cmd)
 		return 'add promoter success!'
 	def addAUserPart(self,part_id,part_name,part_short_name,part_short_desc,part_type,part_nickname,part_author,sequence,Number,parts):
 		sql_cmd="INSERT INTO userPart (part_id,part_name,part_short_name,part_short_desc,part_type,part_nickname,part_author,sequence,uploadUser,Number,parts) VALUES ('%s','%s','%s','%s','%s','%s','%s','%s','%s','%s','%s')"%(part_id,part_name,part_short_name,part_short_desc,part_type,part_nickname,part_author,sequence,self.getUserNameById(self.userId),Number,parts)
@@ -49,28 +110,23 @@ class SqliteDatabase:
 		return 'add user part success!'
 	def addAplasmidBackbone(self,name,number,CopyNumber):
 		sql_cmd='INSERT INTO plasmid_backbone (Name,Number,CopyNumber) VALUES ("%s","%s",%d)'%(name,number,CopyNumber)
-		self.__cursor.execute(sql_cmd)
-		self.__cx.commit()	
+		self.writeCatalog(sql_cmd)
 		return 'add plasmidBackbone success!'
 	def addARBS(self,name,number,MPRBS,RIPS):
 		sql_cmd='INSERT INTO RBS (Name,Number,MPRBS,RIPS) VALUES ("%s","%s",%f,%f)'%(name,number,MPRBS,RIPS)
-		self.__cursor.execute(sql_cmd)
-		self.__cx.commit()
+		self.writeCatalog(sql_cmd)
 		return 'add RBS success!'
 	def addARepressor(self,name,number,HillCoeff1,K1,K2):
 		sql_cmd='INSERT INTO repressor (Name,Number,HillCoeff1,K1,K2) VALUES ("%s","%s",%d,%f,%f)'%(name,number,HillCoeff1,K1,K2)
-		self.__cursor.execute(sql_cmd)
-		self.__cx.commit()	
+		self.writeCatalog(sql_cmd)
 		return 'add Repressor success!'
 	def addATerminator(self,name,number,Efficiency):
 		sql_cmd='INSERT INTO terminator (Name,Number,Efficiency) VALUES ("%s","%s",%f)'%(name,number,Efficiency)
-		self.__cursor.execute(sql_cmd)
-		self.__cx.commit()	
+		self.writeCatalog(sql_cmd)
 		return 'add terminator success!'
 	def addAnInducer(self,name,number,HillCoeff2,K2):
 		sql_cmd='INSERT INTO Inducer (Name,Number,HillCoeff2,K2) VALUES ("%s","%s",%d,%f)'%(name,number,HillCoeff2,K2)
-		self.__cursor.execute(sql_cmd)
-		self.__cx.commit()	
+		self.writeCatalog(sql_cmd)
 		return 'add Inducer success!'
 	def updateUserLoginRememberTime(self):
 		if self.userId==-1:
@@ -98,14 +154,20 @@ class SqliteDatabase:
 	def __init__ (self,URL="igem.db"):
 		self.URL=URL
 		self._logFileInit()
-		if not self.isDatabaseExist(self.URL):
+		# URL is the seed database, the catalog and the user data are split
+		# from it into catalog.db and user.db next to it on the first start
+		paths=storage.prepare(self.URL)
+		if paths is None:
 			self.logger.error('database file not exist: %s'%self.URL)
 			return
 		else:
 			self.logger.debug('database file exist: %s'%self.URL)
-		self.__cx = sqlite3.connect(self.URL)
-		self.logger.debug('connect to database: %s'%self.URL)
-		self.__cursor = self.__cx.cursor()	
+		self.catalogURL,self.userURL=paths
+		self.pool = ConnectionPool(self.userURL,catalog=self.catalogURL)
+		# caches compare changes.seq(table) or subscribe to changes
+		self.changes = ChangeLog()
+		self.pool.listeners.append(self.changes.refresh)
+		self.logger.debug('connect to database: %s + %s'%(self.userURL,self.catalogURL))
 	
 	
 	"""
@@ -332,11 +394,14 @@ class SqliteDatabase:
 			sql_cmd = '''alter table %s add column %s %s;''' % (tableName,field, type)			
 		else:				
 			sql_cmd = '''alter table %s add column %s %s default %s;''' % (tableName,field, type,default)
+		if storage.is_catalog_table(tableName):
+			self.writeCatalog(sql_cmd)
+			return
 		self.__cursor.execute(sql_cmd)
 		self.__cx.commit()		
 	
 	def printAllTableNames(self):
-		result=self.__cursor.execute("select name from sqlite_master where type='table' order by name;")
+		result=self.__cursor.execute("select name from sqlite_master where type='table' union select name from catalog.sqlite_master where type='table' order by name;")
 		temp=''
 		for row in result.fetchall():
 			temp=temp+row[0]+','
@@ -800,8 +865,8 @@ class SqliteDatabase:
 			return False
 			
 	def __del__(self):
-		self.__cursor.close()
-		self.__cx.close()
+		if self.pool is not None:
+			self.pool.close_all()
 		self.logger.debug('database close')
 		self.logger.debug('')
 		
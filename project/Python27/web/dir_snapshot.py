@@ -0,0 +1,174 @@
+##
+# @file dir_snapshot.py
+# @brief cached listings of the biobrick folders for the part browser
+# @author SYSU-Software
+# @version 1.0
+# @date 2026-10-19
+# @copyright 2013 SYSU-Software. All rights reserved.
+# This project is released under MIT License.
+#
+
+import os
+from collections import OrderedDict
+import part_index
+import part_store
+
+# folders kept listed, the least recently used ones are listed again when
+# asked for
+MAX_FOLDERS = 1024
+
+# --------------------------------------------------------------------------
+##
+# @brief the listing of one folder as it was at a directory mtime
+# ----------------------------------------------------------------------------
+class Folder(object):
+  __slots__ = ("mtime", "version", "names", "entries")
+
+# --------------------------------------------------------------------------
+##
+# @brief  snapshot of a folder tree, a folder is only listed again when its
+#         mtime changed, which happens whenever a file is added, removed or
+#         renamed in it
+# ----------------------------------------------------------------------------
+class DirSnapshot(object):
+  # --------------------------------------------------------------------------
+  ##
+  # @brief list every folder under a root once
+  #
+  # @param root   the folder tree to snapshot
+  # @param store  PartStore giving the type and description of parts, None
+  #               for none
+  #
+  # --------------------------------------------------------------------------
+  def __init__(self, root = part_index.BIOBRICK_ROOT, store = None):
+    self.root = os.path.abspath(root)
+    self.store = store
+    self.folders = OrderedDict()
+    for path, dirs, files in os.walk(root):
+      self.folder(path)
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief tell whether a path is the root or lies under it
+  #
+  # --------------------------------------------------------------------------
+  def covers(self, path):
+    path = os.path.abspath(path)
+    return path == self.root or path.startswith(os.path.join(self.root, ""))
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief get the listing of a folder, listing it again if it changed
+  #
+  # @param path  path to the folder
+  #
+  # @returns   the Folder
+  #
+  # --------------------------------------------------------------------------
+  def folder(self, path):
+    key = os.path.abspath(path)
+    mtime = os.stat(key).st_mtime
+    folder = self.folders.pop(key, None)
+    if folder is not None and folder.mtime == mtime:
+      self.folders[key] = folder
+      return folder
+    folder = Folder()
+    folder.mtime = mtime
+    # the mtime in ms, it survives restarts, so clients may keep it
+    folder.version = int(mtime * 1000)
+    folder.names = [n for n in os.listdir(key)
+        if not part_index.is_merge_artifact(n)]
+    folder.entries = []
+    for name in folder.names:
+      entry = {"name": name}
+      if os.path.isdir(os.path.join(key, name)):
+        entry["type"] = "dir"
+      else:
+        entry["type"] = "file"
+        part = None
+        stem, ext = os.path.splitext(name)
+        if self.store is not None and ext == ".xml":
+          part = self.store.get(stem.encode("utf-8"))
+        if part is not None:
+          entry["part_type"] = part.type
+          entry["short_desc"] = part.short_desc
+      folder.entries.append(entry)
+    self.folders[key] = folder
+    while len(self.folders) > MAX_FOLDERS:
+      self.folders.popitem(last = False)
+    return folder
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief get the reply of getDirList for a folder
+  #
+  # @param path       path to the folder, as sent by the client
+  # @param version    version the client already has, None for none
+  # @param page       page number starting at 0, None for every entry
+  # @param page_size  entries per page
+  #
+  # @returns   dict with path, files and pathIsAFile like before, plus the
+  #            version and the entries with their child counts and part
+  #            metadata, or only notModified when the client is up to date,
+  #            with an error and no files for a folder that is not there or
+  #            not under the root
+  #
+  # --------------------------------------------------------------------------
+  def list_dir(self, path, version = None, page = None, page_size = 100):
+    if not self.covers(path) or not os.path.exists(path):
+      return {'path': path.replace('/', '\\'), 'files': [],
+          'pathIsAFile': 'false', 'error': 'no such folder'}
+    if os.path.isfile(path):
+      return {'path': path, 'files': '', 'pathIsAFile': 'true'}
+    folder = self.folder(path)
+    if version is not None and int(version) == folder.version:
+      return {'path': path.replace('/', '\\'), 'version': folder.version,
+          'notModified': True, 'pathIsAFile': 'false'}
+    names = folder.names
+    entries = folder.entries
+    if page is not None:
+      start = max(0, int(page)) * int(page_size)
+      names = names[start:start + int(page_size)]
+      entries = entries[start:start + int(page_size)]
+    files = [os.path.join(path, n).replace('/', '\\') for n in names]
+    replies = []
+    for entry in entries:
+      if entry["type"] == "dir":
+        entry = dict(entry)
+        entry["count"] = len(self.folder(os.path.join(path,
+          entry["name"])).names)
+      replies.append(entry)
+    return {'path': path.replace('/', '\\'), 'files': files,
+        'pathIsAFile': 'false', 'version': folder.version,
+        'total': len(folder.names), 'entries': replies}
+
+__default = []
+
+# --------------------------------------------------------------------------
+##
+# @brief get the snapshot of the biobrick folders, built on first use and
+#        again for a new store
+#
+# @returns   the shared DirSnapshot
+#
+# --------------------------------------------------------------------------
+def default_snapshot():
+  store = part_store.default_store()
+  if not __default or __default[0].store is not store:
+    __default[:] = [DirSnapshot(part_index.BIOBRICK_ROOT, store)]
+  return __default[0]
+
+# --------------------------------------------------------------------------
+##
+# @brief list a folder for getDirList
+#
+# @param path       path to the folder
+# @param version    version the client already has, None for none
+# @param page       page number starting at 0, None for every entry
+# @param page_size  entries per page
+#
+# @returns   the reply
+#
+# --------------------------------------------------------------------------
+def list_dir(path, version = None, page = None, page_size = 100):
+  return default_snapshot().list_dir(path, version, page, page_size)
@@ -1,17 +1,31 @@
 ##
 # @file export_database.py
-# @brief export database data to csv
+# @brief export database data to csv, json lines or a columnar binary file
 # @author Jianhong Li
 # @version 1.0
 # @date 2013-09-20
 # @copyright 2013 SYSU-Software. All rights reserved.
 # This project is released under MIT License.
 #
+# usage: python web/export_database.py [-f csv|jsonl|col] [-z] [-o dir] [db ...]
+#
 
-import subprocess
 import sqlite3
-import sys
 import os
+import csv
+import json
+import gzip
+import struct
+import argparse
+from multiprocessing.dummy import Pool
+import storage
+
+# rows fetched from the cursor at a time, memory use does not grow with the
+# size of a table
+BATCH_SIZE = 2000
+
+COLUMNAR_MAGIC = "IGEMCOL1"
+COL_NULL, COL_INT, COL_FLOAT, COL_TEXT = range(4)
 
 # --------------------------------------------------------------------------
 ##
@@ -27,8 +41,239 @@ def read_tables(db_path):
   c = a.cursor()
   c.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
   result = [x[0] for x in c.fetchall()]
+  a.close()
   return result
 
+# --------------------------------------------------------------------------
+##
+# @brief encode a value for the text formats
+#
+# --------------------------------------------------------------------------
+def to_text(value):
+  if isinstance(value, unicode):
+    return value.encode("utf-8")
+  if isinstance(value, buffer):
+    return str(value)
+  return value
+
+# --------------------------------------------------------------------------
+##
+# @brief write rows as csv with a header line
+# ----------------------------------------------------------------------------
+class CsvWriter():
+  extension = "csv"
+
+  def __init__(self, fp, columns):
+    self.writer = csv.writer(fp)
+    self.writer.writerow(columns)
+
+  def write(self, rows):
+    self.writer.writerows([[to_text(v) for v in row] for row in rows])
+
+  def close(self):
+    pass
+
+# --------------------------------------------------------------------------
+##
+# @brief write rows as json lines, one object per row
+# ----------------------------------------------------------------------------
+class JsonLinesWriter():
+  extension = "jsonl"
+
+  def __init__(self, fp, columns):
+    self.fp = fp
+    self.columns = columns
+
+  def write(self, rows):
+    lines = []
+    for row in rows:
+      obj = dict(zip(self.columns, [str(v) if isinstance(v, buffer) else v
+        for v in row]))
+      lines.append(json.dumps(obj) + "\n")
+    self.fp.write("".join(lines))
+
+  def close(self):
+    pass
+
+# --------------------------------------------------------------------------
+##
+# @brief write rows column by column in blocks of one batch each
+#
+#        file   := magic, uint32 column count, column names, blocks,
+#                  uint32 0
+#        name   := uint32 length, utf-8 bytes
+#        block  := uint32 row count, one column per column
+#        column := uint8 type, null bitmap (one bit per row), data
+#        data   := int64 or float64 little endian per row for COL_INT and
+#                  COL_FLOAT, uint32 lengths per row then the utf-8 bytes for
+#                  COL_TEXT, nothing for COL_NULL
+# ----------------------------------------------------------------------------
+class ColumnarWriter():
+  extension = "col"
+
+  def __init__(self, fp, columns):
+    self.fp = fp
+    fp.write(COLUMNAR_MAGIC)
+    fp.write(struct.pack("<I", len(columns)))
+    for name in columns:
+      name = to_text(name)
+      fp.write(struct.pack("<I", len(name)) + name)
+
+  def write(self, rows):
+    self.fp.write(struct.pack("<I", len(rows)))
+    for column in zip(*rows):
+      self.write_column(column)
+
+  def write_column(self, column):
+    nulls = bytearray((len(column) + 7) // 8)
+    kinds = set()
+    for i, v in enumerate(column):
+      if v is None:
+        nulls[i >> 3] |= 1 << (i & 7)
+      else:
+        kinds.add(type(v))
+    if not kinds:
+      self.fp.write(struct.pack("<B", COL_NULL) + str(nulls))
+      return
+    if kinds <= set([int, long]):
+      col_type, fmt, data = COL_INT, "q", [v or 0 for v in column]
+    elif kinds <= set([int, long, float]):
+      col_type, fmt, data = COL_FLOAT, "d", [v or 0.0 for v in column]
+    else:
+      col_type, fmt = COL_TEXT, "I"
+      # repr, str of a float keeps only 12 digits
+      values = ["" if v is None else to_text(v) if isinstance(v, (unicode,
+        buffer)) else repr(v) if isinstance(v, float) else str(v)
+        for v in column]
+      data = [len(v) for v in values]
+    self.fp.write(struct.pack("<B", col_type) + str(nulls))
+    self.fp.write(struct.pack("<%d%s" % (len(data), fmt), *data))
+    if col_type == COL_TEXT:
+      self.fp.write("".join(values))
+
+  def close(self):
+    self.fp.write(struct.pack("<I", 0))
+
+WRITERS = {"csv": CsvWriter, "jsonl": JsonLinesWriter, "col": ColumnarWriter}
+
+# --------------------------------------------------------------------------
+##
+# @brief read back a file written by ColumnarWriter
+#
+# @param fp  an opened file
+#
+# @returns   (column names, generator of row tuples)
+#
+# --------------------------------------------------------------------------
+def read_columnar(fp):
+  def read_struct(fmt):
+    return struct.unpack(fmt, fp.read(struct.calcsize(fmt)))[0]
+
+  if fp.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+    raise ValueError("not a columnar export")
+  columns = []
+  for i in xrange(read_struct("<I")):
+    columns.append(fp.read(read_struct("<I")).decode("utf-8"))
+
+  def rows():
+    while True:
+      count = read_struct("<I")
+      if count == 0:
+        return
+      block = []
+      for c in columns:
+        col_type = read_struct("<B")
+        nulls = bytearray(fp.read((count + 7) // 8))
+        if col_type == COL_NULL:
+          block.append([None] * count)
+          continue
+        fmt = "<%d%s" % (count, {COL_INT: "q", COL_FLOAT: "d",
+          COL_TEXT: "I"}[col_type])
+        data = struct.unpack(fmt, fp.read(struct.calcsize(fmt)))
+        if col_type == COL_TEXT:
+          data = [fp.read(n).decode("utf-8") for n in data]
+        block.append([None if nulls[i >> 3] & (1 << (i & 7)) else data[i]
+          for i in xrange(count)])
+      for row in zip(*block):
+        yield row
+  return columns, rows()
+
+# --------------------------------------------------------------------------
+##
+# @brief stream one table into a file, rows are read in batches
+#
+# @param db_path     path to sqlite database file
+# @param table       table name
+# @param out_dir     directory to write into
+# @param fmt         csv, jsonl or col
+# @param compress    gzip the file
+# @param batch_size  rows read from the cursor at a time
+#
+# @returns   (path of the file, number of rows)
+#
+# --------------------------------------------------------------------------
+def export_table(db_path, table, out_dir = "csv", fmt = "csv", compress = False,
+    batch_size = BATCH_SIZE):
+  writer_class = WRITERS[fmt]
+  file_name = os.path.join(out_dir, "%s.%s" % (table, writer_class.extension))
+  cx = sqlite3.connect(db_path)
+  try:
+    cursor = cx.execute("SELECT * FROM [%s]" % table)
+    columns = [d[0] for d in cursor.description]
+    if compress:
+      file_name += ".gz"
+      fp = gzip.open(file_name, "wb")
+    else:
+      fp = open(file_name, "wb")
+    try:
+      writer = writer_class(fp, columns)
+      count = 0
+      rows = cursor.fetchmany(batch_size)
+      while rows:
+        writer.write(rows)
+        count += len(rows)
+        rows = cursor.fetchmany(batch_size)
+      writer.close()
+    finally:
+      fp.close()
+  finally:
+    cx.close()
+  return file_name, count
+
+# --------------------------------------------------------------------------
+##
+# @brief export tables of one or more databases, tables are exported in
+#        parallel, each with its own connection, into a folder per database
+#        named after its file, as databases can share table names
+#
+# @param db_paths  paths to sqlite database files
+# @param out_dir   directory to write into
+# @param fmt       csv, jsonl or col
+# @param compress  gzip the files
+# @param workers   number of tables exported at once
+#
+# @returns   list of (path of the file, number of rows)
+#
+# --------------------------------------------------------------------------
+def export_all(db_paths, out_dir = "csv", fmt = "csv", compress = False,
+    workers = 4):
+  db_dirs = [os.path.join(out_dir,
+    os.path.splitext(os.path.basename(db_path))[0]) for db_path in db_paths]
+  if len(set(db_dirs)) != len(db_dirs):
+    raise ValueError("databases with the same file name: %s" %
+        ", ".join(db_paths))
+  jobs = []
+  for db_path, db_dir in zip(db_paths, db_dirs):
+    if not os.path.isdir(db_dir):
+      os.makedirs(db_dir)
+    jobs.extend((db_path, table, db_dir) for table in read_tables(db_path))
+  pool = Pool(max(1, min(workers, len(jobs))))
+  try:
+    return pool.map(lambda job: export_table(job[0], job[1], job[2], fmt,
+      compress), jobs)
+  finally:
+    pool.close()
+
 # --------------------------------------------------------------------------
 ##
 # @brief read all tables and export to csv
@@ -41,19 +286,28 @@ def read_tables(db_path):
 # --------------------------------------------------------------------------
 def export_csv(db_path, tables):
   try:
-    options = "-header -csv"
+    if not os.path.isdir("csv"):
+      os.makedirs("csv")
     for table in tables:
-      file_name = "csv/%s.csv" % table
-      sql_cmd = "SELECT * FROM %s;" % table
-      os.system("sqlite3 %s %s '%s' > %s"% (options, db_path, sql_cmd, file_name))
+      export_table(db_path, table, "csv", "csv")
     return True
   except Exception:
     return False
 
 if __name__ == "__main__":
-  try:
-    db_path = sys.argv[1]
-  except IndexError:
-    db_path = "igem.db"
-  tables = read_tables(db_path)
-  export_csv(db_path, tables)
+  parser = argparse.ArgumentParser(description = "export database tables")
+  parser.add_argument("db_path", nargs = "*",
+      help = "database files, catalog.db and user.db by default")
+  parser.add_argument("-f", "--format", choices = sorted(WRITERS),
+      default = "csv")
+  parser.add_argument("-z", "--gzip", action = "store_true")
+  parser.add_argument("-o", "--out-dir", default = "csv")
+  parser.add_argument("-j", "--jobs", type = int, default = 4)
+  args = parser.parse_args()
+  db_paths = args.db_path
+  if not db_paths:
+    db_paths = [p for p in storage.split_paths("igem.db") if os.path.exists(p)]
+    db_paths = db_paths or ["igem.db"]
+  for file_name, count in export_all(db_paths, args.out_dir, args.format,
+      args.gzip, args.jobs):
+    print "%s: %d rows" % (file_name, count)
@@ -14,6 +14,7 @@ import component_union
 import SteadyState_Rate
 import random
 import database
+import part_index
 from math import log10
 
 prom_name = "BBa_I712074"
@@ -112,9 +113,7 @@ def find_promoter(db, promoter_set, activator = None, repressor = None):
 #
 # --------------------------------------------------------------------------
 def find_file(name, path):
-    for root, dirs, files in os.walk(path):
-        if name in files:
-            return os.path.join(root, name)
+    return part_index.find_file(name, path)
 
 # --------------------------------------------------------------------------
 ##
@@ -69,159 +69,6 @@ def changeADictToStringThatCanUseBySql(dict={}):
 def turnStringDoubleQuoteToSingleQuote(oldStr):
 	return oldStr.replace("\"", "\'")
 
-# def convertRBSCsvToDatabase():
-# 	csvfile = file('C:\Users\Administrator\Desktop\IGEM\RBS.csv','rb')
-# 	reader = csv.reader(csvfile)
-# 	i=0
-# 	data={}
-# 	standard=[]
-# 	for line in reader:		
-# 		if(i==0):
-# 			standard=line
-# 		else:
-# 			data[i-1]={}
-# 			for j in range(len(standard)):
-# 				data[i-1][standard[j]]=line[j]			
-# 		i=i+1
-# 	csvfile.close()
-# 	cx = sqlite.connect('igem.db')
-# 	cu = cx.cursor()
-# 	for i in range(len(data)):
-# 		cu.execute('insert into RBS (Name,Number,MPRBS) values("%s","%s",%s)'%(data[i]['Name'],data[i]['Number'],data[i]['MPRBS']))
-# 	cx.commit()	
-# 	print cu.fetchall()
-# 	cu.close()
-# 	cx.close()
-
-# def convertrepressorCsvToDatabase():
-# 	csvfile = file('C:\Users\Administrator\Desktop\IGEM\\repressor.csv','rb')
-# 	reader = csv.reader(csvfile)
-# 	i=0
-# 	data={}
-# 	standard=[]
-# 	for line in reader:		
-# 		if(i==0):
-# 			standard=line
-# 		else:
-# 			data[i-1]={}
-# 			for j in range(len(standard)):
-# 				data[i-1][standard[j]]=line[j]			
-# 		i=i+1
-# 	csvfile.close()
-# 	cx = sqlite.connect('igem.db')
-# 	cu = cx.cursor()
-# 	for i in range(len(data)):
-# 		cu.execute('insert into repressor (Name,Number,HillCoeff1,K1,K2) values("%s","%s",%s,%s,%s)'%(data[i]['Name'],data[i]['Number'],data[i]['HillCoeff1'],data[i]['K1'],data[i]['K2']))
-# 	cx.commit()	
-# 	cu.execute("select * from repressor")
-# 	print cu.fetchall()
-# 	cu.close()
-# 	cx.close()
-
-# def convertterminatorCsvToDatabase():
-# 	csvfile = file('C:\Users\Administrator\Desktop\IGEM\\terminator.csv','rb')
-# 	reader = csv.reader(csvfile)
-# 	i=0
-# 	data={}
-# 	standard=[]
-# 	for line in reader:		
-# 		if(i==0):
-# 			standard=line
-# 		else:
-# 			data[i-1]={}
-# 			for j in range(len(standard)):
-# 				data[i-1][standard[j]]=line[j]			
-# 		i=i+1
-# 	csvfile.close()
-# 	cx = sqlite.connect('igem.db')
-# 	cu = cx.cursor()
-# 	for i in range(len(data)):
-# 		cu.execute('insert into terminator(Name,Number,Efficiency) values("%s","%s",%s)'%(data[i]['Name'],data[i]['Number'],data[i]['Efficiency']))
-# 	cx.commit()
-# 	cu.execute("select * from terminator")
-# 	print cu.fetchall()
-# 	cu.close()
-# 	cx.close()
-
-# def convertplasmid_backboneCsvToDatabase():
-# 	csvfile = file('C:\Users\Administrator\Desktop\IGEM\\plasmid_backbone_test.csv','rb')
-# 	reader = csv.reader(csvfile)
-# 	i=0
-# 	data={}
-# 	standard=[]
-# 	for line in reader:		
-# 		if(i==0):
-# 			standard=line
-# 		else:
-# 			data[i-1]={}
-# 			for j in range(len(standard)):
-# 				data[i-1][standard[j]]=line[j]			
-# 		i=i+1
-# 	csvfile.close()
-# 	cx = sqlite.connect('igem.db')
-# 	cu = cx.cursor()
-# 	for i in range(len(data)):
-# 		cu.execute('insert into plasmid_backbone(Name,Number,CopyNumber) values("%s","%s",%s)'%(data[i]['Name'],data[i]['Number'],data[i]['CopyNumber']))
-# 	cx.commit()
-# 	cu.execute("select * from plasmid_backbone")
-# 	print cu.fetchall()
-# 	cu.close()
-# 	cx.close()
-
-# def convertProteinCsvToDatabase():
-# 	csvfile = file('C:\Users\Administrator\Desktop\IGEM\\Protein_test.csv','rb')
-# 	reader = csv.reader(csvfile)
-# 	i=0
-# 	data={}
-# 	standard=[]
-# 	for line in reader:		
-# 		if(i==0):
-# 			standard=line
-# 		else:
-# 			data[i-1]={}
-# 			for j in range(len(standard)):
-# 				data[i-1][standard[j]]=line[j]			
-# 		i=i+1
-# 	csvfile.close()
-# 	cx = sqlite.connect('igem.db')
-# 	cu = cx.cursor()
-# 	for i in range(len(data)):
-# 		cu.execute('insert into Protein(Name,Number,DegRatemRNA, DegRatePro) values("%s","%s",%s,%s)'%(data[i]['Name'],data[i]['Number'],data[i]['DegRatemRNA'],data[i]['DegRatePro']))
-# 	cx.commit()
-# 	cu.execute("select * from plasmid_backbone")
-# 	print cu.fetchall()
-# 	cu.close()
-# 	cx.close()
-
-# def convertpromoterCsvToDatabase():
-# 	csvfile = file('C:\Users\Administrator\Desktop\IGEM\promoter_test.csv','rb')
-# 	reader = csv.reader(csvfile)
-# 	i=0
-# 	data={}
-# 	standard=[]
-# 	for line in reader:		
-# 		if(i==0):
-# 			standard=line
-# 		else:
-# 			data[i-1]={}
-# 			for j in range(len(standard)):
-# 				data[i-1][standard[j]]=line[j]
-# 			if (data[i-1]['Regulated'].lower()=='true'):
-# 				data[i-1]['Regulated']=1
-# 			elif(data[i-1]['Regulated'].lower()=='false'):
-# 				data[i-1]['Regulated']=0
-# 		i=i+1
-# 	csvfile.close()
-# 	cx = sqlite.connect('igem.db')
-# 	cu = cx.cursor()
-# 	for i in range(len(data)):
-# 		cu.execute('insert into promoter (Name,Number,MPPromoter,LeakageRate,K1,Regulated,Repressor,Source,Activator) values("%s","%s",%s,%s,%s,"%s","%s","%s","%s")'%(data[i]['Name'],data[i]['Number'],data[i]['MPPromoter'],data[i]['LeakageRate'],data[i]['K1'],data[i]['Regulated'],data[i]['Repressor'],data[i]['Source'],'null'))
-# 	cx.commit()
-# 	cu.execute("select * from promoter")
-# 	print cu.fetchall()
-# 	cu.close()
-# 	cx.close()
-
 # def createRandomDataInRBS():
 # 	csvfile = file('C:\Users\Administrator\Desktop\IGEM\RBS_test.csv', 'wb')
 # 	writer = csv.writer(csvfile)
@@ -325,16 +172,10 @@ def turnStringDoubleQuoteToSingleQuote(oldStr):
 
 if __name__=="__main__":
 	createRandomDataInrepressor()
-	#convertpromoterCsvToDatabase()
-	#convertRBSCsvToDatabase()
-	#convertrepressorCsvToDatabase()
-	#convertterminatorCsvToDatabase()
-	#convertplasmid_backboneCsvToDatabase()
 	#createRandomDataInRBS()
 	#createRandomDataInplasmid_backbone()
 	#createRandomDataInpromoter()
 	#createRandomDataInProtein()	#bioBrickGetpartshortname(r'G:\igem2013_sysu_oschina\project\Python27\web\biobrick\Protein coding sequences\Transcriptional regulators\BBa_C0071.xml')
 	#createRandomDataInProteinSpecial()
 	#createRandomDataInProtein()
-	#convertProteinCsvToDatabase()
 	#createExpression_valueTable()
\ No newline at end of file
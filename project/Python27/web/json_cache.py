@@ -0,0 +1,162 @@
+##
+# @file json_cache.py
+# @brief keep the json of part files encoded once and send it as raw bytes
+# @author SYSU-Software
+# @version 1.0
+# @date 2026-10-19
+# @copyright 2013 SYSU-Software. All rights reserved.
+# This project is released under MIT License.
+#
+
+import os
+import gzip
+import json
+from cStringIO import StringIO
+from collections import OrderedDict
+import xmlParse
+import part_extract
+
+# --------------------------------------------------------------------------
+##
+# @brief  a json value that is already encoded, handle_websocket puts it
+#         into the reply as it is instead of encoding it again
+# ----------------------------------------------------------------------------
+class RawJson(str):
+  pass
+
+# --------------------------------------------------------------------------
+##
+# @brief the encodings of the json of one part file
+# ----------------------------------------------------------------------------
+class Entry(object):
+  __slots__ = ("mtime", "text", "literal", "_gzip")
+
+  def __init__(self, mtime, text):
+    self.mtime = mtime
+    # the json of the part, and the json string holding it, which is how
+    # the websocket replies have always carried it
+    self.text = text
+    self.literal = RawJson(json.dumps(text))
+    self._gzip = None
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief get the json of the part gzipped, compressed on first use
+  #
+  # --------------------------------------------------------------------------
+  def gzip(self):
+    if self._gzip is None:
+      buf = StringIO()
+      fp = gzip.GzipFile(fileobj = buf, mode = "wb", mtime = 0)
+      fp.write(self.text)
+      fp.close()
+      self._gzip = buf.getvalue()
+    return self._gzip
+
+  def size(self):
+    return 100 + len(self.text) + len(self.literal) +\
+        len(self._gzip or "")
+
+# --------------------------------------------------------------------------
+##
+# @brief  least recently used cache of part json, keyed by the path and the
+#         requested fields and checked against the mtime of the file
+# ----------------------------------------------------------------------------
+class JsonCache(object):
+  # --------------------------------------------------------------------------
+  ##
+  # @brief init an empty cache
+  #
+  # @param budget  bytes of json to keep before evicting the oldest
+  #
+  # --------------------------------------------------------------------------
+  def __init__(self, budget = 32 << 20):
+    self.budget = budget
+    self.used = 0
+    self.hits = 0
+    self.misses = 0
+    self.__entries = OrderedDict()
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief get the json of a part file, encoded by build when it is not
+  #        cached or the file changed
+  #
+  # @param path    path to the part file, as the client sent it
+  # @param fields  requested fields, None for the whole file
+  # @param build   function returning the json text
+  #
+  # @returns   the Entry
+  #
+  # --------------------------------------------------------------------------
+  def get(self, path, fields, build):
+    key = (path, tuple(fields or ()))
+    mtime = os.stat(path).st_mtime
+    entry = self.__entries.pop(key, None)
+    if entry is not None and entry.mtime == mtime:
+      self.hits += 1
+      self.__entries[key] = entry
+      return entry
+    self.misses += 1
+    if entry is not None:
+      self.used -= entry.size()
+    entry = Entry(mtime, build())
+    self.__entries[key] = entry
+    self.used += entry.size()
+    while self.used > self.budget and len(self.__entries) > 1:
+      self.used -= self.__entries.popitem(last = False)[1].size()
+    return entry
+
+  def stats(self):
+    total = self.hits + self.misses
+    return {"hits": self.hits, "misses": self.misses,
+        "hit_rate": float(self.hits) / total if total else 0.0,
+        "entries": len(self.__entries), "bytes": self.used}
+
+# --------------------------------------------------------------------------
+##
+# @brief the cache shared by the websocket and the http routes
+#
+# --------------------------------------------------------------------------
+CACHE = JsonCache()
+
+# --------------------------------------------------------------------------
+##
+# @brief get the json of a part file, the whole file like xmlBiobrick or
+#        only the requested fields like part_extract
+#
+# @param path    path to the part file
+# @param fields  requested fields, None for the whole file
+#
+# @returns   the Entry
+#
+# --------------------------------------------------------------------------
+def part_entry(path, fields = None):
+  if fields:
+    build = lambda: part_extract.extract_json(path, fields)
+  else:
+    build = lambda: xmlParse.xmlBiobrick(path).getJsonString()
+  return CACHE.get(path, fields, build)
+
+# --------------------------------------------------------------------------
+##
+# @brief build a websocket reply, raw json results are spliced in as they
+#        are and everything else is encoded
+#
+# @param request     name of the request
+# @param result      result of the api
+# @param request_id  id the client gave the request, None for none
+#
+# @returns   the reply text
+#
+# --------------------------------------------------------------------------
+def envelope(request, result, request_id = None):
+  if isinstance(result, RawJson):
+    if request_id is None:
+      return '{"request": %s, "result": %s}' % (json.dumps(request), result)
+    return '{"request": %s, "id": %s, "result": %s}' % (json.dumps(request),
+        json.dumps(request_id), result)
+  reply = {'request': request, 'result': result}
+  if request_id is not None:
+    reply['id'] = request_id
+  return json.dumps(reply)
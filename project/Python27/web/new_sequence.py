@@ -1,11 +1,9 @@
 import component_union
-import os
-import xml.etree.ElementTree as ET
+import part_index
+import part_cache
 
 def find_file(name, path):
-  for root, dirs, files in os.walk(path):
-    if name in files:
-      return os.path.join(root, name)
+  return part_index.find_file(name, path)
 
 def get_new_part_sequence(component, rule = "RFC10"):
   content = []
@@ -13,11 +11,9 @@ def get_new_part_sequence(component, rule = "RFC10"):
     info = {}
     if component[i][0:3] == "BBa":
       xml_file = find_file(component[i] + ".xml", '.')
-      t = ET.parse(xml_file)
-      path = "part_list/part/"
-      dna_sequence = t.find(path+"sequences/seq_data").text[1:-1]
-      info["sequences"] = filter(lambda x: x != '\n', dna_sequence)
-      info["dna"] = {"type": t.find(path+"part_type").text}
+      part = part_cache.get_part(xml_file)
+      info["sequences"] = part.sequence
+      info["dna"] = {"type": part.type}
     else:
       info["sequences"] = component[i]
       info["dna"] = {"type": "Sequence"}
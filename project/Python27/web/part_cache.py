@@ -0,0 +1,140 @@
+##
+# @file part_cache.py
+# @brief cache the fields of parsed part xml files
+# @author SYSU-Software
+# @version 1.0
+# @date 2026-10-19
+# @copyright 2013 SYSU-Software. All rights reserved.
+# This project is released under MIT License.
+#
+
+import os
+from collections import OrderedDict
+import xml.etree.ElementTree as ET
+
+PART_PATH = "part_list/part/"
+
+# --------------------------------------------------------------------------
+##
+# @brief the fields of a part the sbol and sequence code needs, the sequence
+#        is kept as a byte string without line breaks
+# ----------------------------------------------------------------------------
+class PartRecord(object):
+  __slots__ = ("part_id", "name", "short_desc", "type", "url", "sequence")
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief read a record out of a part xml file
+  #
+  # @param xml_file  path to the xml file
+  #
+  # --------------------------------------------------------------------------
+  def __init__(self, xml_file):
+    t = ET.parse(xml_file)
+    self.part_id = t.find(PART_PATH + "part_id").text
+    self.name = t.find(PART_PATH + "part_name").text
+    self.short_desc = t.find(PART_PATH + "part_short_desc").text
+    self.type = t.find(PART_PATH + "part_type").text
+    self.url = t.find(PART_PATH + "part_url").text
+    sequence = t.find(PART_PATH + "sequences/seq_data").text or ""
+    self.sequence = str(sequence.replace("\n", ""))
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief roughly how many bytes the record holds
+  #
+  # --------------------------------------------------------------------------
+  def size(self):
+    return 200 + sum([len(getattr(self, f) or "") for f in self.__slots__])
+
+# --------------------------------------------------------------------------
+##
+# @brief  least recently used cache of PartRecord, keyed by path and checked
+#         against the mtime of the file on every get
+# ----------------------------------------------------------------------------
+class PartCache(object):
+  # --------------------------------------------------------------------------
+  ##
+  # @brief init an empty cache
+  #
+  # @param budget  bytes of records to keep before evicting the oldest
+  #
+  # --------------------------------------------------------------------------
+  def __init__(self, budget = 8 << 20):
+    self.budget = budget
+    self.used = 0
+    self.hits = 0
+    self.misses = 0
+    self.stale = 0
+    self.evictions = 0
+    self.__records = OrderedDict()
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief get the record of a part xml file, parsed only when it is not
+  #        cached or the file changed
+  #
+  # @param xml_file  path to the xml file
+  #
+  # @returns   the PartRecord
+  #
+  # --------------------------------------------------------------------------
+  def get(self, xml_file):
+    key = os.path.abspath(xml_file)
+    mtime = os.stat(key).st_mtime
+    entry = self.__records.pop(key, None)
+    if entry is not None and entry[0] == mtime:
+      self.hits += 1
+      self.__records[key] = entry
+      return entry[1]
+    if entry is None:
+      self.misses += 1
+    else:
+      self.stale += 1
+      self.used -= entry[1].size()
+    record = PartRecord(key)
+    self.__records[key] = (mtime, record)
+    self.used += record.size()
+    while self.used > self.budget and len(self.__records) > 1:
+      old_mtime, old_record = self.__records.popitem(last = False)[1]
+      self.used -= old_record.size()
+      self.evictions += 1
+    return record
+
+  def clear(self):
+    self.__records.clear()
+    self.used = 0
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief get counters of the cache
+  #
+  # @returns   dict with hits, misses, stale, evictions, hit_rate, records
+  #            and bytes
+  #
+  # --------------------------------------------------------------------------
+  def stats(self):
+    total = self.hits + self.misses + self.stale
+    return {"hits": self.hits, "misses": self.misses, "stale": self.stale,
+        "evictions": self.evictions,
+        "hit_rate": float(self.hits) / total if total else 0.0,
+        "records": len(self.__records), "bytes": self.used}
+
+# --------------------------------------------------------------------------
+##
+# @brief the cache shared by all modules
+#
+# --------------------------------------------------------------------------
+CACHE = PartCache()
+
+# --------------------------------------------------------------------------
+##
+# @brief get the record of a part xml file from the shared cache
+#
+# @param xml_file  path to the xml file
+#
+# @returns   the PartRecord
+#
+# --------------------------------------------------------------------------
+def get_part(xml_file):
+  return CACHE.get(xml_file)
@@ -0,0 +1,121 @@
+##
+# @file part_extract.py
+# @brief stream selected fields out of a part xml file
+# @author SYSU-Software
+# @version 1.0
+# @date 2026-10-19
+# @copyright 2013 SYSU-Software. All rights reserved.
+# This project is released under MIT License.
+#
+
+import json
+from collections import OrderedDict
+import xml.etree.ElementTree as ET
+
+# --------------------------------------------------------------------------
+##
+# @brief names of field sets clients can ask for, and the children of
+#        <part> each of them covers, any other name is taken as a tag
+#
+# --------------------------------------------------------------------------
+FIELD_SETS = {
+  "summary": ("part_id", "part_name", "part_short_name", "part_short_desc",
+    "part_type", "part_status", "part_results", "part_nickname",
+    "part_rating", "part_url", "part_entered", "part_author",
+    "best_quality"),
+  "sequence": ("sequences", ),
+  "features": ("features", ),
+  "subparts": ("deep_subparts", "specified_subparts", "specified_subscars"),
+  "parameters": ("parameters", ),
+  "categories": ("categories", ),
+  "twins": ("twins", ),
+}
+
+# depth of the children of <part> in rsbpml/part_list/part
+PART_DEPTH = 3
+
+# --------------------------------------------------------------------------
+##
+# @brief get the tags of the requested field sets
+#
+# @param fields  list of field set names or tags
+#
+# @returns   set of tags
+#
+# --------------------------------------------------------------------------
+def wanted_tags(fields):
+  tags = set()
+  for field in fields:
+    tags.update(FIELD_SETS.get(field, (field, )))
+  return tags
+
+# --------------------------------------------------------------------------
+##
+# @brief convert an element the way xmltodict does, empty elements become
+#        None, text is stripped and repeated tags become lists
+#
+# @param elem  the element
+#
+# @returns   None, the text or an OrderedDict
+#
+# --------------------------------------------------------------------------
+def to_dict(elem):
+  text = (elem.text or "").strip()
+  if not len(elem) and not elem.attrib:
+    return text or None
+  d = OrderedDict([("@" + k, v) for k, v in elem.attrib.items()])
+  for child in elem:
+    value = to_dict(child)
+    if child.tag not in d:
+      d[child.tag] = value
+    elif isinstance(d[child.tag], list):
+      d[child.tag].append(value)
+    else:
+      d[child.tag] = [d[child.tag], value]
+  if text:
+    d["#text"] = text
+  return d or None
+
+# --------------------------------------------------------------------------
+##
+# @brief read the requested children of <part>, the file is read as a
+#        stream, other children are dropped as soon as they end and the
+#        parser stops once every requested child was seen
+#
+# @param path    path to the part xml file
+# @param fields  list of field set names or tags
+#
+# @returns   dict shaped like the xmltodict tree, holding only the
+#            requested children of <part>
+#
+# --------------------------------------------------------------------------
+def extract(path, fields):
+  tags = wanted_tags(fields)
+  part = OrderedDict()
+  depth = 0
+  source = open(path, "rb")
+  try:
+    for event, elem in ET.iterparse(source, ("start", "end")):
+      if event == "start":
+        depth += 1
+        continue
+      depth -= 1
+      if depth != PART_DEPTH:
+        continue
+      if elem.tag in tags:
+        part[elem.tag] = to_dict(elem)
+        if len(part) == len(tags):
+          break
+      elem.clear()
+  finally:
+    source.close()
+  return {"rsbpml": {"part_list": {"part": part}}, "filepath": path}
+
+# --------------------------------------------------------------------------
+##
+# @brief get the requested fields of a part as a json string, like
+#        xmlBiobrick(path).getJsonString() does for the whole file
+#
+# --------------------------------------------------------------------------
+def extract_json(path, fields):
+  return json.dumps(extract(path, fields))
@@ -0,0 +1,224 @@
+##
+# @file part_index.py
+# @brief map part names to their xml files under web/biobrick
+# @author SYSU-Software
+# @version 1.0
+# @date 2026-10-19
+# @copyright 2013 SYSU-Software. All rights reserved.
+# This project is released under MIT License.
+#
+
+import os
+import re
+import json
+import storage
+
+# --------------------------------------------------------------------------
+##
+# @brief directory of the biobrick corpus, next to this file
+#
+# --------------------------------------------------------------------------
+BIOBRICK_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    "biobrick")
+
+# files left behind by merges, e.g. BBa_I12006.xml.orig or
+# BBa_I739102.xml.LOCAL.41939.xml, they must never be served as parts
+MERGE_ARTIFACT = re.compile(r"\.(orig|BACKUP|LOCAL|REMOTE)(\.|$)")
+
+# --------------------------------------------------------------------------
+##
+# @brief tell whether a file is a merge artifact
+#
+# @param name  file name
+#
+# @returns   True for artifacts
+#
+# --------------------------------------------------------------------------
+def is_merge_artifact(name):
+  return MERGE_ARTIFACT.search(name) is not None
+
+# --------------------------------------------------------------------------
+##
+# @brief file name to path index of a directory tree, built with one walk
+#        instead of one walk per lookup
+# ----------------------------------------------------------------------------
+class PartIndex(object):
+  # --------------------------------------------------------------------------
+  ##
+  # @brief build the index, or load it from a cache file when no directory
+  #        changed since it was written
+  #
+  # @param root   directory to index
+  # @param cache  path to the cache file, None to keep the index in memory
+  #
+  # --------------------------------------------------------------------------
+  def __init__(self, root = BIOBRICK_ROOT, cache = None):
+    self.root = os.path.abspath(root)
+    self.cache = cache
+    self.files = {}
+    self.dirs = {}
+    if not self.load():
+      self.build()
+      self.save()
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief walk the tree, the first file of a name wins like it did with
+  #        os.walk
+  #
+  # --------------------------------------------------------------------------
+  def build(self):
+    files = {}
+    dirs = {}
+    for root, dir_names, file_names in os.walk(self.root):
+      rel_root = os.path.relpath(root, self.root)
+      dirs[rel_root] = os.stat(root).st_mtime
+      for name in file_names:
+        if not is_merge_artifact(name):
+          files.setdefault(name, os.path.normpath(os.path.join(rel_root,
+            name)))
+    self.files = files
+    self.dirs = dirs
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief add a file written after the index was built
+  #
+  # @param path  path to the file, inside the root
+  #
+  # --------------------------------------------------------------------------
+  def add(self, path):
+    name = os.path.basename(path)
+    if is_merge_artifact(name):
+      return
+    rel_path = os.path.relpath(os.path.abspath(path), self.root)
+    self.files.setdefault(name, rel_path)
+    rel_root = os.path.dirname(rel_path) or "."
+    self.dirs[rel_root] = os.stat(os.path.join(self.root, rel_root)).st_mtime
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief read the cache file, it is only used when every indexed directory
+  #        still has the mtime it had, adding or removing a file changes the
+  #        mtime of its directory
+  #
+  # @returns   whether the cache was loaded
+  #
+  # --------------------------------------------------------------------------
+  def load(self):
+    if self.cache is None or not os.path.exists(self.cache):
+      return False
+    try:
+      with open(self.cache, "rb") as fp:
+        data = json.load(fp)
+      for rel_root, mtime in data["dirs"].iteritems():
+        if os.stat(os.path.join(self.root, rel_root)).st_mtime != mtime:
+          return False
+    except (OSError, ValueError, KeyError):
+      return False
+    self.files = data["files"]
+    self.dirs = data["dirs"]
+    return True
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief write the cache file if there is one
+  #
+  # --------------------------------------------------------------------------
+  def save(self):
+    if self.cache is None:
+      return
+    tmp_path = storage.staging_path(self.cache)
+    with open(tmp_path, "wb") as fp:
+      json.dump({"dirs": self.dirs, "files": self.files}, fp)
+    storage.replace_file(tmp_path, self.cache)
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief get the path of a file relative to the root
+  #
+  # @param name  file name, e.g. BBa_B0015.xml
+  #
+  # @returns   the relative path, None if it is not indexed
+  #
+  # --------------------------------------------------------------------------
+  def lookup(self, name):
+    return self.files.get(name)
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief get the path of a file the way os.walk(path) would have given it
+  #
+  # @param name  file name
+  # @param path  directory the caller searches from
+  #
+  # @returns   the path starting with path, None if it is not indexed
+  #
+  # --------------------------------------------------------------------------
+  def find(self, name, path):
+    rel_path = self.files.get(name)
+    if rel_path is None:
+      return None
+    prefix = os.path.relpath(self.root, os.path.abspath(path))
+    if prefix == ".":
+      return os.path.join(path, rel_path)
+    return os.path.join(path, prefix, rel_path)
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief tell whether a search from path covers the indexed tree
+  #
+  # @param path  directory the caller searches from
+  #
+  # @returns   True when path is the root or one of its parents
+  #
+  # --------------------------------------------------------------------------
+  def covers(self, path):
+    prefix = os.path.relpath(self.root, os.path.abspath(path))
+    return prefix != ".." and not prefix.startswith(".." + os.sep)
+
+__default = []
+
+# --------------------------------------------------------------------------
+##
+# @brief get the index of the biobrick corpus, built on first use
+#
+# @param cache  path to the cache file, only used by the first call
+#
+# @returns   the shared PartIndex
+#
+# --------------------------------------------------------------------------
+def default_index(cache = None):
+  if not __default:
+    __default.append(PartIndex(BIOBRICK_ROOT, cache))
+  return __default[0]
+
+# --------------------------------------------------------------------------
+##
+# @brief index the biobrick corpus again, with the cache of the first call,
+#        for files added or removed since it was built
+#
+# @returns   the new shared PartIndex
+#
+# --------------------------------------------------------------------------
+def refresh_index():
+  __default[:] = [PartIndex(BIOBRICK_ROOT, default_index().cache)]
+  return __default[0]
+
+# --------------------------------------------------------------------------
+##
+# @brief find a file by name, a drop-in for walking path with os.walk
+#
+# @param name  file name
+# @param path  directory to search
+#
+# @returns   the path to the file, None if there is none
+#
+# --------------------------------------------------------------------------
+def find_file(name, path = "."):
+  index = default_index()
+  if index.covers(path):
+    return index.find(name, path)
+  for root, dirs, files in os.walk(path):
+    if name in files and not is_merge_artifact(name):
+      return os.path.join(root, name)
@@ -0,0 +1,256 @@
+##
+# @file part_search.py
+# @brief trigram search over the names, descriptions and authors of parts
+# @author SYSU-Software
+# @version 1.0
+# @date 2026-10-19
+# @copyright 2013 SYSU-Software. All rights reserved.
+# This project is released under MIT License.
+#
+
+import re
+from collections import defaultdict
+import part_store
+
+# --------------------------------------------------------------------------
+##
+# @brief searched fields and their weight, a trigram found in several
+#        fields of a part counts with the highest weight, weights must fit
+#        in 3 bits
+#
+# --------------------------------------------------------------------------
+FIELD_WEIGHTS = (("name", 4), ("short_name", 4), ("nickname", 3),
+    ("short_desc", 2), ("author", 1), ("type", 1), ("category", 1))
+
+# share of the trigrams of a query a part must contain to be a result
+MIN_MATCH = 0.6
+
+NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+# --------------------------------------------------------------------------
+##
+# @brief lower case a text and turn everything but letters and digits into
+#        single spaces
+#
+# --------------------------------------------------------------------------
+def normalize(text):
+  return NON_WORD.sub(" ", (text or "").lower()).strip()
+
+# --------------------------------------------------------------------------
+##
+# @brief get the trigrams of a text, every word is padded with a space on
+#        both sides so words of one or two letters have trigrams as well
+#
+# @param text  normalized text
+#
+# @returns   set of trigrams
+#
+# --------------------------------------------------------------------------
+def trigrams(text):
+  grams = set()
+  for word in text.split():
+    word = " %s " % word
+    for i in xrange(len(word) - 2):
+      grams.add(word[i:i + 3])
+  return grams
+
+# --------------------------------------------------------------------------
+##
+# @brief  keeps a copy of the userPart rows and tells which of them were
+#         added or removed since the last look, the table is only read
+#         again after the change log said it changed
+# ----------------------------------------------------------------------------
+class UserPartSync(object):
+  COLUMNS = ("part_id", "part_name", "part_short_name", "part_short_desc",
+      "part_nickname", "part_author", "part_type", "sequence", "uploadUser")
+
+  def __init__(self):
+    self.subscribed = False
+    self.stale = True
+    self.rows = {}
+
+  def invalidate(self, tables):
+    self.stale = True
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief compare userPart with the copy
+  #
+  # @param db  database instance
+  #
+  # @returns   (list of added rows as dicts with the rowid, list of removed
+  #            rows), an updated row is reported as removed and added
+  #
+  # --------------------------------------------------------------------------
+  def changes(self, db):
+    if not self.subscribed:
+      db.changes.subscribe(["userPart"], self.invalidate)
+      self.subscribed = True
+    # commits of this process refresh the change log when they are made,
+    # those of the other server processes are seen here
+    db.changes.refresh(db.pool.connection())
+    if not self.stale:
+      return [], []
+    # a change made while reading is not lost, it sets stale again
+    self.stale = False
+    rows = {}
+    try:
+      for row in db.pool.connection().execute("SELECT rowid, %s FROM "
+          "userPart" % ", ".join(self.COLUMNS)):
+        rows[row[0]] = dict(zip(("rowid", ) + self.COLUMNS, row))
+    except:
+      self.stale = True
+      raise
+    added = [r for i, r in rows.iteritems() if self.rows.get(i) != r]
+    removed = [r for i, r in self.rows.iteritems() if rows.get(i) != r]
+    self.rows = rows
+    return added, removed
+
+# --------------------------------------------------------------------------
+##
+# @brief  in-memory trigram index of the parts in the part store and the
+#         parts uploaded by users
+# ----------------------------------------------------------------------------
+class PartSearch(object):
+  # --------------------------------------------------------------------------
+  ##
+  # @brief index every part of a store
+  #
+  # @param store  PartStore
+  #
+  # --------------------------------------------------------------------------
+  def __init__(self, store):
+    self.store = store
+    self.docs = []
+    # trigram -> list of doc id << 3 | weight
+    self.postings = defaultdict(list)
+    self.deleted = set()
+    self.user_docs = {}
+    self.user_sync = UserPartSync()
+    for part in store:
+      result = part.fields()
+      result["path"] = part.client_path()
+      result["source"] = "biobrick"
+      self.add(result)
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief add a document to the index
+  #
+  # @param result  dict with the fields of FIELD_WEIGHTS, returned as it is
+  #                when the document is found
+  #
+  # @returns   the id of the document
+  #
+  # --------------------------------------------------------------------------
+  def add(self, result):
+    doc_id = len(self.docs)
+    grams = {}
+    for field, weight in FIELD_WEIGHTS:
+      for gram in trigrams(normalize(result.get(field))):
+        if grams.get(gram, 0) < weight:
+          grams[gram] = weight
+    for gram, weight in grams.iteritems():
+      self.postings[gram].append(doc_id << 3 | weight)
+    self.docs.append((result, normalize(result.get("name")),
+      " ".join([normalize(result.get(f)) for f, w in FIELD_WEIGHTS])))
+    return doc_id
+
+  def remove(self, doc_id):
+    self.deleted.add(doc_id)
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief index the userPart rows that changed since the last search
+  #
+  # @param db  database instance
+  #
+  # --------------------------------------------------------------------------
+  def sync_user_parts(self, db):
+    added, removed = self.user_sync.changes(db)
+    for row in removed:
+      self.remove(self.user_docs.pop(row["rowid"]))
+    for row in added:
+      self.user_docs[row["rowid"]] = self.add({"part_id": row["part_id"],
+        "name": row["part_name"], "short_name": row["part_short_name"],
+        "short_desc": row["part_short_desc"],
+        "nickname": row["part_nickname"], "author": row["part_author"],
+        "type": row["part_type"], "category": "user",
+        "source": "user"})
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief find parts, ranked by how many trigrams of the query they hold
+  #        and in which fields, parts containing the whole query rank first
+  #
+  # @param query      search text
+  # @param page       page number, starting at 0
+  # @param page_size  results per page
+  #
+  # @returns   dict with the total number of results and one page of them
+  #
+  # --------------------------------------------------------------------------
+  def search(self, query, page = 0, page_size = 20):
+    text = normalize(query)
+    grams = trigrams(text)
+    scores = defaultdict(int)
+    matches = defaultdict(int)
+    for gram in grams:
+      for posting in self.postings.get(gram, ()):
+        scores[posting >> 3] += posting & 7
+        matches[posting >> 3] += 1
+    need = MIN_MATCH * len(grams)
+    ranked = []
+    for doc_id, count in matches.iteritems():
+      if count < need or doc_id in self.deleted:
+        continue
+      result, name, everything = self.docs[doc_id]
+      score = float(scores[doc_id]) / len(grams)
+      if text in name:
+        score += 10
+      elif text in everything:
+        score += 5
+      ranked.append((-score, name, doc_id))
+    ranked.sort()
+    start = page * page_size
+    results = []
+    for score, name, doc_id in ranked[start:start + page_size]:
+      result = dict(self.docs[doc_id][0])
+      result["score"] = round(-score, 3)
+      results.append(result)
+    return {"query": query, "total": len(ranked), "page": page,
+        "page_size": page_size, "results": results}
+
+__default = []
+
+# --------------------------------------------------------------------------
+##
+# @brief get the search index of the part store, built on first use and
+#        again for a new store
+#
+# @returns   the shared PartSearch
+#
+# --------------------------------------------------------------------------
+def default_search():
+  store = part_store.default_store()
+  if not __default or __default[0].store is not store:
+    __default[:] = [PartSearch(store)]
+  return __default[0]
+
+# --------------------------------------------------------------------------
+##
+# @brief search the biobrick parts and the parts of users
+#
+# @param db         database instance
+# @param query      search text
+# @param page       page number, starting at 0
+# @param page_size  results per page, at most 100
+#
+# @returns   dict with the total number of results and one page of them
+#
+# --------------------------------------------------------------------------
+def search_parts(db, query, page = 0, page_size = 20):
+  index = default_search()
+  index.sync_user_parts(db)
+  page_size = max(1, min(int(page_size), 100))
+  return index.search(query, max(0, int(page)), page_size)
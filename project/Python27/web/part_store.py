@@ -0,0 +1,425 @@
+##
+# @file part_store.py
+# @brief compile the biobrick xml corpus into one packed, memory mapped file
+# @author SYSU-Software
+# @version 1.0
+# @date 2026-10-19
+# @copyright 2013 SYSU-Software. All rights reserved.
+# This project is released under MIT License.
+#
+# usage: python web/part_store.py [-o parts.store] [--full]
+#
+
+import os
+import mmap
+import time
+import struct
+import bisect
+import argparse
+import xml.etree.ElementTree as ET
+import part_index
+import storage
+
+# --------------------------------------------------------------------------
+##
+# @brief layout of the store, all numbers are little endian
+#
+#        file    := header, index, records, strings
+#        header  := magic, uint32 part count, uint32 string count,
+#                   uint32 offset of the strings
+#        index   := one entry per part sorted by name,
+#                   char[32] name, uint32 record offset, uint32 record length
+#        record  := uint32 string id per field of FIELDS, float64 mtime and
+#                   uint32 size of the xml file, sequence
+#        sequence:= uint32 length, uint32 exception count,
+#                   (uint32 position, char) per exception, 2 bits per base
+#        strings := uint32 offset per string plus one for the end, the
+#                   utf-8 bytes of all strings
+#
+#        every string is stored once, bases other than a, c, g and t are
+#        kept as exceptions
+#
+# --------------------------------------------------------------------------
+MAGIC = "IGEMPRT1"
+HEADER = struct.Struct("<8sIII")
+INDEX_ENTRY = struct.Struct("<32sII")
+SEQUENCE_HEADER = struct.Struct("<II")
+EXCEPTION = struct.Struct("<Ic")
+NAME_WIDTH = 32
+NO_STRING = 0xffffffff
+
+# fields of a record, category is the folder of the part under biobrick
+FIELDS = ("part_id", "name", "short_name", "short_desc", "nickname", "author",
+    "type", "url", "category")
+RECORD_HEAD = struct.Struct("<%dIdI" % len(FIELDS))
+
+BASES = "acgt"
+BASE_CODE = dict((b, i) for i, b in enumerate(BASES))
+# a packed byte holds 4 bases, first base in the lowest bits
+UNPACK_TABLE = ["".join([BASES[(byte >> (2 * i)) & 3] for i in range(4)])
+    for byte in range(256)]
+
+# --------------------------------------------------------------------------
+##
+# @brief pack a sequence 4 bases per byte
+#
+# @param sequence  dna sequence
+#
+# @returns   the packed sequence with its header and exceptions
+#
+# --------------------------------------------------------------------------
+def pack_sequence(sequence):
+  exceptions = []
+  packed = bytearray((len(sequence) + 3) // 4)
+  for i, base in enumerate(sequence):
+    code = BASE_CODE.get(base)
+    if code is None:
+      exceptions.append(EXCEPTION.pack(i, base.encode("utf-8")[:1]))
+      code = 0
+    packed[i >> 2] |= code << (2 * (i & 3))
+  return SEQUENCE_HEADER.pack(len(sequence), len(exceptions)) +\
+      "".join(exceptions) + str(packed)
+
+# --------------------------------------------------------------------------
+##
+# @brief unpack a sequence written by pack_sequence
+#
+# @param buf     buffer holding the sequence
+# @param offset  where the sequence starts
+#
+# @returns   the dna sequence
+#
+# --------------------------------------------------------------------------
+def unpack_sequence(buf, offset):
+  length, count = SEQUENCE_HEADER.unpack_from(buf, offset)
+  offset += SEQUENCE_HEADER.size
+  exceptions = [EXCEPTION.unpack_from(buf, offset + i * EXCEPTION.size)
+      for i in xrange(count)]
+  offset += count * EXCEPTION.size
+  packed = buf[offset:offset + (length + 3) // 4]
+  sequence = "".join([UNPACK_TABLE[b] for b in bytearray(packed)])[:length]
+  if exceptions:
+    sequence = list(sequence)
+    for i, base in exceptions:
+      sequence[i] = base
+    sequence = "".join(sequence)
+  return sequence
+
+# --------------------------------------------------------------------------
+##
+# @brief read the fields of a part xml file
+#
+# @param xml_file  path to the xml file
+# @param category  folder of the part
+#
+# @returns   (dict of FIELDS, sequence)
+#
+# --------------------------------------------------------------------------
+def parse_part(xml_file, category):
+  part = ET.parse(xml_file).find("part_list/part")
+  fields = {"category": category}
+  for field in FIELDS[:-1]:
+    tag = field if field.startswith("part_") else "part_" + field
+    fields[field] = part.findtext(tag)
+  sequence = part.findtext("sequences/seq_data") or ""
+  return fields, sequence.replace("\n", "").strip()
+
+# --------------------------------------------------------------------------
+##
+# @brief a part read from the store, the sequence is unpacked on demand
+# ----------------------------------------------------------------------------
+class StoredPart(object):
+  __slots__ = ("key", "mtime", "size", "_store", "_offset") + FIELDS
+
+  def __init__(self, store, key, offset):
+    values = RECORD_HEAD.unpack_from(store.buf, offset)
+    self.key = key
+    for field, string_id in zip(FIELDS, values):
+      setattr(self, field, store.string(string_id))
+    self.mtime, self.size = values[-2:]
+    self._store = store
+    self._offset = offset + RECORD_HEAD.size
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief get the path of the xml file relative to biobrick
+  #
+  # --------------------------------------------------------------------------
+  def path(self):
+    return os.path.join(self.category, self.key + ".xml")
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief get the path of the xml file the way the pages send it back,
+  #        relative to the working directory of the server like the paths
+  #        of getBiobrickPath and getDirList
+  #
+  # --------------------------------------------------------------------------
+  def client_path(self):
+    return "web/biobrick/%s/%s.xml" % (self.category, self.key)
+
+  def sequence(self):
+    return unpack_sequence(self._store.buf, self._offset)
+
+  def fields(self):
+    return dict((f, getattr(self, f)) for f in FIELDS)
+
+# --------------------------------------------------------------------------
+##
+# @brief  read-only view of a store file, the file is memory mapped so the
+#         pages are shared by every process that opens it
+# ----------------------------------------------------------------------------
+class PartStore(object):
+  # --------------------------------------------------------------------------
+  ##
+  # @brief map the current generation of a store file
+  #
+  # @param path  path to the store
+  #
+  # --------------------------------------------------------------------------
+  def __init__(self, path):
+    self.path = path
+    # the file mapped, update_store() writes a new one beside it
+    self.file = storage.current_generation(path)
+    fp = open(self.file, "rb")
+    try:
+      self.buf = mmap.mmap(fp.fileno(), 0, access = mmap.ACCESS_READ)
+    finally:
+      fp.close()
+    magic, self.count, string_count, self.strings_offset = \
+        HEADER.unpack_from(self.buf, 0)
+    if magic != MAGIC:
+      self.buf.close()
+      raise ValueError("%s is not a part store" % path)
+    self.blob_offset = self.strings_offset + 4 * (string_count + 1)
+    self.__keys = None
+    self.__strings = {}
+
+  def close(self):
+    self.buf.close()
+
+  def __len__(self):
+    return self.count
+
+  def string(self, string_id):
+    if string_id == NO_STRING:
+      return None
+    value = self.__strings.get(string_id)
+    if value is None:
+      start, end = struct.unpack_from("<II", self.buf,
+          self.strings_offset + 4 * string_id)
+      value = self.buf[self.blob_offset + start:self.blob_offset + end]\
+          .decode("utf-8")
+      self.__strings[string_id] = value
+    return value
+
+  def entry(self, i):
+    name, offset, length = INDEX_ENTRY.unpack_from(self.buf,
+        HEADER.size + i * INDEX_ENTRY.size)
+    return name.rstrip("\0"), offset, length
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief get all part names in sorted order
+  #
+  # @returns   list of names
+  #
+  # --------------------------------------------------------------------------
+  def keys(self):
+    if self.__keys is None:
+      self.__keys = [self.entry(i)[0] for i in xrange(self.count)]
+    return self.__keys
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief find a part by binary search over the index
+  #
+  # @param key  part name, e.g. BBa_B0034
+  #
+  # @returns   the StoredPart, None if there is none
+  #
+  # --------------------------------------------------------------------------
+  def get(self, key):
+    key = str(key)
+    i = bisect.bisect_left(self.keys(), key)
+    if i == self.count or self.__keys[i] != key:
+      return None
+    return StoredPart(self, key, self.entry(i)[1])
+
+  def __iter__(self):
+    for i in xrange(self.count):
+      key, offset, length = self.entry(i)
+      yield StoredPart(self, key, offset)
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief get the packed sequence of a record as it is in the file, it can
+  #        be copied into a new store unchanged
+  #
+  # --------------------------------------------------------------------------
+  def raw_sequence(self, part):
+    i = bisect.bisect_left(self.keys(), part.key)
+    key, offset, length = self.entry(i)
+    return self.buf[part._offset:offset + length]
+
+# --------------------------------------------------------------------------
+##
+# @brief write a store file
+#
+# @param path   path to the store
+# @param parts  list of (name, fields, packed sequence, mtime, size)
+#
+# --------------------------------------------------------------------------
+def write_store(path, parts):
+  strings = {}
+  blob = []
+  blob_size = [0]
+  offsets = [0]
+
+  def intern(value):
+    if value is None:
+      return NO_STRING
+    string_id = strings.get(value)
+    if string_id is None:
+      data = value.encode("utf-8")
+      string_id = strings[value] = len(blob)
+      blob.append(data)
+      blob_size[0] += len(data)
+      offsets.append(blob_size[0])
+    return string_id
+
+  parts = sorted(parts)
+  index = []
+  records = []
+  offset = HEADER.size + INDEX_ENTRY.size * len(parts)
+  for key, fields, sequence, mtime, size in parts:
+    record = RECORD_HEAD.pack(*([intern(fields[f]) for f in FIELDS] +\
+        [mtime, size])) + sequence
+    index.append(INDEX_ENTRY.pack(key, offset, len(record)))
+    records.append(record)
+    offset += len(record)
+  tmp_path = storage.staging_path(path)
+  fp = open(tmp_path, "wb")
+  try:
+    fp.write(HEADER.pack(MAGIC, len(parts), len(blob), offset))
+    fp.write("".join(index))
+    fp.write("".join(records))
+    fp.write(struct.pack("<%dI" % len(offsets), *offsets))
+    fp.write("".join(blob))
+    fp.flush()
+    os.fsync(fp.fileno())
+  finally:
+    fp.close()
+  # a running server may have the old store mapped
+  storage.publish(tmp_path, path)
+
+# --------------------------------------------------------------------------
+##
+# @brief bring a store up to date with the xml files, only files whose
+#        mtime or size changed are parsed again, the rest is copied from the
+#        old store
+#
+# @param path   path to the store
+# @param index  PartIndex of the corpus
+# @param full   parse every file again
+#
+# @returns   (number of parsed files, number of reused records), the store
+#            is only written when something changed
+#
+# --------------------------------------------------------------------------
+def update_store(path, index = None, full = False):
+  index = index or part_index.default_index()
+  old = None
+  if not full and os.path.exists(storage.current_generation(path)):
+    try:
+      old = PartStore(path)
+    except (ValueError, struct.error, EnvironmentError):
+      old = None
+  parts = []
+  parsed = reused = 0
+  try:
+    for file_name, rel_path in index.files.iteritems():
+      key, ext = os.path.splitext(file_name)
+      if ext != ".xml" or len(key) > NAME_WIDTH:
+        continue
+      key = key.encode("utf-8")
+      xml_file = os.path.join(index.root, rel_path)
+      category = os.path.dirname(rel_path).replace(os.sep, "/")
+      st = os.stat(xml_file)
+      stored = old.get(key) if old is not None else None
+      if stored is not None and stored.mtime == st.st_mtime and\
+          stored.size == st.st_size and stored.category == category:
+        parts.append((key, stored.fields(), old.raw_sequence(stored),
+          stored.mtime, stored.size))
+        reused += 1
+        continue
+      try:
+        fields, sequence = parse_part(xml_file, category)
+      except ET.ParseError:
+        continue
+      parts.append((key, fields, pack_sequence(sequence), st.st_mtime,
+        st.st_size))
+      parsed += 1
+    changed = old is None or parsed > 0 or reused != len(old)
+  finally:
+    # slices of the mapping are copies, so it can be closed before the file
+    # is replaced
+    if old is not None:
+      old.close()
+  if changed:
+    write_store(path, parts)
+  return parsed, reused
+
+# seconds between two looks for a store published by another process
+RECHECK_SECONDS = 5.0
+
+__default = []
+# when default_store() last looked for a newer generation
+__checked = [0.0]
+
+# --------------------------------------------------------------------------
+##
+# @brief get the store of the biobrick corpus, updated on first use and
+#        opened again when another process, e.g. registry_sync, published
+#        a new generation, the indexes built on it check which store they
+#        were built on
+#
+# @param path  path to the store, only used by the first call
+#
+# @returns   the shared PartStore
+#
+# --------------------------------------------------------------------------
+def default_store(path = "parts.store"):
+  if not __default:
+    update_store(path)
+    __default.append(PartStore(path))
+    __checked[0] = time.time()
+  elif time.time() - __checked[0] > RECHECK_SECONDS:
+    reopen_store()
+  return __default[0]
+
+# --------------------------------------------------------------------------
+##
+# @brief open the newest generation of the shared store if it is not the
+#        one open, the old store stays mapped while lookups still hold it
+#
+# --------------------------------------------------------------------------
+def reopen_store():
+  __checked[0] = time.time()
+  store = __default[0]
+  if storage.current_generation(store.path) != store.file:
+    try:
+      __default[0] = PartStore(store.path)
+    except (ValueError, struct.error, EnvironmentError):
+      # removed again meanwhile, tried at the next look
+      pass
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description = "compile web/biobrick into "
+      "a part store")
+  parser.add_argument("-o", "--output", default = "parts.store")
+  parser.add_argument("--full", action = "store_true",
+      help = "parse every xml file again")
+  args = parser.parse_args()
+  parsed, reused = update_store(args.output, full = args.full)
+  print "%s: %d parts parsed, %d reused" % (args.output, parsed, reused)
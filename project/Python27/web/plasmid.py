@@ -12,6 +12,7 @@ import component_union
 from sbol2json import format_to_json
 import os
 import database
+import part_index
 
 # --------------------------------------------------------------------------
 ##
@@ -31,9 +32,7 @@ reverse = {"A":"T", "T":"A", "C":"G", "G":"C", "a":"t", "t":"a", "g":"c","c":"g"
 #
 # --------------------------------------------------------------------------
 def find_file(name, path):
-  for root, dirs, files in os.walk(path):
-    if name in files:
-      return os.path.join(root, name)
+  return part_index.find_file(name, path)
 
 # --------------------------------------------------------------------------
 ##
@@ -0,0 +1,303 @@
+##
+# @file prefork.py
+# @brief run the server in several processes that share one listening
+#        socket, supervised by a master process
+# @author SYSU-Software
+# @version 1.0
+# @date 2026-10-19
+# @copyright 2013 SYSU-Software. All rights reserved.
+# This project is released under MIT License.
+#
+# usage: python web/app.py --workers 4
+#
+#        kill -HUP <master>   replace the workers one generation at a time,
+#                             the socket stays open so no connection is
+#                             refused, the new workers are forked from the
+#                             master with the data it refreshed first, the
+#                             code is only reloaded by a full restart
+#        kill -TERM <master>  stop, the workers finish their requests first
+#
+#        the kernel hands every new connection to one worker and a websocket
+#        stays on the worker that accepted it, so the state of a connection,
+#        its session key and circuit sessions, needs no routing, the login
+#        and the saved index are kept in the database for all workers, see
+#        SqliteDatabase.shareState
+#
+
+import os
+import sys
+import time
+import errno
+import select
+import signal
+import socket
+import gevent
+
+# seconds between two heartbeats of a worker, a worker that sent none for
+# TIMEOUT seconds has a blocked loop and is killed
+HEARTBEAT = 1
+TIMEOUT = 30
+# seconds a stopping worker has to finish its requests and websockets
+GRACE = 10
+# a worker that exits sooner after its start is restarted after a delay
+# that doubles up to MAX_BACKOFF, so a broken worker does not fork-loop
+MIN_LIFETIME = 5
+MAX_BACKOFF = 30
+
+# --------------------------------------------------------------------------
+##
+# @brief whether this system can fork workers, windows serves in one process
+#
+# --------------------------------------------------------------------------
+def can_fork():
+  return hasattr(os, "fork")
+
+# --------------------------------------------------------------------------
+##
+# @brief open the listening socket before the workers are forked
+#
+# @param address  (host, port)
+# @param backlog  connections the kernel queues for the workers
+#
+# @returns   the non-blocking socket
+#
+# --------------------------------------------------------------------------
+def listen(address, backlog = 128):
+  sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+  sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+  sock.bind(address)
+  sock.listen(backlog)
+  sock.setblocking(0)
+  return sock
+
+# --------------------------------------------------------------------------
+##
+# @brief serve in a worker until the master stops it
+#
+# @param server     the gevent server on the shared socket, with a pool so
+#                   that stopping it waits for its requests
+# @param heartbeat  pipe to the master, None without a master
+#
+# --------------------------------------------------------------------------
+def serve(server, heartbeat = None):
+  def stop():
+    server.stop(timeout = GRACE)
+  if os.name != "nt":
+    # TERM, e.g. from the master, stops accepting, the other workers go on
+    gevent.signal(signal.SIGTERM, gevent.spawn, stop)
+  if heartbeat is not None:
+    def beat():
+      while True:
+        try:
+          os.write(heartbeat, ".")
+        except OSError:
+          # the master is gone
+          stop()
+          return
+        gevent.sleep(HEARTBEAT)
+    gevent.spawn(beat)
+  server.serve_forever()
+
+class Worker(object):
+  def __init__(self, pid, heartbeat, generation):
+    self.pid = pid
+    self.heartbeat = heartbeat
+    self.generation = generation
+    self.started = self.last_beat = time.time()
+
+# --------------------------------------------------------------------------
+##
+# @brief  the master, it forks the workers, restarts the ones that died or
+#         hang and replaces them all on HUP
+# ----------------------------------------------------------------------------
+class Supervisor(object):
+  # --------------------------------------------------------------------------
+  ##
+  # @brief set up a master
+  #
+  # @param run      function the forked worker runs with its heartbeat pipe,
+  #                 it opens its own database connections and serves
+  # @param workers  number of workers
+  # @param refresh  function the master runs on HUP before it forks the new
+  #                 generation, to load what changed since it started
+  #
+  # --------------------------------------------------------------------------
+  def __init__(self, run, workers, refresh = None):
+    self.run = run
+    self.refresh = refresh
+    self.size = workers
+    self.workers = {}
+    self.generation = 0
+    self.backoff = 0
+    self.stopping = False
+    self.reloading = False
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief fork a worker of the current generation
+  #
+  # --------------------------------------------------------------------------
+  def spawn(self):
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+      status = 0
+      try:
+        os.close(read_end)
+        for worker in self.workers.values():
+          os.close(worker.heartbeat)
+        # ctrl-c and a closed terminal reach the whole process group, the
+        # master stops the workers gracefully then
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        # the event loop of the master must not be shared
+        gevent.reinit()
+        self.run(write_end)
+      except BaseException:
+        sys.excepthook(*sys.exc_info())
+        status = 1
+      finally:
+        os._exit(status)
+    os.close(write_end)
+    self.workers[pid] = Worker(pid, read_end, self.generation)
+
+  def signal(self, pid, signum):
+    try:
+      os.kill(pid, signum)
+    except OSError as e:
+      if e.errno != errno.ESRCH:
+        raise
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief read the heartbeats that came in within a second
+  #
+  # --------------------------------------------------------------------------
+  def listen_heartbeats(self):
+    pipes = dict((w.heartbeat, w) for w in self.workers.values())
+    try:
+      ready = select.select(pipes.keys(), [], [], 1.0)[0]
+    except (select.error, OSError) as e:
+      if e.args[0] == errno.EINTR:
+        return
+      raise
+    now = time.time()
+    for fd in ready:
+      if os.read(fd, 4096):
+        pipes[fd].last_beat = now
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief forget the workers that exited, a short-lived one delays the
+  #        next fork
+  #
+  # --------------------------------------------------------------------------
+  def reap(self):
+    while self.workers:
+      try:
+        pid, status = os.waitpid(-1, os.WNOHANG)
+      except OSError as e:
+        if e.errno == errno.EINTR:
+          continue
+        if e.errno == errno.ECHILD:
+          return
+        raise
+      if pid == 0:
+        return
+      worker = self.workers.pop(pid, None)
+      if worker is None:
+        continue
+      os.close(worker.heartbeat)
+      if self.stopping or worker.generation != self.generation:
+        continue
+      if time.time() - worker.started < MIN_LIFETIME:
+        self.backoff = min(MAX_BACKOFF, max(1, self.backoff * 2))
+        sys.stderr.write("worker %d exited with %d after its start, "
+            "next one in %ds\n" % (pid, status, self.backoff))
+      else:
+        self.backoff = 0
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief kill the workers whose loop stopped sending heartbeats
+  #
+  # --------------------------------------------------------------------------
+  def check_health(self):
+    now = time.time()
+    for worker in self.workers.values():
+      if now - worker.last_beat > TIMEOUT:
+        sys.stderr.write("worker %d sent no heartbeat for %ds, killed\n" %
+            (worker.pid, now - worker.last_beat))
+        self.signal(worker.pid, signal.SIGKILL)
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief start a new generation of workers, then let the old one finish
+  #
+  # --------------------------------------------------------------------------
+  def reload(self):
+    self.reloading = False
+    if self.refresh is not None:
+      try:
+        self.refresh()
+      except Exception:
+        # the new generation starts with the data of the old one
+        sys.excepthook(*sys.exc_info())
+    old = [w for w in self.workers.values()
+        if w.generation == self.generation]
+    self.generation += 1
+    self.backoff = 0
+    for i in xrange(self.size):
+      self.spawn()
+    for worker in old:
+      self.signal(worker.pid, signal.SIGTERM)
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief stop the workers, killing those still busy after GRACE seconds
+  #
+  # --------------------------------------------------------------------------
+  def stop(self):
+    for worker in self.workers.values():
+      self.signal(worker.pid, signal.SIGTERM)
+    deadline = time.time() + GRACE + 1
+    while self.workers and time.time() < deadline:
+      self.reap()
+      time.sleep(0.1)
+    for worker in self.workers.values():
+      self.signal(worker.pid, signal.SIGKILL)
+    while self.workers:
+      self.reap()
+      time.sleep(0.1)
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief supervise until TERM or ctrl-c
+  #
+  # --------------------------------------------------------------------------
+  def supervise(self):
+    def on_stop(signum, frame):
+      self.stopping = True
+    def on_reload(signum, frame):
+      self.reloading = True
+    signal.signal(signal.SIGTERM, on_stop)
+    signal.signal(signal.SIGINT, on_stop)
+    signal.signal(signal.SIGHUP, on_reload)
+    next_spawn = 0
+    try:
+      while not self.stopping:
+        if self.reloading:
+          self.reload()
+        missing = self.size - sum(1 for w in self.workers.values()
+            if w.generation == self.generation)
+        while missing > 0 and time.time() >= next_spawn:
+          self.spawn()
+          missing -= 1
+          if self.backoff:
+            next_spawn = time.time() + self.backoff
+        self.listen_heartbeats()
+        self.reap()
+        self.check_health()
+    finally:
+      self.stop()
@@ -0,0 +1,451 @@
+##
+# @file process_pool.py
+# @brief run the cpu-bound websocket apis in worker processes
+# @author SYSU-Software
+# @version 1.0
+# @date 2026-10-19
+# @copyright 2013 SYSU-Software. All rights reserved.
+# This project is released under MIT License.
+#
+
+import os
+import sys
+import time
+import types
+import atexit
+import signal
+import socket
+import multiprocessing
+import _multiprocessing
+
+try:
+  from gevent import sleep, spawn_later
+  from gevent.queue import Queue, Empty
+  from gevent.socket import wait_read
+except ImportError:
+  from time import sleep
+  spawn_later = None
+  from Queue import Queue, Empty
+  wait_read = None
+
+# --------------------------------------------------------------------------
+##
+# @brief worker processes per api, an api missing here or with 0 processes
+#        runs in the greenlet of its websocket
+#
+# --------------------------------------------------------------------------
+POOL_SIZES = {
+  "Simulate": 2,
+  "getGroup": 1,
+  "updateGeneCircuit": 1,
+  "getPlasmidSbol": 1,
+}
+
+# seconds a call may run before its worker is killed
+TIMEOUTS = {
+  "Simulate": 300,
+}
+DEFAULT_TIMEOUT = 60
+
+class TaskTimeout(Exception):
+  pass
+
+class WorkerDied(Exception):
+  pass
+
+class RemoteError(Exception):
+  pass
+
+# server ends of the worker pipes, a forked worker closes its copies so a
+# worker sees the end of its pipe once the server is gone
+_server_ends = []
+
+# killed worker processes not reaped yet
+_dying = []
+
+# the Launcher started by start, none on windows
+_launcher = []
+
+# --------------------------------------------------------------------------
+##
+# @brief pass the chunks of a streaming api on, apis stream by returning a
+#        generator whose last item is their final result
+#
+# @param result    what the api returned
+# @param on_chunk  function called with every chunk but the last, None to
+#                  drop them
+#
+# @returns   the final result
+#
+# --------------------------------------------------------------------------
+def drain(result, on_chunk):
+  if not isinstance(result, types.GeneratorType):
+    return result
+  last = None
+  for i, chunk in enumerate(result):
+    if i and on_chunk is not None:
+      on_chunk(last)
+    last = chunk
+  return last
+
+# --------------------------------------------------------------------------
+##
+# @brief main loop of a worker process, it answers api calls with its own
+#        database connection
+#
+# @param conn    end of the pipe to the server
+# @param db_url  database the server uses
+#
+# --------------------------------------------------------------------------
+def worker_main(conn, db_url):
+  # ctrl-c is handled by the server, which stops its workers
+  signal.signal(signal.SIGINT, signal.SIG_IGN)
+  for server_end in _server_ends:
+    server_end.close()
+  import database
+  import websocket
+  import part_index
+  # forked workers have the index of the server, on windows the worker
+  # starts afresh and the pooled apis need no other index than this one
+  part_index.default_index(cache = "part_index.json")
+  # connections of the server may have been forked along, they are never
+  # used here, the pool of this database opens its own
+  db = database.SqliteDatabase(db_url)
+  api = websocket.apis(db)
+  while True:
+    try:
+      request, message = conn.recv()
+    except (EOFError, IOError):
+      return
+    try:
+      handler = websocket.REGISTRY[request]
+      reply = ("ok", drain(handler.function(api, message),
+        lambda chunk: conn.send(("chunk", chunk))))
+    except Exception as e:
+      reply = ("error", "%s: %s" % (type(e).__name__, e))
+    finally:
+      db.release()
+    conn.send(reply)
+
+# --------------------------------------------------------------------------
+##
+# @brief main loop of the launcher, it forks a worker for every pipe end the
+#        server sends and answers with the pid of the worker
+#
+# @param conn       end of the pipe to the server
+# @param close_fds  descriptors of the server the workers must not share
+#
+# --------------------------------------------------------------------------
+def launcher_main(conn, close_fds):
+  for fd in close_fds:
+    try:
+      os.close(fd)
+    except OSError:
+      pass
+  # the workers are reaped as soon as they exit
+  signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+  while True:
+    try:
+      db_url = conn.recv()
+      fd = _multiprocessing.recvfd(conn.fileno())
+    except (EOFError, IOError):
+      return
+    pid = os.fork()
+    if pid == 0:
+      status = 0
+      try:
+        conn.close()
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        worker_main(_multiprocessing.Connection(fd), db_url)
+      except BaseException:
+        sys.excepthook(*sys.exc_info())
+        status = 1
+      finally:
+        os._exit(status)
+    os.close(fd)
+    conn.send(pid)
+
+# --------------------------------------------------------------------------
+##
+# @brief  the process forking the workers, it is forked before the server
+#         accepts connections so no worker, replacements included, shares
+#         the sockets of the clients
+# ----------------------------------------------------------------------------
+class Launcher(object):
+  # --------------------------------------------------------------------------
+  ##
+  # @brief fork the launcher
+  #
+  # @param close_fds  descriptors of the server the workers must not share,
+  #                   such as its listening socket
+  #
+  # --------------------------------------------------------------------------
+  def __init__(self, close_fds = ()):
+    self.conn, child_conn = multiprocessing.Pipe()
+    self.pid = os.fork()
+    if self.pid == 0:
+      status = 0
+      try:
+        self.conn.close()
+        # ctrl-c and a closed terminal are handled by the server, which
+        # closes the pipe to the launcher then
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        launcher_main(child_conn, close_fds)
+      except BaseException:
+        sys.excepthook(*sys.exc_info())
+        status = 1
+      finally:
+        os._exit(status)
+    child_conn.close()
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief fork a worker, a fork takes milliseconds so the pid is awaited
+  #        without yielding and two greenlets never interleave on the pipe
+  #
+  # @param conn    worker end of the pipe to the worker
+  # @param db_url  database the worker opens
+  #
+  # @returns   the pid of the worker
+  #
+  # --------------------------------------------------------------------------
+  def fork(self, conn, db_url):
+    self.conn.send(db_url)
+    _multiprocessing.sendfd(self.conn.fileno(), conn.fileno())
+    return self.conn.recv()
+
+  def close(self):
+    # the launcher exits at the end of its pipe
+    self.conn.close()
+    try:
+      os.waitpid(self.pid, os.WNOHANG)
+    except OSError:
+      pass
+
+# --------------------------------------------------------------------------
+##
+# @brief reap the killed workers that exited, with gevent it polls again
+#        until none is left
+#
+# --------------------------------------------------------------------------
+def reap():
+  # is_alive reaps a process that exited
+  _dying[:] = [process for process in _dying if process.is_alive()]
+  if _dying and spawn_later is not None:
+    spawn_later(0.1, reap)
+
+# --------------------------------------------------------------------------
+##
+# @brief  one worker process and the pipe to it
+# ----------------------------------------------------------------------------
+class Worker(object):
+  def __init__(self, db_url):
+    self.conn, child_conn = multiprocessing.Pipe()
+    if _launcher:
+      self.process = None
+      self.pid = _launcher[0].fork(child_conn, db_url)
+    else:
+      # windows starts a fresh interpreter, which shares no sockets
+      _server_ends.append(self.conn)
+      self.process = multiprocessing.Process(target = worker_main,
+          args = (child_conn, db_url))
+      self.process.daemon = True
+      self.process.start()
+      self.pid = self.process.pid
+    child_conn.close()
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief wait for the reply of the worker without blocking other
+  #        greenlets
+  #
+  # @param timeout  seconds to wait
+  #
+  # @returns   whether the reply is ready
+  #
+  # --------------------------------------------------------------------------
+  def wait(self, timeout):
+    if wait_read is None or os.name == "nt":
+      # the pipe is no socket on windows, it is polled between sleeps
+      deadline = time.time() + timeout
+      while not self.conn.poll():
+        if time.time() >= deadline:
+          return False
+        sleep(0.01)
+      return True
+    try:
+      wait_read(self.conn.fileno(), timeout)
+    except socket.timeout:
+      return False
+    return True
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief run an api in the worker
+  #
+  # @param request  name of the api
+  # @param message  message of the request
+  # @param timeout   seconds the api may run
+  # @param on_chunk  function called with the chunks of a streaming api
+  #
+  # @returns   the result of the api
+  #
+  # --------------------------------------------------------------------------
+  def call(self, request, message, timeout, on_chunk = None):
+    self.conn.send((request, message))
+    deadline = time.time() + timeout
+    while True:
+      if not self.wait(max(0, deadline - time.time())):
+        raise TaskTimeout("%s ran longer than %ss" % (request, timeout))
+      try:
+        status, result = self.conn.recv()
+      except (EOFError, IOError):
+        raise WorkerDied("worker %s of %s exited" % (self.pid, request))
+      if status == "chunk":
+        if on_chunk is not None:
+          on_chunk(result)
+        continue
+      if status == "error":
+        raise RemoteError(result)
+      return result
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief stop the worker without waiting for it, the launcher reaps its
+  #        workers and reap the others
+  #
+  # --------------------------------------------------------------------------
+  def kill(self):
+    if self.conn in _server_ends:
+      _server_ends.remove(self.conn)
+    self.conn.close()
+    if self.process is None:
+      try:
+        os.kill(self.pid, signal.SIGTERM)
+      except OSError:
+        pass
+    else:
+      if self.process.is_alive():
+        self.process.terminate()
+      _dying.append(self.process)
+      if len(_dying) == 1:
+        reap()
+
+# --------------------------------------------------------------------------
+##
+# @brief  the worker processes of one api, a call waits for a free worker
+#         and a worker that timed out, died or was cancelled is replaced by
+#         a new one
+# ----------------------------------------------------------------------------
+class ProcessPool(object):
+  # --------------------------------------------------------------------------
+  ##
+  # @brief start the workers
+  #
+  # @param request  name of the api
+  # @param db_url   database the workers open
+  # @param size     number of workers
+  # @param timeout  seconds a call may run
+  #
+  # --------------------------------------------------------------------------
+  def __init__(self, request, db_url, size, timeout = DEFAULT_TIMEOUT):
+    self.request = request
+    self.db_url = db_url
+    self.timeout = timeout
+    self.workers = []
+    self.idle = Queue()
+    for i in xrange(size):
+      self.spawn()
+
+  def spawn(self):
+    worker = Worker(self.db_url)
+    self.workers.append(worker)
+    self.idle.put(worker)
+
+  def replace(self, worker):
+    worker.kill()
+    self.workers.remove(worker)
+    self.spawn()
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief run the api in a free worker, killing the greenlet that waits
+  #        for it kills the worker too
+  #
+  # @param message  message of the request
+  # @param timeout   seconds to wait for a free worker and then for the
+  #                  result, None for the timeout of the pool
+  # @param on_chunk  function called with the chunks of a streaming api
+  #
+  # @returns   the result of the api
+  #
+  # --------------------------------------------------------------------------
+  def call(self, message, timeout = None, on_chunk = None):
+    timeout = timeout or self.timeout
+    try:
+      worker = self.idle.get(timeout = timeout)
+    except Empty:
+      raise TaskTimeout("no free worker for %s" % self.request)
+    try:
+      result = worker.call(self.request, message, timeout, on_chunk)
+    except RemoteError:
+      self.idle.put(worker)
+      raise
+    except BaseException:
+      # timed out, died or cancelled, the worker may still be running
+      self.replace(worker)
+      raise
+    self.idle.put(worker)
+    return result
+
+  def close(self):
+    for worker in self.workers:
+      worker.kill()
+    self.workers = []
+
+__pools = {}
+
+# --------------------------------------------------------------------------
+##
+# @brief start the worker processes, they are forked from a launcher the
+#        server forks once it loaded its indexes and so begin with them,
+#        call it before the server accepts connections
+#
+# @param db_url     database the workers open
+# @param sizes      worker processes per api, POOL_SIZES by default
+# @param timeouts   seconds per api, TIMEOUTS by default
+# @param close_fds  descriptors of the server the workers must not share
+#
+# --------------------------------------------------------------------------
+def start(db_url, sizes = None, timeouts = None, close_fds = ()):
+  sizes = POOL_SIZES if sizes is None else sizes
+  timeouts = TIMEOUTS if timeouts is None else timeouts
+  if os.name != "nt" and not _launcher:
+    _launcher.append(Launcher(close_fds))
+  for request, size in sizes.iteritems():
+    if size > 0 and request not in __pools:
+      __pools[request] = ProcessPool(request, db_url, size,
+          timeouts.get(request, DEFAULT_TIMEOUT))
+
+# --------------------------------------------------------------------------
+##
+# @brief get the pool running an api
+#
+# @param request  name of the api
+#
+# @returns   the ProcessPool, None when the api runs in the greenlet
+#
+# --------------------------------------------------------------------------
+def pool_for(request):
+  return __pools.get(request)
+
+@atexit.register
+def stop():
+  for pool in __pools.values():
+    pool.close()
+  __pools.clear()
+  for launcher in _launcher:
+    launcher.close()
+  del _launcher[:]
@@ -0,0 +1,317 @@
+##
+# @file registry_sync.py
+# @brief mirror part xml files of a registry catalog page into web/biobrick
+# @author SYSU-Software
+# @version 1.0
+# @date 2026-10-19
+# @copyright 2013 SYSU-Software. All rights reserved.
+# This project is released under MIT License.
+#
+# usage: python web/registry_sync.py [-j 8] [-u http://parts.igem.org]
+#            [-o web/biobrick] [--restart] p_type sub_type
+#
+
+import os
+import re
+import sys
+import json
+import time
+import Queue
+import urllib
+import urlparse
+import httplib
+import argparse
+import threading
+import part_index
+import part_store
+import storage
+
+PART_NAME = re.compile(r"BBa_[A-Z]\d*")
+PART_PATH = "/cgi/xml/part.cgi?part=%s"
+CATALOG_PATH = "/%s/Catalog/%s"
+
+# --------------------------------------------------------------------------
+##
+# @brief  a keep-alive connection to one host, reopened when the server
+#         closed it
+# ----------------------------------------------------------------------------
+class Connection(object):
+  def __init__(self, base_url, timeout = 30):
+    url = urlparse.urlsplit(base_url)
+    conn_class = httplib.HTTPSConnection if url.scheme == "https" else\
+        httplib.HTTPConnection
+    self.conn = conn_class(url.hostname, url.port, timeout = timeout)
+    self.prefix = url.path.rstrip("/")
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief send a GET and read the whole reply so the connection can be
+  #        reused
+  #
+  # @param path     path below the base url
+  # @param headers  request headers
+  #
+  # @returns   (status, reply headers as a dict, body)
+  #
+  # --------------------------------------------------------------------------
+  def get(self, path, headers = {}):
+    try:
+      self.conn.request("GET", self.prefix + path, headers = headers)
+      response = self.conn.getresponse()
+      body = response.read()
+    except (httplib.HTTPException, EnvironmentError):
+      # the server dropped the keep-alive connection, or it broke
+      self.conn.close()
+      raise
+    if response.getheader("connection", "").lower() == "close":
+      self.conn.close()
+    return response.status, dict(response.getheaders()), body
+
+  def close(self):
+    self.conn.close()
+
+# --------------------------------------------------------------------------
+##
+# @brief  what has been synced, written to a json file so an interrupted
+#         sync resumes where it stopped, and the validators of every part
+#         so unchanged parts are not downloaded again
+# ----------------------------------------------------------------------------
+class Checkpoint(object):
+  def __init__(self, path):
+    self.path = path
+    self.validators = {}
+    self.run = None
+    self.lock = threading.Lock()
+    if os.path.exists(path):
+      with open(path, "rb") as fp:
+        data = json.load(fp)
+      self.validators = data.get("validators", {})
+      self.run = data.get("run")
+
+  def save(self):
+    # held until the file is in place, the workers share the tmp path
+    with self.lock:
+      tmp_path = self.path + ".tmp"
+      with open(tmp_path, "wb") as fp:
+        json.dump({"validators": self.validators, "run": self.run}, fp)
+      storage.replace_file(tmp_path, self.path)
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief record a finished part
+  #
+  # @param part        part name
+  # @param validators  (etag, last modified) of the reply, None to keep them
+  #
+  # --------------------------------------------------------------------------
+  def done(self, part, validators = None):
+    with self.lock:
+      if validators is not None:
+        self.validators[part] = validators
+      self.run["pending"].remove(part)
+
+# --------------------------------------------------------------------------
+##
+# @brief  downloads the parts of one catalog page with a bounded number of
+#         worker threads, each with its own keep-alive connection
+# ----------------------------------------------------------------------------
+class RegistrySync(object):
+  # --------------------------------------------------------------------------
+  ##
+  # @brief set up a sync
+  #
+  # @param base_url    registry url, a local server in tests
+  # @param out_dir     folder the parts of the page are written to
+  # @param checkpoint  Checkpoint
+  # @param jobs        number of concurrent downloads
+  # @param retries     attempts per part before it is given up
+  # @param save_every  parts between two checkpoint saves
+  #
+  # --------------------------------------------------------------------------
+  def __init__(self, base_url, out_dir, checkpoint, jobs = 8, retries = 3,
+      save_every = 50):
+    self.base_url = base_url
+    self.out_dir = out_dir
+    self.checkpoint = checkpoint
+    self.jobs = jobs
+    self.retries = retries
+    self.save_every = save_every
+    self.lock = threading.Lock()
+    self.report = {"fetched": 0, "not_modified": 0, "failed": [],
+        "written": []}
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief get the part names listed on a catalog page
+  #
+  # @returns   sorted list of part names
+  #
+  # --------------------------------------------------------------------------
+  def list_parts(self, p_type, sub_type):
+    conn = Connection(self.base_url)
+    try:
+      status, headers, page = self.retry(conn, CATALOG_PATH %
+          (urllib.quote(p_type), urllib.quote(sub_type)), {})
+    finally:
+      conn.close()
+    if status != 200:
+      raise IOError("catalog page returned %d" % status)
+    return sorted(set(PART_NAME.findall(page)))
+
+  def retry(self, conn, path, headers):
+    for attempt in xrange(self.retries):
+      try:
+        status, reply_headers, body = conn.get(path, headers)
+        if status < 500:
+          return status, reply_headers, body
+      except (httplib.HTTPException, EnvironmentError):
+        if attempt == self.retries - 1:
+          raise
+      time.sleep(0.5 * 2 ** attempt)
+    return status, reply_headers, body
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief download one part unless the registry says it did not change
+  #
+  # @param conn  Connection of the worker
+  # @param part  part name
+  #
+  # --------------------------------------------------------------------------
+  def fetch(self, conn, part):
+    path = os.path.join(self.out_dir, part + ".xml")
+    headers = {}
+    etag, modified = self.checkpoint.validators.get(part, (None, None))
+    if os.path.exists(path):
+      if etag:
+        headers["If-None-Match"] = etag
+      if modified:
+        headers["If-Modified-Since"] = modified
+    status, reply_headers, body = self.retry(conn,
+        PART_PATH % urllib.quote(part), headers)
+    if status == 304:
+      with self.lock:
+        self.report["not_modified"] += 1
+      self.checkpoint.done(part)
+      return
+    if status != 200 or "<part_list" not in body:
+      raise IOError("%s returned %d" % (part, status))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as fp:
+      fp.write(body)
+    storage.replace_file(tmp_path, path)
+    with self.lock:
+      self.report["fetched"] += 1
+      self.report["written"].append(path)
+    self.checkpoint.done(part, (reply_headers.get("etag"),
+      reply_headers.get("last-modified")))
+
+  def worker(self, parts):
+    conn = Connection(self.base_url)
+    try:
+      while True:
+        try:
+          part = parts.get_nowait()
+        except Queue.Empty:
+          return
+        try:
+          self.fetch(conn, part)
+        except (httplib.HTTPException, EnvironmentError) as e:
+          with self.lock:
+            self.report["failed"].append("%s: %s" % (part, e))
+          continue
+        with self.lock:
+          finished = self.report["fetched"] + self.report["not_modified"]
+        if finished % self.save_every == 0:
+          self.checkpoint.save()
+    finally:
+      conn.close()
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief sync a catalog page, an unfinished sync of the same page is
+  #        resumed unless restart is set
+  #
+  # @param p_type    part type, e.g. Promoters
+  # @param sub_type  catalog page, e.g. Constitutive
+  # @param restart   list the page again even if a sync of it was stopped
+  #
+  # @returns   report with the numbers of fetched, unchanged and failed
+  #            parts and the written files
+  #
+  # --------------------------------------------------------------------------
+  def sync(self, p_type, sub_type, restart = False):
+    run = self.checkpoint.run
+    if restart or run is None or run.get("page") != [p_type, sub_type] or\
+        not run["pending"]:
+      run = {"page": [p_type, sub_type],
+          "pending": self.list_parts(p_type, sub_type)}
+    self.checkpoint.run = run
+    self.checkpoint.save()
+    if not os.path.isdir(self.out_dir):
+      os.makedirs(self.out_dir)
+    parts = Queue.Queue()
+    for part in list(run["pending"]):
+      parts.put(part)
+    threads = [threading.Thread(target = self.worker, args = (parts, ))
+        for i in xrange(max(1, min(self.jobs, parts.qsize())))]
+    for t in threads:
+      t.daemon = True
+      t.start()
+    for t in threads:
+      t.join()
+    self.checkpoint.save()
+    self.report["pending"] = len(run["pending"])
+    return self.report
+
+# --------------------------------------------------------------------------
+##
+# @brief add the files a sync wrote to the part index and update the
+#        compiled part store with them
+#
+# @param index       PartIndex loaded before the sync
+# @param written     paths of the written files
+# @param store_path  path to the part store
+#
+# @returns   (number of parsed files, number of reused records)
+#
+# --------------------------------------------------------------------------
+def refresh_store(index, written, store_path = "parts.store"):
+  for path in written:
+    if os.path.abspath(path).startswith(index.root + os.sep):
+      index.add(path)
+  index.save()
+  return part_store.update_store(store_path, index)
+
+def main(argv = None):
+  parser = argparse.ArgumentParser(description = "mirror the parts of a "
+      "registry catalog page")
+  parser.add_argument("p_type", help = "part type, e.g. Promoters")
+  parser.add_argument("sub_type", help = "catalog page, e.g. Constitutive")
+  parser.add_argument("-u", "--base-url", default = "http://parts.igem.org")
+  parser.add_argument("-o", "--out-dir", default = None,
+      help = "web/biobrick/<p_type>/<sub_type> by default")
+  parser.add_argument("-j", "--jobs", type = int, default = 8)
+  parser.add_argument("-c", "--checkpoint", default = "registry_sync.json")
+  parser.add_argument("--restart", action = "store_true",
+      help = "do not resume a stopped sync")
+  parser.add_argument("--index-cache", default = "part_index.json")
+  parser.add_argument("--store", default = "parts.store")
+  parser.add_argument("--no-store", action = "store_true",
+      help = "do not update the part index and store")
+  args = parser.parse_args(argv)
+  out_dir = args.out_dir or os.path.join(part_index.BIOBRICK_ROOT,
+      args.p_type, args.sub_type)
+  # loaded before the sync, while its cache still matches the folders
+  index = None if args.no_store else part_index.PartIndex(
+      part_index.BIOBRICK_ROOT, args.index_cache)
+  syncer = RegistrySync(args.base_url, out_dir, Checkpoint(args.checkpoint),
+      args.jobs)
+  report = syncer.sync(args.p_type, args.sub_type, args.restart)
+  if report["written"] and index is not None:
+    report["store"] = refresh_store(index, report["written"], args.store)
+  print json.dumps(report, indent = 2)
+  return 1 if report["failed"] else 0
+
+if __name__ == "__main__":
+  sys.exit(main())
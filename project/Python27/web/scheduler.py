@@ -0,0 +1,236 @@
+##
+# @file scheduler.py
+# @brief admit websocket requests by priority class with per-client quotas,
+#        so bursts of heavy requests cannot starve logins and saves
+# @author SYSU-Software
+# @version 1.0
+# @date 2026-10-19
+# @copyright 2013 SYSU-Software. All rights reserved.
+# This project is released under MIT License.
+#
+# usage: with scheduler.SCHEDULER.admit(scheduler.request_class(message),
+#            client):
+#          result = dispatch(api, message)
+#
+
+import time
+from collections import deque
+from contextlib import contextmanager
+from gevent.event import Event
+
+INTERACTIVE = "interactive"
+NORMAL = "normal"
+BATCH = "batch"
+# in the order they are served
+CLASSES = (INTERACTIVE, NORMAL, BATCH)
+
+# --------------------------------------------------------------------------
+##
+# @brief class of the apis a user waits for, and of the heavy ones, the
+#        others are NORMAL
+#
+# --------------------------------------------------------------------------
+API_CLASSES = {
+  "userLogin": INTERACTIVE, "userLoginByTicket": INTERACTIVE,
+  "getRememberMeTicket": INTERACTIVE, "loginOut": INTERACTIVE,
+  "getLoginedUserName": INTERACTIVE, "registAUser": INTERACTIVE,
+  "updateUserInfo": INTERACTIVE, "updatePassword": INTERACTIVE,
+  "getUserQuestion": INTERACTIVE, "forgetPasswordAndReset": INTERACTIVE,
+  "generateRandomsessionKey": INTERACTIVE, "saveUserData": INTERACTIVE,
+  "loadUserFile": INTERACTIVE, "getUserFileList": INTERACTIVE,
+  "deleteUserData": INTERACTIVE, "updateGeneCircuit": INTERACTIVE,
+  "updateCircuitSession": INTERACTIVE, "getSchedulerStats": INTERACTIVE,
+  "getApiStats": INTERACTIVE,
+  "batch": BATCH, "bulkImport": BATCH, "findSimilarParts": BATCH,
+}
+
+# requests running at once, and how many of them a class may take, the
+# slots the others leave are kept for the interactive requests
+SLOTS = 16
+CLASS_SLOTS = {INTERACTIVE: 16, NORMAL: 12, BATCH: 4}
+# waiting requests per class, more are turned away at once
+QUEUE_LIMITS = {INTERACTIVE: 256, NORMAL: 64, BATCH: 16}
+# requests one client may run at once
+CLIENT_QUOTA = 4
+# waits kept per class for the percentiles
+WAIT_SAMPLES = 1024
+
+class ServerBusy(Exception):
+  pass
+
+# --------------------------------------------------------------------------
+##
+# @brief get the class of a request, stochastic simulations run an ensemble
+#        and are batch work
+#
+# @param message  the decoded message
+#
+# @returns   INTERACTIVE, NORMAL or BATCH
+#
+# --------------------------------------------------------------------------
+def request_class(message):
+  if message.get("request") == "Simulate" and message.get("isStochastic"):
+    return BATCH
+  return API_CLASSES.get(message.get("request"), NORMAL)
+
+# --------------------------------------------------------------------------
+##
+# @brief get who a connection counts as for the client quota, the desktop
+#        shell talks to the server on localhost, so every user and tab
+#        would share one address
+#
+# @param address     address of the browser
+# @param connection  key of the websocket connection
+#
+# @returns   the connection for local browsers, the address for others
+#
+# --------------------------------------------------------------------------
+def client_key(address, connection):
+  if not address or address == "::1" or address.startswith("127.") or\
+      address.startswith("::ffff:127."):
+    return connection
+  return address
+
+class Ticket(object):
+  def __init__(self, klass, client):
+    self.klass = klass
+    self.client = client
+    self.queued = time.time()
+    self.granted = False
+    self.event = Event()
+
+# --------------------------------------------------------------------------
+##
+# @brief  the queues of the requests waiting to run and the counts of the
+#         running ones
+# ----------------------------------------------------------------------------
+class Scheduler(object):
+  # --------------------------------------------------------------------------
+  ##
+  # @brief set up the limits
+  #
+  # @param slots         requests running at once
+  # @param class_slots   running requests per class
+  # @param queue_limits  waiting requests per class
+  # @param client_quota  running requests per client
+  #
+  # --------------------------------------------------------------------------
+  def __init__(self, slots = SLOTS, class_slots = CLASS_SLOTS,
+      queue_limits = QUEUE_LIMITS, client_quota = CLIENT_QUOTA):
+    self.slots = slots
+    self.class_slots = class_slots
+    self.queue_limits = queue_limits
+    self.client_quota = client_quota
+    self.running = 0
+    self.class_running = dict((k, 0) for k in CLASSES)
+    self.client_running = {}
+    self.queues = dict((k, deque()) for k in CLASSES)
+    self.admitted = dict((k, 0) for k in CLASSES)
+    self.rejected = dict((k, 0) for k in CLASSES)
+    self.waits = dict((k, deque(maxlen = WAIT_SAMPLES)) for k in CLASSES)
+
+  def runnable(self, ticket):
+    return self.class_running[ticket.klass] < self.class_slots[ticket.klass]\
+        and self.client_running.get(ticket.client, 0) < self.client_quota
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief start waiting requests while there are free slots, the first
+  #        runnable one of the highest class goes first
+  #
+  # --------------------------------------------------------------------------
+  def schedule(self):
+    while self.running < self.slots:
+      ticket = None
+      for klass in CLASSES:
+        for waiting in self.queues[klass]:
+          if self.runnable(waiting):
+            ticket = waiting
+            break
+        if ticket is not None:
+          break
+      if ticket is None:
+        return
+      self.queues[ticket.klass].remove(ticket)
+      self.running += 1
+      self.class_running[ticket.klass] += 1
+      self.client_running[ticket.client] =\
+          self.client_running.get(ticket.client, 0) + 1
+      self.waits[ticket.klass].append(time.time() - ticket.queued)
+      self.admitted[ticket.klass] += 1
+      ticket.granted = True
+      ticket.event.set()
+
+  def release(self, ticket):
+    self.running -= 1
+    self.class_running[ticket.klass] -= 1
+    self.client_running[ticket.client] -= 1
+    if not self.client_running[ticket.client]:
+      del self.client_running[ticket.client]
+    self.schedule()
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief wait for a slot and hold it while the block runs
+  #
+  # @param klass   class of the request
+  # @param client  who sent it, the quota counts per client
+  #
+  # @throws ServerBusy  when the queue of the class is full
+  #
+  # --------------------------------------------------------------------------
+  @contextmanager
+  def admit(self, klass, client):
+    queue = self.queues[klass]
+    if len(queue) >= self.queue_limits[klass]:
+      self.rejected[klass] += 1
+      raise ServerBusy("%d %s requests are waiting" % (len(queue), klass))
+    ticket = Ticket(klass, client)
+    queue.append(ticket)
+    self.schedule()
+    try:
+      ticket.event.wait()
+    except BaseException:
+      # killed while waiting, e.g. superseded or the client left
+      if ticket.granted:
+        self.release(ticket)
+      else:
+        queue.remove(ticket)
+      raise
+    try:
+      yield
+    finally:
+      self.release(ticket)
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief get the queue depths and the waits of the admitted requests
+  #
+  # @returns   dict with the running requests and, per class, the running,
+  #            queued, admitted and rejected requests and the mean, median,
+  #            95th percentile and longest wait in milliseconds
+  #
+  # --------------------------------------------------------------------------
+  def stats(self):
+    classes = {}
+    for klass in CLASSES:
+      waits = sorted(self.waits[klass])
+      wait_ms = {"mean": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+      if waits:
+        wait_ms = {"mean": 1000 * sum(waits) / len(waits),
+            "p50": 1000 * waits[len(waits) // 2],
+            "p95": 1000 * waits[min(len(waits) - 1, len(waits) * 95 // 100)],
+            "max": 1000 * waits[-1]}
+      classes[klass] = {"running": self.class_running[klass],
+          "queued": len(self.queues[klass]),
+          "admitted": self.admitted[klass],
+          "rejected": self.rejected[klass], "wait_ms": wait_ms}
+    return {"running": self.running, "slots": self.slots,
+        "classes": classes}
+
+# --------------------------------------------------------------------------
+##
+# @brief the scheduler of the server
+#
+# --------------------------------------------------------------------------
+SCHEDULER = Scheduler()
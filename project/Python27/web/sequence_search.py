@@ -0,0 +1,313 @@
+##
+# @file sequence_search.py
+# @brief find the parts holding a dna motif with a k-mer index
+# @author SYSU-Software
+# @version 1.0
+# @date 2026-10-19
+# @copyright 2013 SYSU-Software. All rights reserved.
+# This project is released under MIT License.
+#
+
+import os
+import mmap
+import array
+import struct
+import itertools
+import part_store
+import storage
+from part_search import UserPartSync
+
+# length of the indexed k-mers, a motif needs one of them, a shorter one
+# would be searched by scanning every part inside the event loop
+K = 6
+
+# every k-mer over acgt and its number, k-mers with other bases are not
+# indexed
+KMERS = ["".join(p) for p in itertools.product(part_store.BASES, repeat = K)]
+KMER_CODE = dict((kmer, i) for i, kmer in enumerate(KMERS))
+
+COMPLEMENT = dict(zip("acgtnACGTN", "tgcanTGCAN"))
+
+# --------------------------------------------------------------------------
+##
+# @brief layout of the index file written next to the store
+#
+#        file    := magic, uint32 k, float64 mtime and uint32 size of the
+#                   store it belongs to, uint32 offset per k-mer plus one for
+#                   the end, uint32 store entry numbers of the postings
+#
+# --------------------------------------------------------------------------
+MAGIC = "IGEMKMR1"
+HEADER = struct.Struct("<8sIdI")
+
+# --------------------------------------------------------------------------
+##
+# @brief get the reverse complement of a sequence
+#
+# --------------------------------------------------------------------------
+def reverse_complement(sequence):
+  return "".join([COMPLEMENT.get(b, b) for b in reversed(sequence)])
+
+# --------------------------------------------------------------------------
+##
+# @brief check a motif before it is searched
+#
+# @param motif  the motif as sent
+#
+# @returns   the motif
+#
+# @throws ValueError  when it has no K bases of acgt in a row
+#
+# --------------------------------------------------------------------------
+def searchable(motif):
+  if not isinstance(motif, basestring):
+    raise TypeError("expected a string")
+  if not kmer_codes("".join(motif.split()).lower()):
+    raise ValueError("a motif needs %d bases of acgt in a row" % K)
+  return motif
+
+# --------------------------------------------------------------------------
+##
+# @brief get the numbers of the k-mers of a sequence
+#
+# @param sequence  lower case dna sequence
+#
+# @returns   set of k-mer numbers
+#
+# --------------------------------------------------------------------------
+def kmer_codes(sequence):
+  kmers = set([sequence[i:i + K] for i in xrange(len(sequence) - K + 1)])
+  return set([KMER_CODE[k] for k in kmers if k in KMER_CODE])
+
+# --------------------------------------------------------------------------
+##
+# @brief find every position of a motif in a sequence
+#
+# @returns   list of start positions, 0 based
+#
+# --------------------------------------------------------------------------
+def positions(sequence, motif):
+  found = []
+  i = sequence.find(motif)
+  while i != -1:
+    found.append(i)
+    i = sequence.find(motif, i + 1)
+  return found
+
+# --------------------------------------------------------------------------
+##
+# @brief  k-mer inverted index of the sequences in the part store and of the
+#         parts uploaded by users, persisted next to the store
+# ----------------------------------------------------------------------------
+class SequenceIndex(object):
+  # --------------------------------------------------------------------------
+  ##
+  # @brief load the index of a store, or build and save it when the store
+  #        changed since it was written
+  #
+  # @param store  PartStore
+  #
+  # --------------------------------------------------------------------------
+  def __init__(self, store):
+    self.store = store
+    self.path = store.path + ".kmer"
+    st = os.stat(store.file)
+    self.stamp = (st.st_mtime, st.st_size)
+    self.buf = None
+    if not self.load():
+      self.save(self.build())
+      self.load()
+    self.user_sync = UserPartSync()
+    self.user_parts = {}
+    self.user_postings = {}
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief collect the postings of every part of the store
+  #
+  # @returns   list of the entry numbers of the parts per k-mer
+  #
+  # --------------------------------------------------------------------------
+  def build(self):
+    postings = [[] for i in xrange(len(KMERS))]
+    for i, part in enumerate(self.store):
+      for code in kmer_codes(part.sequence().lower()):
+        postings[code].append(i)
+    return postings
+
+  def save(self, postings):
+    offsets = array.array("I", [0])
+    for posting in postings:
+      offsets.append(offsets[-1] + len(posting))
+    tmp_path = storage.staging_path(self.path)
+    fp = open(tmp_path, "wb")
+    try:
+      fp.write(HEADER.pack(MAGIC, K, *self.stamp))
+      fp.write(offsets.tostring())
+      for posting in postings:
+        fp.write(array.array("I", posting).tostring())
+    finally:
+      fp.close()
+    # other processes may have the old index mapped
+    storage.publish(tmp_path, self.path)
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief map the index file if it belongs to the current store
+  #
+  # @returns   whether it was loaded
+  #
+  # --------------------------------------------------------------------------
+  def load(self):
+    path = storage.current_generation(self.path)
+    if not os.path.exists(path):
+      return False
+    fp = open(path, "rb")
+    try:
+      buf = mmap.mmap(fp.fileno(), 0, access = mmap.ACCESS_READ)
+    finally:
+      fp.close()
+    magic, k, mtime, size = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or k != K or (mtime, size) != self.stamp:
+      buf.close()
+      return False
+    self.buf = buf
+    self.offsets_at = HEADER.size
+    self.postings_at = HEADER.size + 4 * (len(KMERS) + 1)
+    return True
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief get the store entry numbers of the parts holding a k-mer
+  #
+  # --------------------------------------------------------------------------
+  def posting(self, code):
+    start, end = struct.unpack_from("<II", self.buf, self.offsets_at + 4 * code)
+    return array.array("I", self.buf[self.postings_at + 4 * start:
+      self.postings_at + 4 * end])
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief index the userPart rows that changed since the last search
+  #
+  # @param db  database instance
+  #
+  # --------------------------------------------------------------------------
+  def sync_user_parts(self, db):
+    added, removed = self.user_sync.changes(db)
+    for row in removed:
+      part = self.user_parts.pop(row["rowid"])
+      for code in part["codes"]:
+        self.user_postings[code].discard(row["rowid"])
+    for row in added:
+      part = dict(row)
+      part["sequence"] = (row["sequence"] or "").lower()
+      part["codes"] = kmer_codes(part["sequence"])
+      self.user_parts[row["rowid"]] = part
+      for code in part["codes"]:
+        self.user_postings.setdefault(code, set()).add(row["rowid"])
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief intersect the postings of the k-mers of a motif
+  #
+  # @param motif  lower case motif
+  #
+  # @returns   (set of store entry numbers, set of userPart rowids)
+  #
+  # @throws ValueError  when the motif has no indexed k-mer
+  #
+  # --------------------------------------------------------------------------
+  def candidates(self, motif):
+    codes = kmer_codes(motif)
+    if not codes:
+      raise ValueError("a motif needs %d bases of acgt in a row" % K)
+    postings = sorted([self.posting(c) for c in codes], key = len)
+    parts = set(postings[0])
+    for posting in postings[1:]:
+      if not parts:
+        break
+      parts.intersection_update(posting)
+    users = None
+    for code in codes:
+      rowids = self.user_postings.get(code, set())
+      users = set(rowids) if users is None else users & rowids
+    return parts, users
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief find the parts holding a motif on either strand, every candidate
+  #        of the index is checked against its sequence
+  #
+  # @param motif  dna motif
+  # @param limit  max number of parts returned
+  #
+  # @returns   dict with the total number of parts and the first ones with
+  #            the positions of the motif
+  #
+  # --------------------------------------------------------------------------
+  def find(self, motif, limit = 100):
+    motif = "".join(motif.split()).lower()
+    if not motif:
+      return {"sequence": motif, "total": 0, "results": []}
+    strands = [("+", motif)]
+    reverse = reverse_complement(motif)
+    if reverse != motif:
+      strands.append(("-", reverse))
+    found = {}
+    for strand, query in strands:
+      parts, users = self.candidates(query)
+      for i in parts:
+        key, offset, length = self.store.entry(i)
+        part = part_store.StoredPart(self.store, key, offset)
+        starts = positions(part.sequence().lower(), query)
+        if starts:
+          found.setdefault(("biobrick", key), {"name": key,
+            "path": part.client_path(),
+            "type": part.type, "source": "biobrick", "matches": []}
+            )["matches"].extend([{"strand": strand, "start": s}
+              for s in starts])
+      for rowid in users:
+        row = self.user_parts[rowid]
+        starts = positions(row["sequence"], query)
+        if starts:
+          found.setdefault(("user", rowid), {"name": row["part_name"],
+            "part_id": row["part_id"], "type": row["part_type"],
+            "source": "user", "matches": []})["matches"].extend(
+              [{"strand": strand, "start": s} for s in starts])
+    results = [found[k] for k in sorted(found)]
+    return {"sequence": motif, "total": len(results),
+        "results": results[:limit]}
+
+__default = []
+
+# --------------------------------------------------------------------------
+##
+# @brief get the sequence index of the part store, loaded on first use and
+#        again for a new store
+#
+# @returns   the shared SequenceIndex
+#
+# --------------------------------------------------------------------------
+def default_index():
+  store = part_store.default_store()
+  if not __default or __default[0].store is not store:
+    __default[:] = [SequenceIndex(store)]
+  return __default[0]
+
+# --------------------------------------------------------------------------
+##
+# @brief find the biobrick and user parts holding a motif
+#
+# @param db        database instance
+# @param sequence  dna motif, with K bases of acgt in a row
+# @param limit     max number of parts returned, at most 1000
+#
+# @returns   dict with the total number of parts and the first ones with
+#            the positions of the motif
+#
+# --------------------------------------------------------------------------
+def find_parts_by_sequence(db, sequence, limit = 100):
+  index = default_index()
+  index.sync_user_parts(db)
+  return index.find(sequence, max(1, min(int(limit), 1000)))
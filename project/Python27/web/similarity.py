@@ -0,0 +1,291 @@
+##
+# @file similarity.py
+# @brief find registry and user parts with nearly the same sequence
+# @author SYSU-Software
+# @version 1.0
+# @date 2026-10-19
+# @copyright 2013 SYSU-Software. All rights reserved.
+# This project is released under MIT License.
+#
+# usage: python web/similarity.py [-d igem.db] [-t 0.9]
+#
+
+import os
+import math
+import zlib
+import heapq
+import array
+import struct
+import argparse
+from collections import defaultdict
+import part_store
+import storage
+from part_search import UserPartSync
+
+# length of the shingles a sequence is cut into
+SHINGLE = 12
+# number of smallest shingle hashes kept per sequence (bottom-k minhash)
+SKETCH_SIZE = 128
+# parts sharing the most sketch hashes that are compared exactly
+CANDIDATES = 50
+# estimated identity from which an upload is flagged as a near duplicate
+DUPLICATE_IDENTITY = 0.9
+
+MAGIC = "IGEMMNH1"
+HEADER = struct.Struct("<8sIIdI")
+
+# --------------------------------------------------------------------------
+##
+# @brief get the bottom-k minhash sketch of a sequence
+#
+# @param sequence  dna sequence
+#
+# @returns   sorted list of the smallest shingle hashes
+#
+# --------------------------------------------------------------------------
+def sketch(sequence):
+  sequence = (sequence or "").lower()
+  if isinstance(sequence, unicode):
+    sequence = sequence.encode("utf-8")
+  shingles = set([sequence[i:i + SHINGLE]
+      for i in xrange(len(sequence) - SHINGLE + 1)])
+  return sorted(heapq.nsmallest(SKETCH_SIZE, [zlib.crc32(s) & 0xffffffff
+    for s in shingles]))
+
+# --------------------------------------------------------------------------
+##
+# @brief estimate the jaccard index of the shingle sets of two sketches
+#
+# @returns   value between 0 and 1
+#
+# --------------------------------------------------------------------------
+def jaccard(a, b):
+  union = heapq.nsmallest(SKETCH_SIZE, set(a) | set(b))
+  if not union:
+    return 0.0
+  both = set(a) & set(b)
+  return float(len([h for h in union if h in both])) / len(union)
+
+# --------------------------------------------------------------------------
+##
+# @brief turn a jaccard index of shingles into an estimated sequence
+#        identity, the mash distance
+#
+# --------------------------------------------------------------------------
+def identity(j):
+  if j <= 0:
+    return 0.0
+  return max(0.0, 1 + math.log(2 * j / (1 + j)) / SHINGLE)
+
+# --------------------------------------------------------------------------
+##
+# @brief  minhash sketches of the part store and of the user parts, with an
+#         inverted index from hash to parts so a query only looks at parts
+#         sharing at least one hash
+# ----------------------------------------------------------------------------
+class SimilarityIndex(object):
+  # --------------------------------------------------------------------------
+  ##
+  # @brief load the sketches of a store, or compute and save them when the
+  #        store changed since they were written
+  #
+  # @param store  PartStore
+  #
+  # --------------------------------------------------------------------------
+  def __init__(self, store):
+    self.store = store
+    self.path = store.path + ".minhash"
+    st = os.stat(store.file)
+    self.stamp = (st.st_mtime, st.st_size)
+    self.sketches = {}
+    self.postings = defaultdict(list)
+    sketches = self.load()
+    if sketches is None:
+      sketches = [sketch(part.sequence()) for part in store]
+      self.save(sketches)
+    keys = store.keys()
+    for i, s in enumerate(sketches):
+      self.add(("biobrick", keys[i]), s)
+    self.user_sync = UserPartSync()
+
+  def load(self):
+    if not os.path.exists(self.path):
+      return None
+    with open(self.path, "rb") as fp:
+      data = fp.read()
+    magic, shingle, size, mtime, file_size = HEADER.unpack_from(data)
+    if magic != MAGIC or (shingle, size) != (SHINGLE, SKETCH_SIZE) or\
+        (mtime, file_size) != self.stamp:
+      return None
+    sketches = []
+    offset = HEADER.size
+    for i in xrange(len(self.store)):
+      count, = struct.unpack_from("<I", data, offset)
+      offset += 4
+      sketches.append(array.array("I", data[offset:offset + 4 * count])\
+          .tolist())
+      offset += 4 * count
+    return sketches
+
+  def save(self, sketches):
+    tmp_path = storage.staging_path(self.path)
+    with open(tmp_path, "wb") as fp:
+      fp.write(HEADER.pack(MAGIC, SHINGLE, SKETCH_SIZE, *self.stamp))
+      for s in sketches:
+        fp.write(struct.pack("<I", len(s)) + array.array("I", s).tostring())
+    storage.replace_file(tmp_path, self.path)
+
+  def add(self, key, s):
+    self.sketches[key] = s
+    for h in s:
+      self.postings[h].append(key)
+
+  def remove(self, key):
+    for h in self.sketches.pop(key, ()):
+      self.postings[h].remove(key)
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief sketch the userPart rows that changed since the last look
+  #
+  # @param db  database instance
+  #
+  # --------------------------------------------------------------------------
+  def sync_user_parts(self, db):
+    added, removed = self.user_sync.changes(db)
+    for row in removed:
+      self.remove(("user", row["rowid"]))
+    for row in added:
+      self.add(("user", row["rowid"]), sketch(row["sequence"]))
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief find the parts most similar to a sequence
+  #
+  # @param sequence  dna sequence
+  # @param top       number of parts returned
+  # @param exclude   key of a part to leave out, e.g. the part itself
+  #
+  # @returns   list of (estimated identity, jaccard index, key), best first
+  #
+  # --------------------------------------------------------------------------
+  def similar(self, sequence, top = 5, exclude = None):
+    return self.similar_to_sketch(sketch(sequence), top, exclude)
+
+  def similar_to_sketch(self, s, top = 5, exclude = None):
+    shared = defaultdict(int)
+    for h in s:
+      for key in self.postings.get(h, ()):
+        shared[key] += 1
+    shared.pop(exclude, None)
+    candidates = heapq.nlargest(CANDIDATES, shared, key = shared.get)
+    scored = []
+    for key in candidates:
+      j = jaccard(s, self.sketches[key])
+      scored.append((identity(j), j, key))
+    return heapq.nlargest(top, scored)
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief describe a part for a reply
+  #
+  # --------------------------------------------------------------------------
+  def describe(self, match):
+    ident, j, (source, key) = match
+    if source == "biobrick":
+      part = self.store.get(key)
+      result = {"name": key, "type": part.type,
+          "path": part.client_path()}
+    else:
+      row = self.user_sync.rows[key]
+      result = {"name": row["part_name"], "part_id": row["part_id"],
+          "type": row["part_type"]}
+    result.update({"source": source, "identity": round(ident, 4),
+      "jaccard": round(j, 4)})
+    return result
+
+__default = []
+
+# --------------------------------------------------------------------------
+##
+# @brief get the similarity index of the part store, loaded on first use and
+#        again for a new store
+#
+# @returns   the shared SimilarityIndex
+#
+# --------------------------------------------------------------------------
+def default_index():
+  store = part_store.default_store()
+  if not __default or __default[0].store is not store:
+    __default[:] = [SimilarityIndex(store)]
+  return __default[0]
+
+# --------------------------------------------------------------------------
+##
+# @brief find the registry and user parts most similar to a sequence
+#
+# @param db        database instance
+# @param sequence  dna sequence
+# @param top       number of parts returned, at most 50
+#
+# @returns   list of parts with their estimated identity, best first
+#
+# --------------------------------------------------------------------------
+def find_similar_parts(db, sequence, top = 5):
+  index = default_index()
+  index.sync_user_parts(db)
+  top = max(1, min(int(top), CANDIDATES))
+  return [index.describe(m) for m in index.similar(sequence, top)]
+
+# --------------------------------------------------------------------------
+##
+# @brief get the parts an upload nearly duplicates
+#
+# @param db        database instance
+# @param sequence  dna sequence of the upload
+#
+# @returns   list of parts with an estimated identity of at least
+#            DUPLICATE_IDENTITY
+#
+# --------------------------------------------------------------------------
+def near_duplicates(db, sequence):
+  return [m for m in find_similar_parts(db, sequence)
+      if m["identity"] >= DUPLICATE_IDENTITY]
+
+# --------------------------------------------------------------------------
+##
+# @brief list every user part that nearly duplicates a registry part or an
+#        earlier user part
+#
+# @param db         database instance
+# @param threshold  estimated identity from which parts are reported
+#
+# @returns   list of dicts with the user part and its near duplicates
+#
+# --------------------------------------------------------------------------
+def dedup_report(db, threshold = DUPLICATE_IDENTITY):
+  index = default_index()
+  index.sync_user_parts(db)
+  report = []
+  for rowid, row in sorted(index.user_sync.rows.iteritems()):
+    key = ("user", rowid)
+    matches = [m for m in index.similar_to_sketch(index.sketches[key],
+      exclude = key) if m[0] >= threshold and (m[2][0] == "biobrick" or
+        m[2][1] < rowid)]
+    if matches:
+      report.append({"part_id": row["part_id"], "name": row["part_name"],
+        "uploadUser": row["uploadUser"],
+        "duplicates": [index.describe(m) for m in matches]})
+  return report
+
+if __name__ == "__main__":
+  import json
+  import database
+  parser = argparse.ArgumentParser(description = "report user parts that "
+      "nearly duplicate registry or other user parts")
+  parser.add_argument("-d", "--database", default = "igem.db")
+  parser.add_argument("-t", "--threshold", type = float,
+      default = DUPLICATE_IDENTITY, help = "estimated identity, 0 to 1")
+  args = parser.parse_args()
+  db = database.SqliteDatabase(args.database)
+  print json.dumps(dedup_report(db, args.threshold), indent = 2)
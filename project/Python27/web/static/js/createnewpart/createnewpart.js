@@ -542,6 +542,11 @@ $().ready(function() {
             {
             	if(message.result=='add user part success!')
 					alert('add user part to database success!');
+				else if(message.result.similar)
+					alert('add user part to database success!\nIt looks like a copy of: '+
+						$.map(message.result.similar,function(part){
+							return part.name+' ('+Math.round(part.identity*100)+'%)';
+						}).join(', '));
             }
         };
     }
@@ -407,7 +407,8 @@ dTree.prototype.s = function(id) {
 
 		ws.send(JSON.stringify({
 			'request' : 'getXmlJson',
-			'path' : this.aNodes[id].path
+			'path' : this.aNodes[id].path,
+			'fields' : ['summary']
 		}));
 	} else {
 		ws.send(JSON.stringify({
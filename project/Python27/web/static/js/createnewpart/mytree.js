@@ -127,7 +127,8 @@ Tree.prototype = {
 
 					ws.send(JSON.stringify({
 						'request' : 'getXmlJson',
-						'path' : node.path
+						'path' : node.path,
+						'fields' : ['summary']
 					}));
 				}
 			});
@@ -915,19 +915,51 @@ var getDataCollection = function() {
 }
 
 
+/* the circuit the server keeps for this page, edits are sent as patches */
+var circuitSession = {
+	id: null,
+	version: 0,
+	doc: null,     // the circuit of the server at version
+	sent: null,    // dataCollection the edits are taken against
+	edited: null,  // doc with the edits of the pending update
+	queued: false, // edits made while an update was pending
+	reset: function() {
+		this.id = null;
+		this.doc = this.sent = this.edited = null;
+		this.queued = false;
+	},
+	/* apply the reply of updateCircuitSession, returns the new circuit */
+	update: function(result) {
+		this.id = result.session;
+		this.version = result.version;
+		this.doc = jsonPatch.apply(this.edited, result.patch);
+		this.edited = null;
+		return this.doc;
+	}
+}
+
 /* genecircuit */
 var randomValue = function() {
-	var data = {};
 	dataCollection = getDataCollection();
-	data.gene_circuit = dataCollection;
-	data.detail = detail;
-
 	console.log("detail dataCollection", {'detail':detail, 'gene_circuit':dataCollection});
 
-	ws.send(JSON.stringify({
-		'request': 'updateGeneCircuit',
-		'data': {'detail':detail, 'gene_circuit':dataCollection},
-	}));
+	if(circuitSession.edited) {
+		// sent once the pending update is back, against its circuit
+		circuitSession.queued = true;
+		return;
+	}
+	var message = {'request': 'updateCircuitSession', 'detail': detail};
+	if(circuitSession.id) {
+		message.session = circuitSession.id;
+		message.version = circuitSession.version;
+		message.patch = jsonPatch.diff(circuitSession.sent, dataCollection);
+		circuitSession.edited = jsonPatch.apply(jsonPatch.clone(circuitSession.doc), message.patch);
+	} else {
+		message.gene_circuit = dataCollection;
+		circuitSession.edited = jsonPatch.clone(dataCollection);
+	}
+	circuitSession.sent = jsonPatch.clone(dataCollection);
+	ws.send(JSON.stringify(message));
 	/* send message */
 }
 
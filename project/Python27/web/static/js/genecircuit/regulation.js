@@ -266,6 +266,10 @@ $().ready(function() {
 			} else if (message.request == "loadSBOL") {
 				console.log("loadSBOL", message);
 			} else if (message.request == "updateGeneCircuit") {
+				if(message.result.superseded) {
+					// a newer update of the same slider is on its way
+					return;
+				}
 				console.log("kakakakakakka");
          console.log("updateGeneCircuit", message.result); 
 				genecircuitData = message.result;
@@ -276,10 +280,37 @@ $().ready(function() {
 										'gene_circuit':JSON.stringify(genecircuitData),
 										'corepind':{},
 				}));
+			} else if (message.request == "updateCircuitSession") {
+				if(message.result.superseded) {
+					// the reply of the newer update brings the circuit
+					return;
+				}
+				if(message.result.conflict || message.result.expired || message.result.invalid) {
+					// another update came first, the server forgot the circuit
+					// or could not apply the edits to it
+					circuitSession.reset();
+					randomValue();
+					return;
+				}
+				genecircuitData = circuitSession.update(message.result);
+				updateGen(jsonPatch.clone(genecircuitData));
+				circuitSession.sent = getDataCollection();
+				if(circuitSession.queued) {
+					circuitSession.queued = false;
+					randomValue();
+					return;
+				}
+				ws.send(JSON.stringify({'request'     : 'Simulate',
+										'isStochastic': false,
+										'isDelay': false,
+										'session': circuitSession.id,
+										'corepind':{},
+				}));
 			} else if (message.request == "getBiobrickPath") {
 				ws.send(JSON.stringify({ 
 					'request': 'getXmlJson', 
 					'path': message.result.replace(/\\/g, "/"),
+					'fields': ['summary']
 				})); 
 
 				$("#right-container").css({right: '0px'});
@@ -0,0 +1,90 @@
+/*
+ * Json patches (add, remove and replace) of the gene circuit, see
+ * web/circuit_session.py.
+ *
+ * Interfaces:
+ * ops = jsonPatch.diff(oldDoc, newDoc);
+ * doc = jsonPatch.apply(doc, ops);  // changes doc in place
+ * copy = jsonPatch.clone(doc);
+ */
+
+(function() {
+
+function escapeKey(key) {
+  return String(key).replace(/~/g, "~0").replace(/\//g, "~1");
+}
+
+function unescapeKey(token) {
+  return token.replace(/~1/g, "/").replace(/~0/g, "~");
+}
+
+function isObject(value) {
+  return value !== null && typeof value == "object" &&
+      !(value instanceof Array);
+}
+
+function diffInto(ops, oldDoc, newDoc, path) {
+  if (isObject(oldDoc) && isObject(newDoc)) {
+    for (var key in oldDoc) {
+      if (!(key in newDoc)) {
+        ops.push({op: "remove", path: path + "/" + escapeKey(key)});
+      }
+    }
+    for (var key in newDoc) {
+      if (!(key in oldDoc)) {
+        ops.push({op: "add", path: path + "/" + escapeKey(key),
+            value: newDoc[key]});
+      } else {
+        diffInto(ops, oldDoc[key], newDoc[key], path + "/" + escapeKey(key));
+      }
+    }
+  } else if (oldDoc instanceof Array && newDoc instanceof Array &&
+      oldDoc.length == newDoc.length) {
+    for (var i = 0; i < oldDoc.length; i++) {
+      diffInto(ops, oldDoc[i], newDoc[i], path + "/" + i);
+    }
+  } else if (JSON.stringify(oldDoc) !== JSON.stringify(newDoc)) {
+    ops.push({op: "replace", path: path, value: newDoc});
+  }
+}
+
+function apply(doc, ops) {
+  for (var i = 0; i < ops.length; i++) {
+    var op = ops[i];
+    if (op.path == "") {
+      doc = op.value;
+      continue;
+    }
+    var tokens = op.path.split("/").slice(1);
+    var parent = doc;
+    for (var j = 0; j < tokens.length - 1; j++) {
+      parent = parent[unescapeKey(tokens[j])];
+    }
+    var key = unescapeKey(tokens[tokens.length - 1]);
+    if (parent instanceof Array) {
+      var index = key == "-" ? parent.length : parseInt(key, 10);
+      if (op.op == "add") parent.splice(index, 0, op.value);
+      else if (op.op == "remove") parent.splice(index, 1);
+      else parent[index] = op.value;
+    } else if (op.op == "remove") {
+      delete parent[key];
+    } else {
+      parent[key] = op.value;
+    }
+  }
+  return doc;
+}
+
+window.jsonPatch = {
+  diff: function(oldDoc, newDoc) {
+    var ops = [];
+    diffInto(ops, oldDoc, newDoc, "");
+    return ops;
+  },
+  apply: apply,
+  clone: function(doc) {
+    return JSON.parse(JSON.stringify(doc));
+  }
+};
+
+})();
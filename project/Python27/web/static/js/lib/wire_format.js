@@ -0,0 +1,120 @@
+/*
+ * Decoder of the binary websocket messages, see web/wire_format.py.
+ *
+ * Interfaces:
+ * message = wireFormat.decode(arrayBuffer);
+ *
+ * Open the websocket with ?encoding=msgpack and set
+ * ws.binaryType = "arraybuffer", text messages stay json.
+ */
+
+(function() {
+
+var FLAG_DEFLATE = 0x01;
+var FLAG_MSGPACK = 0x02;
+var EXT_FLOAT64 = 1;
+var EXT_FLOAT32 = 2;
+
+function Reader(buffer, offset) {
+  this.buffer = buffer;
+  this.view = new DataView(buffer);
+  this.offset = offset;
+}
+
+Reader.prototype.take = function(n) {
+  var offset = this.offset;
+  this.offset += n;
+  return offset;
+};
+
+Reader.prototype.str = function(n) {
+  var bytes = new Uint8Array(this.buffer, this.take(n), n);
+  var s = "";
+  for (var i = 0; i < bytes.length; i++) {
+    s += String.fromCharCode(bytes[i]);
+  }
+  return decodeURIComponent(escape(s));
+};
+
+Reader.prototype.list = function(n) {
+  var values = [];
+  for (var i = 0; i < n; i++) {
+    values.push(this.value());
+  }
+  return values;
+};
+
+Reader.prototype.map = function(n) {
+  var values = {};
+  for (var i = 0; i < n; i++) {
+    var key = this.value();
+    values[key] = this.value();
+  }
+  return values;
+};
+
+Reader.prototype.floats = function(n, ext) {
+  // copied, typed arrays need aligned offsets
+  var data = this.buffer.slice(this.offset, this.offset + n);
+  this.take(n);
+  var values = ext == EXT_FLOAT64 ? new Float64Array(data) :
+      new Float32Array(data);
+  return Array.prototype.slice.call(values);
+};
+
+Reader.prototype.value = function() {
+  var v = this.view;
+  var b = v.getUint8(this.take(1));
+  if (b < 0x80) return b;
+  if (b >= 0xe0) return b - 0x100;
+  if (b <= 0x8f) return this.map(b & 0x0f);
+  if (b <= 0x9f) return this.list(b & 0x0f);
+  if (b <= 0xbf) return this.str(b & 0x1f);
+  switch (b) {
+    case 0xc0: return null;
+    case 0xc2: return false;
+    case 0xc3: return true;
+    case 0xc7: var n = v.getUint8(this.take(1));
+               return this.floats(n, v.getInt8(this.take(1)));
+    case 0xc8: var n = v.getUint16(this.take(2));
+               return this.floats(n, v.getInt8(this.take(1)));
+    case 0xc9: var n = v.getUint32(this.take(4));
+               return this.floats(n, v.getInt8(this.take(1)));
+    case 0xca: return v.getFloat32(this.take(4));
+    case 0xcb: return v.getFloat64(this.take(8));
+    case 0xcc: return v.getUint8(this.take(1));
+    case 0xcd: return v.getUint16(this.take(2));
+    case 0xce: return v.getUint32(this.take(4));
+    case 0xcf: return v.getUint32(this.take(4)) * 4294967296 +
+                   v.getUint32(this.take(4));
+    case 0xd0: return v.getInt8(this.take(1));
+    case 0xd1: return v.getInt16(this.take(2));
+    case 0xd2: return v.getInt32(this.take(4));
+    case 0xd3: return v.getInt32(this.take(4)) * 4294967296 +
+                   v.getUint32(this.take(4));
+    case 0xd9: return this.str(v.getUint8(this.take(1)));
+    case 0xda: return this.str(v.getUint16(this.take(2)));
+    case 0xdb: return this.str(v.getUint32(this.take(4)));
+    case 0xdc: return this.list(v.getUint16(this.take(2)));
+    case 0xdd: return this.list(v.getUint32(this.take(4)));
+    case 0xde: return this.map(v.getUint16(this.take(2)));
+    case 0xdf: return this.map(v.getUint32(this.take(4)));
+  }
+  throw new Error("unsupported msgpack type " + b);
+};
+
+window.wireFormat = {
+  decode: function(buffer) {
+    var flags = new Uint8Array(buffer, 0, 1)[0];
+    if (flags & FLAG_DEFLATE) {
+      throw new Error("deflated messages are not supported here");
+    }
+    var reader = new Reader(buffer, 1);
+    if (flags & FLAG_MSGPACK) {
+      return reader.value();
+    }
+    return JSON.parse(reader.str(buffer.byteLength - 1));
+  }
+};
+
+})();
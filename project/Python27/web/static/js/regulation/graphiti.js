@@ -1136,7 +1136,8 @@ g.Buttons.Unbind = graphiti.shape.icon.CoExpress.extend({
         if (ctx.path) {
             ws.send(JSON.stringify({
                 'request': 'getXmlJson',
-                'path': ctx.path
+                'path': ctx.path,
+                'fields': ['summary']
             }));
         }
 
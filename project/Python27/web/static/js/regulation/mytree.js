@@ -128,7 +128,8 @@ Tree.prototype = {
 
 					ws.send(JSON.stringify({
 						'request' : 'getXmlJson',
-						'path' : node.path.replace(/\\/g,"/")
+						'path' : node.path.replace(/\\/g,"/"),
+						'fields' : ['summary']
 					}));
 				}
 			});
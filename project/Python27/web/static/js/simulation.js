@@ -4,6 +4,19 @@ var time, dt;
 var proteinNames=[];
 var inducerList=[[2,'inducer1'],[7,'inducer2']];
 var corepind ={}; //{5: {"time": 20},7: {"time": 60}}
+var streamData = {}; // curves of a streamed simulation received so far
+function appendChunk(chunk)
+{
+  for (var name in chunk.data) {
+    streamData[name] = (streamData[name] || []).concat(chunk.data[name]);
+  }
+}
+function drawCurves(raw_data)
+{
+  var width1 = document.getElementById('canvasDiv').clientWidth -parseInt(document.getElementById('canvasDiv').style.left);
+  var height1 = document.getElementById('canvasDiv').clientHeight -parseInt(document.getElementById('canvasDiv').style.top);
+  run(turnRawDatatoData(raw_data),'canvasDiv', width1, height1, time, dt);
+}
 function stateOnChange(obj)
 {
 	//ws.send(JSON.stringify({'request': 'getLoginedUserName'}));
@@ -15,7 +28,8 @@ function stateOnChange(obj)
                             'isStochastic': isStochastic,
                             'isDelay'     : isDelay,
                             'gene_circuit': gene_circuit,
-                            'corepind'    : corepind
+                            'corepind'    : corepind,
+                            'stream'      : true
     }));
 	$('#mymodal').modal({keyboard:false});
 }
@@ -27,13 +41,34 @@ $(document).ready(function () {
 		window.location.pathname = "/genecircuit";
 	});
   if ("WebSocket" in window) {
-    ws = new WebSocket("ws://" + document.domain + ":5000/ws");
+    // the curves come as msgpack float arrays instead of json numbers
+    ws = new WebSocket("ws://" + document.domain + ":5000/ws?encoding=msgpack");
+    ws.binaryType = "arraybuffer";
     ws.onmessage = function (msg) {
-      var message = JSON.parse(msg.data);
+      var message = typeof msg.data == "string" ? JSON.parse(msg.data) :
+          wireFormat.decode(msg.data);
       if (message.request == "Simulate") { 
+        if (message.result.seq !== undefined && !message.result.done) {
+          // a chunk of the curves, drawn as soon as it arrives
+          if (message.result.seq == 0) {
+            // the axes are set before the first chunk is drawn
+            streamData = {};
+            time = message.result.time;
+            dt = message.result.dt;
+          }
+          appendChunk(message.result);
+          drawCurves(streamData);
+          return;
+        }
 	  	$('#mymodal').modal('hide');       
-        raw_data = message.result.data;
-        proteinNames = Object.keys(message.result.data);
+        if (message.result.error) {
+          streamData = {};
+          alert(message.result.error);
+          return;
+        }
+        raw_data = message.result.done ? streamData : message.result.data;
+        streamData = {};
+        proteinNames = Object.keys(raw_data);
         data = turnRawDatatoData(raw_data);
         time = message.result.time;
         dt = message.result.dt;
@@ -88,7 +123,8 @@ $(document).ready(function () {
                             'isStochastic': isStochastic,
                             'isDelay'     : isDelay,
                             'gene_circuit': gene_circuit,
-                            'corepind'    : corepind
+                            'corepind'    : corepind,
+                            'stream'      : true
     }));
 	$('#mymodal').modal({keyboard:false});
   };
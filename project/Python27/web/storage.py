@@ -0,0 +1,210 @@
+##
+# @file storage.py
+# @brief layout of the reference catalog and the user database
+# @author SYSU-Software
+# @version 1.0
+# @date 2026-10-19
+# @copyright 2013 SYSU-Software. All rights reserved.
+# This project is released under MIT License.
+#
+
+import os
+import sqlite3
+import change_log
+
+# flags of MoveFileEx on windows
+MOVEFILE_REPLACE_EXISTING = 0x1
+MOVEFILE_WRITE_THROUGH = 0x8
+
+# --------------------------------------------------------------------------
+##
+# @brief tables of reference data shipped with the app, they live in the
+#        read-only catalog database, every other table is user data
+#
+# --------------------------------------------------------------------------
+CATALOG_TABLES = frozenset(["promoter", "RBS", "relation", "repressor",
+  "activator", "terminator", "Inducer", "Corepressor", "plasmid_backbone",
+  "Protein", "expression_value", "P_R_I"])
+
+# --------------------------------------------------------------------------
+##
+# @brief tell whether a table belongs to the catalog
+#
+# @param table  table name
+#
+# @returns   True for catalog tables
+#
+# --------------------------------------------------------------------------
+def is_catalog_table(table):
+  return table in CATALOG_TABLES
+
+# --------------------------------------------------------------------------
+##
+# @brief get paths of the catalog and user database next to a seed database
+#
+# @param seed  path to the seed database, igem.db by default
+#
+# @returns   (catalog path, user path)
+#
+# --------------------------------------------------------------------------
+def split_paths(seed = "igem.db"):
+  root = os.path.dirname(seed)
+  return os.path.join(root, "catalog.db"), os.path.join(root, "user.db")
+
+# --------------------------------------------------------------------------
+##
+# @brief copy the tables of the seed database into the catalog database and
+#        the user database, the seed itself is left untouched
+#
+# @param seed          path to the seed database
+# @param catalog_path  path to the catalog database to create
+# @param user_path     path to the user database to create
+#
+# --------------------------------------------------------------------------
+def split_database(seed, catalog_path, user_path):
+  for path, wanted in ((catalog_path, True), (user_path, False)):
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+      os.remove(tmp_path)
+    cx = sqlite3.connect(tmp_path)
+    cx.execute("ATTACH DATABASE ? AS seed", (seed, ))
+    schema = cx.execute("""SELECT type, tbl_name, sql FROM seed.sqlite_master
+        WHERE sql IS NOT NULL ORDER BY type DESC""").fetchall()
+    for s_type, table, sql in schema:
+      if is_catalog_table(table) != wanted:
+        continue
+      cx.execute(sql)
+      if s_type == "table":
+        cx.execute("INSERT INTO main.[%s] SELECT * FROM seed.[%s]" % (table,
+          table))
+    cx.commit()
+    cx.execute("DETACH DATABASE seed")
+    cx.close()
+    replace_file(tmp_path, path)
+
+# --------------------------------------------------------------------------
+##
+# @brief make sure the split databases exist, create them from the seed
+#        on the first start, and that both track their changes
+#
+# @param seed  path to the seed database
+#
+# @returns   (catalog path, user path), or None when there is nothing to use
+#
+# --------------------------------------------------------------------------
+def prepare(seed = "igem.db"):
+  catalog_path, user_path = split_paths(seed)
+  if not (os.path.exists(catalog_path) and os.path.exists(user_path)):
+    if not os.path.exists(seed):
+      return None
+    split_database(seed, catalog_path, user_path)
+  for path in (catalog_path, user_path):
+    cx = sqlite3.connect(path)
+    change_log.install(cx)
+    cx.close()
+  return catalog_path, user_path
+
+# --------------------------------------------------------------------------
+##
+# @brief move a file over another one in one step, readers that still have
+#        the old file open keep reading it until they reopen
+#
+# @param src  the new file
+# @param dst  the file to replace
+#
+# --------------------------------------------------------------------------
+def replace_file(src, dst):
+  if os.name != "nt":
+    os.rename(src, dst)
+    return
+  # os.rename does not overwrite on windows, MoveFileEx does so atomically
+  # as long as nobody has dst open without delete sharing
+  import ctypes
+  flags = MOVEFILE_REPLACE_EXISTING | MOVEFILE_WRITE_THROUGH
+  if not ctypes.windll.kernel32.MoveFileExW(unicode(src), unicode(dst),
+      flags):
+    raise ctypes.WinError()
+
+# --------------------------------------------------------------------------
+##
+# @brief get the generations publish() wrote of a file, path.1, path.2 ...
+#
+# @param path  path the file is known by, e.g. parts.store
+#
+# @returns   sorted list of (number, path)
+#
+# --------------------------------------------------------------------------
+def generations(path):
+  folder, name = os.path.split(path)
+  found = []
+  for entry in os.listdir(folder or "."):
+    suffix = entry[len(name) + 1:]
+    if entry.startswith(name + ".") and suffix.isdigit():
+      found.append((int(suffix), os.path.join(folder, entry)))
+  return sorted(found)
+
+# --------------------------------------------------------------------------
+##
+# @brief get the file to open for a file that publish() replaces
+#
+# @param path  path the file is known by
+#
+# @returns   path of the newest generation, path itself before the first
+#
+# --------------------------------------------------------------------------
+def current_generation(path):
+  found = generations(path)
+  return found[-1][1] if found else path
+
+# --------------------------------------------------------------------------
+##
+# @brief get a staging path for a new version of a file, unique to the
+#        process so two processes never write the same one
+#
+# --------------------------------------------------------------------------
+def staging_path(path):
+  return "%s.%d.tmp" % (path, os.getpid())
+
+# --------------------------------------------------------------------------
+##
+# @brief make a file the newest generation of a file others may have open
+#        or memory mapped, which windows does not let anyone replace or
+#        delete, readers that have an old generation keep it until they
+#        open current_generation() again
+#
+#        older generations are removed, those still mapped on windows by a
+#        later publish()
+#
+# @param src   the new file
+# @param path  path the file is known by
+#
+# @returns   path of the new generation
+#
+# --------------------------------------------------------------------------
+def publish(src, path):
+  old = generations(path)
+  number = old[-1][0] + 1 if old else 1
+  while True:
+    target = "%s.%d" % (path, number)
+    try:
+      if os.name == "nt":
+        # fails when target exists
+        os.rename(src, target)
+      else:
+        # unlike rename, link does not overwrite a target that another
+        # process published meanwhile
+        os.link(src, target)
+        os.remove(src)
+      break
+    except OSError:
+      if not os.path.exists(target):
+        raise
+      number += 1
+  for n, old_path in old + [(0, path)]:
+    try:
+      os.remove(old_path)
+    except OSError:
+      # still mapped, or the plain file of before the first generation is
+      # already gone
+      pass
+  return target
@@ -0,0 +1,136 @@
+##
+# @file test_circuit_session.py
+# @brief round trips of the json patches of the circuit sessions
+# @author SYSU-Software
+# @version 1.0
+# @date 2026-10-19
+# @copyright 2013 SYSU-Software. All rights reserved.
+# This project is released under MIT License.
+#
+# usage: cd web && python -m unittest test_circuit_session
+#
+
+import copy
+import unittest
+import circuit_session
+from circuit_session import diff, apply_patch, VersionConflict, PatchError
+
+CIRCUIT = {u"proteins": {u"BBa_C0012": {u"concen": 0.5, u"K1": None,
+  u"repress": True}}, u"plasmids": [[{u"sbol": [u"BBa_R0040",
+    u"BBa_B0034"], u"type": u"Positive"}], []], u"inducers": [u"IPTG"]}
+
+class PatchTest(unittest.TestCase):
+  def round_trip(self, old, new):
+    patched = apply_patch(copy.deepcopy(old), diff(old, new))
+    self.assertEqual(patched, new)
+    return patched
+
+  def test_no_change_gives_no_ops(self):
+    self.assertEqual(diff(CIRCUIT, copy.deepcopy(CIRCUIT)), [])
+
+  def test_dicts(self):
+    new = copy.deepcopy(CIRCUIT)
+    new[u"proteins"][u"BBa_C0012"][u"concen"] = 0.75
+    del new[u"proteins"][u"BBa_C0012"][u"K1"]
+    new[u"proteins"][u"BBa_C0062"] = {u"concen": 0.1}
+    self.round_trip(CIRCUIT, new)
+    self.assertEqual(diff(CIRCUIT[u"proteins"], new[u"proteins"])[0],
+        {u"op": u"remove", u"path": u"/BBa_C0012/K1"})
+
+  def test_lists(self):
+    new = copy.deepcopy(CIRCUIT)
+    new[u"plasmids"][0][0][u"sbol"][1] = u"BBa_B0032"
+    self.round_trip(CIRCUIT, new)
+    self.assertEqual(diff(CIRCUIT, new), [{u"op": u"replace",
+      u"path": u"/plasmids/0/0/sbol/1", u"value": u"BBa_B0032"}])
+    new[u"plasmids"].append([])
+    new[u"inducers"] = []
+    self.round_trip(CIRCUIT, new)
+
+  def test_escaped_keys(self):
+    old = {u"a/b": 1, u"m~n": {u"~1": 2}, u"": 3}
+    new = {u"a/b": 2, u"m~n": {u"~1": 3, u"/": 4}, u"": 4}
+    self.round_trip(old, new)
+    self.assertIn({u"op": u"add", u"path": u"/m~0n/~1", u"value": 4},
+        diff(old, new))
+
+  def test_bools_are_not_ints(self):
+    old = {u"repress": True, u"count": 1}
+    new = {u"repress": 1, u"count": True}
+    patched = self.round_trip(old, new)
+    self.assertIs(patched[u"count"], True)
+    self.assertIsNot(patched[u"repress"], True)
+
+  def test_root(self):
+    self.assertEqual(self.round_trip([1, 2], {u"a": 1}), {u"a": 1})
+    self.assertEqual(self.round_trip(1, 2), 2)
+    self.assertRaises(PatchError, apply_patch, {},
+        [{u"op": u"remove", u"path": u""}])
+
+  def test_list_add_and_remove(self):
+    doc = [1, 2, 3]
+    apply_patch(doc, [{u"op": u"add", u"path": u"/-", u"value": 4},
+      {u"op": u"add", u"path": u"/0", u"value": 0},
+      {u"op": u"remove", u"path": u"/2"}])
+    self.assertEqual(doc, [0, 1, 3, 4])
+
+  def test_conflicts(self):
+    doc = copy.deepcopy(CIRCUIT)
+    for op in ({u"op": u"replace", u"path": u"/proteins/BBa_C0062",
+        u"value": {}}, {u"op": u"remove", u"path": u"/inducer"},
+        {u"op": u"replace", u"path": u"/plasmids/5", u"value": []},
+        {u"op": u"remove", u"path": u"/plasmids/-1"},
+        {u"op": u"add", u"path": u"/plasmids/x", u"value": []},
+        {u"op": u"add", u"path": u"/inducers/0/name", u"value": 1},
+        {u"op": u"add", u"path": u"/missing/name", u"value": 1},
+        {u"op": u"add", u"path": u"inducers", u"value": 1},
+        {u"op": u"move", u"path": u"/inducers", u"from": u"/plasmids"},
+        {u"op": u"add", u"value": 1}, u"remove"):
+      self.assertRaises(PatchError, apply_patch, doc, [op])
+    self.assertEqual(doc, CIRCUIT)
+
+class SessionTest(unittest.TestCase):
+  def test_update(self):
+    session = circuit_session.CircuitSession(copy.deepcopy(CIRCUIT))
+    patch = [{u"op": u"replace", u"path": u"/inducers/0", u"value": u"aTc"}]
+    edited = session.edited(0, patch)
+    self.assertEqual(session.circuit, CIRCUIT)
+    self.assertEqual(edited[u"inducers"], [u"aTc"])
+    computed = copy.deepcopy(edited)
+    computed[u"proteins"][u"BBa_C0012"][u"concen"] = 0.25
+    reply = session.commit(0, edited, computed)
+    self.assertEqual(reply[u"version"], 1)
+    self.assertEqual(apply_patch(edited, reply[u"patch"]), computed)
+    self.assertEqual(session.circuit, computed)
+
+  def test_version_conflicts(self):
+    session = circuit_session.CircuitSession(copy.deepcopy(CIRCUIT))
+    first = session.edited(0, [])
+    second = session.edited(0, [])
+    session.commit(0, first, first)
+    # the other update of the same version finished second
+    self.assertRaises(VersionConflict, session.commit, 0, second, second)
+    self.assertRaises(VersionConflict, session.edited, 0, [])
+    self.assertEqual(session.version, 1)
+
+  def test_bad_patch(self):
+    session = circuit_session.CircuitSession(copy.deepcopy(CIRCUIT))
+    self.assertRaises(PatchError, session.edited, 0, [{u"op": u"add",
+      u"path": u"/inducers/9", u"value": u"aTc"}])
+    self.assertEqual(session.circuit, CIRCUIT)
+    self.assertEqual(session.version, 0)
+    session.commit(0, session.edited(0, []), CIRCUIT)
+
+  def test_store_evicts_least_recently_used(self):
+    store = circuit_session.SessionStore(capacity = 2)
+    a = store.open({})
+    b = store.open({})
+    store.get(a.id)
+    c = store.open({})
+    self.assertIs(store.get(a.id), a)
+    self.assertIs(store.get(c.id), c)
+    self.assertRaises(KeyError, store.get, b.id)
+    self.assertRaises(KeyError, store.get, "nonexistent")
+
+if __name__ == "__main__":
+  unittest.main()
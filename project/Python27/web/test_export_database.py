@@ -0,0 +1,72 @@
+##
+# @file test_export_database.py
+# @brief export of databases that share table names
+# @author SYSU-Software
+# @version 1.0
+# @date 2026-10-19
+# @copyright 2013 SYSU-Software. All rights reserved.
+# This project is released under MIT License.
+#
+# usage: cd web && python -m unittest test_export_database
+#
+
+import os
+import csv
+import shutil
+import sqlite3
+import tempfile
+import unittest
+import export_database
+
+class ExportTest(unittest.TestCase):
+  def setUp(self):
+    self.tmp = tempfile.mkdtemp()
+    self.out_dir = os.path.join(self.tmp, "out")
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp)
+
+  def database(self, name, rows):
+    path = os.path.join(self.tmp, name)
+    cx = sqlite3.connect(path)
+    cx.execute("CREATE TABLE change_seq (name TEXT, seq INTEGER)")
+    cx.executemany("INSERT INTO change_seq VALUES (?, ?)", rows)
+    cx.commit()
+    cx.close()
+    return path
+
+  def test_shared_table_names(self):
+    catalog = self.database("catalog.db",
+        [(u"promoter%d" % i, i) for i in xrange(12)])
+    user = self.database("user.db", [(u"userPart", i) for i in xrange(5)])
+    report = export_database.export_all([catalog, user], self.out_dir)
+    self.assertEqual(sorted(report), [
+      (os.path.join(self.out_dir, "catalog", "change_seq.csv"), 12),
+      (os.path.join(self.out_dir, "user", "change_seq.csv"), 5)])
+    with open(os.path.join(self.out_dir, "catalog", "change_seq.csv")) as fp:
+      self.assertEqual(len(list(csv.reader(fp))), 13)
+
+  def test_same_file_names(self):
+    os.makedirs(os.path.join(self.tmp, "a"))
+    first = self.database("user.db", [])
+    second = self.database(os.path.join("a", "user.db"), [])
+    self.assertRaises(ValueError, export_database.export_all,
+        [first, second], self.out_dir)
+
+  def test_columnar_keeps_float_digits(self):
+    path = os.path.join(self.tmp, "mixed.db")
+    cx = sqlite3.connect(path)
+    cx.execute("CREATE TABLE mixed (value)")
+    cx.executemany("INSERT INTO mixed VALUES (?)",
+        [(0.1234567890123456, ), (u"n/a", ), (None, )])
+    cx.commit()
+    cx.close()
+    file_name, count = export_database.export_table(path, "mixed",
+        self.tmp, "col")
+    with open(file_name, "rb") as fp:
+      columns, rows = export_database.read_columnar(fp)
+      self.assertEqual(list(rows), [(u"0.1234567890123456", ), (u"n/a", ),
+        (None, )])
+
+if __name__ == "__main__":
+  unittest.main()
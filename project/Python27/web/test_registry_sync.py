@@ -0,0 +1,139 @@
+##
+# @file test_registry_sync.py
+# @brief test registry_sync against a local stand-in of the registry
+# @author SYSU-Software
+# @version 1.0
+# @date 2026-10-19
+# @copyright 2013 SYSU-Software. All rights reserved.
+# This project is released under MIT License.
+#
+# usage: cd web && python -m unittest test_registry_sync
+#
+
+import os
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+import BaseHTTPServer
+import registry_sync
+
+CATALOG_PAGE = """<html><body><table>
+<tr><td><a href="/Part:BBa_B0010">BBa_B0010</a></td></tr>
+<tr><td><a href="/Part:BBa_B0012">BBa_B0012</a></td></tr>
+<tr><td><a href="/Part:BBa_B0015">BBa_B0015</a></td></tr>
+</table></body></html>"""
+
+PART_XML = """<rsbpml><part_list><part>
+<part_name>%s</part_name><part_type>Terminator</part_type>
+</part></part_list></rsbpml>"""
+
+# --------------------------------------------------------------------------
+##
+# @brief  the registry, every part has an etag, a part named in fail_once
+#         answers 503 to its first request
+# ----------------------------------------------------------------------------
+class Registry(BaseHTTPServer.BaseHTTPRequestHandler):
+  protocol_version = "HTTP/1.1"
+
+  def do_GET(self):
+    server = self.server
+    with server.lock:
+      server.requests.append((self.path, self.headers.get("If-None-Match")))
+    if self.path == "/Terminators/Catalog/Double":
+      return self.answer(200, CATALOG_PAGE)
+    part = self.path.rsplit("=", 1)[-1]
+    with server.lock:
+      failing = part in server.fail_once
+      server.fail_once.discard(part)
+    if failing:
+      return self.answer(503, "busy")
+    etag = '"%s-1"' % part
+    if self.headers.get("If-None-Match") == etag:
+      return self.answer(304, "")
+    self.answer(200, PART_XML % part, etag)
+
+  def answer(self, status, body, etag = None):
+    self.send_response(status)
+    if etag is not None:
+      self.send_header("ETag", etag)
+    self.send_header("Content-Length", str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def log_message(self, *args):
+    pass
+
+class RegistrySyncTest(unittest.TestCase):
+  def setUp(self):
+    self.server = BaseHTTPServer.HTTPServer(("127.0.0.1", 0), Registry)
+    self.server.lock = threading.Lock()
+    self.server.requests = []
+    self.server.fail_once = set()
+    self.thread = threading.Thread(target = self.server.serve_forever)
+    self.thread.daemon = True
+    self.thread.start()
+    self.base_url = "http://127.0.0.1:%d" % self.server.server_port
+    self.tmp = tempfile.mkdtemp()
+    self.out_dir = os.path.join(self.tmp, "Double")
+    self.checkpoint_path = os.path.join(self.tmp, "registry_sync.json")
+
+  def tearDown(self):
+    self.server.shutdown()
+    self.server.server_close()
+    shutil.rmtree(self.tmp)
+
+  def sync(self, restart = False):
+    syncer = registry_sync.RegistrySync(self.base_url, self.out_dir,
+        registry_sync.Checkpoint(self.checkpoint_path), jobs = 2)
+    return syncer.sync("Terminators", "Double", restart)
+
+  def part_requests(self):
+    return [r for r in self.server.requests if "part.cgi" in r[0]]
+
+  def test_fetches_every_part(self):
+    report = self.sync()
+    self.assertEqual(report["fetched"], 3)
+    self.assertEqual(report["failed"], [])
+    self.assertEqual(report["pending"], 0)
+    for part in ("BBa_B0010", "BBa_B0012", "BBa_B0015"):
+      with open(os.path.join(self.out_dir, part + ".xml"), "rb") as fp:
+        self.assertEqual(fp.read(), PART_XML % part)
+    with open(self.checkpoint_path, "rb") as fp:
+      validators = json.load(fp)["validators"]
+    self.assertEqual(validators["BBa_B0012"][0], '"BBa_B0012-1"')
+
+  def test_unchanged_parts_are_not_downloaded_again(self):
+    self.sync()
+    del self.server.requests[:]
+    report = self.sync(restart = True)
+    self.assertEqual(report["fetched"], 0)
+    self.assertEqual(report["not_modified"], 3)
+    self.assertEqual(sorted(r[1] for r in self.part_requests()),
+        ['"BBa_B0010-1"', '"BBa_B0012-1"', '"BBa_B0015-1"'])
+
+  def test_retries_server_errors(self):
+    self.server.fail_once.add("BBa_B0012")
+    report = self.sync()
+    self.assertEqual(report["fetched"], 3)
+    self.assertEqual(report["failed"], [])
+    self.assertEqual(len([r for r in self.part_requests()
+      if r[0].endswith("BBa_B0012")]), 2)
+
+  def test_resumes_from_the_checkpoint(self):
+    # a sync that stopped after BBa_B0010
+    checkpoint = registry_sync.Checkpoint(self.checkpoint_path)
+    checkpoint.run = {"page": ["Terminators", "Double"],
+        "pending": ["BBa_B0012", "BBa_B0015"]}
+    checkpoint.save()
+    report = self.sync()
+    self.assertEqual(report["fetched"], 2)
+    self.assertEqual(sorted(r[0].rsplit("=", 1)[-1]
+      for r in self.server.requests),
+        ["BBa_B0012", "BBa_B0015"])
+    self.assertFalse(os.path.exists(os.path.join(self.out_dir,
+      "BBa_B0010.xml")))
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,124 @@
+# coding: utf-8
+##
+# @file test_wire_format.py
+# @brief round trips of the msgpack codec of the websocket messages
+# @author SYSU-Software
+# @version 1.0
+# @date 2026-10-19
+# @copyright 2013 SYSU-Software. All rights reserved.
+# This project is released under MIT License.
+#
+# usage: cd web && python -m unittest test_wire_format
+#
+
+import struct
+import unittest
+import wire_format
+from wire_format import pack, unpack
+
+class PackTest(unittest.TestCase):
+  def round_trip(self, value, float32 = False):
+    return unpack(pack(value, float32))
+
+  def test_integers_around_the_boundaries(self):
+    for value in (0, 1, 0x7f, 0x80, 0xff, 0x100, 0xffff, 0x10000,
+        (1 << 32) - 1, 1 << 32, (1 << 64) - 1, -1, -0x20, -0x21, -0x80,
+        -0x81, -(1 << 31), -(1 << 31) - 1, -(1 << 63)):
+      self.assertEqual(self.round_trip(value), value)
+
+  def test_integer_encodings(self):
+    self.assertEqual(pack(0x7f), "\x7f")
+    self.assertEqual(pack(0x80), "\xce\x00\x00\x00\x80")
+    self.assertEqual(pack(-0x20), "\xe0")
+    self.assertEqual(pack(-0x21), "\xd3" + struct.pack(">q", -0x21))
+    self.assertEqual(pack((1 << 32) - 1), "\xce\xff\xff\xff\xff")
+    self.assertEqual(pack(1 << 32), "\xcf" + struct.pack(">Q", 1 << 32))
+
+  def test_integers_out_of_range(self):
+    self.assertRaises(ValueError, pack, 1 << 64)
+    self.assertRaises(ValueError, pack, -(1 << 63) - 1)
+
+  def test_scalars(self):
+    for value in (None, True, False, 0.5, -1e300, 0.0):
+      self.assertEqual(self.round_trip(value), value)
+    self.assertIs(self.round_trip(True), True)
+    self.assertIs(self.round_trip(1), 1)
+
+  def test_strings_come_back_as_unicode(self):
+    for value in (u"", u"a", u"基因线路", u"x" * 31,
+        u"x" * 32, u"x" * 255, u"x" * 256, u"x" * 65535, u"x" * 65536):
+      self.assertEqual(self.round_trip(value), value)
+    self.assertEqual(self.round_trip("BBa_B0034"), u"BBa_B0034")
+    self.assertIsInstance(self.round_trip("BBa_B0034"), unicode)
+    # length counts utf-8 bytes, not characters
+    self.assertEqual(self.round_trip(u"é" * 20), u"é" * 20)
+
+  def test_lists_and_maps_around_the_boundaries(self):
+    for n in (0, 15, 16, 65535, 65536):
+      self.assertEqual(self.round_trip(range(n)), range(n))
+    for n in (0, 15, 16, 65536):
+      value = dict((u"k%d" % i, i) for i in xrange(n))
+      self.assertEqual(self.round_trip(value), value)
+    self.assertEqual(self.round_trip((1, u"a")), [1, u"a"])
+
+  def test_float64_arrays(self):
+    for n in (wire_format.MIN_ARRAY, 31, 32, 8191, 8192):
+      values = [i / 7.0 for i in xrange(n)]
+      packed = pack(values)
+      self.assertNotEqual(packed[0], "\xdc")
+      self.assertEqual(unpack(packed), values)
+
+  def test_float32_arrays(self):
+    values = [i / 7.0 for i in xrange(100)]
+    result = self.round_trip(values, float32 = True)
+    self.assertEqual(len(result), 100)
+    for a, b in zip(result, values):
+      self.assertAlmostEqual(a, b, places = 6)
+    self.assertEqual(len(pack(values, True)), 4 + 4 * 100)
+
+  def test_short_and_mixed_float_lists_stay_lists(self):
+    short = [0.5] * (wire_format.MIN_ARRAY - 1)
+    mixed = [0.5] * wire_format.MIN_ARRAY + [1]
+    self.assertEqual(self.round_trip(short), short)
+    self.assertEqual(self.round_trip(mixed), mixed)
+    self.assertEqual(pack(short)[0], chr(0x90 | len(short)))
+
+  def test_nested(self):
+    value = {u"request": u"Simulate", u"result": {u"time": [0.1] * 50,
+      u"curves": [[1.5] * 10, [], [u"µM", None, True]]}, u"id": 7}
+    self.assertEqual(self.round_trip(value), value)
+
+  def test_trailing_bytes(self):
+    self.assertRaises(ValueError, unpack, pack(1) + "\x00")
+
+  def test_unsupported_type(self):
+    self.assertRaises(TypeError, pack, object())
+
+class CodecTest(unittest.TestCase):
+  def reply(self, codec, result):
+    payload, binary = codec.encode("Simulate", result, 3)
+    return codec.decode(bytearray(payload) if binary else
+        payload.decode("utf-8"))
+
+  def test_round_trips_every_encoding(self):
+    result = {u"curves": [[i / 3.0 for i in xrange(500)]],
+        u"name": u"启动子"}
+    for encoding in ("json", "msgpack"):
+      for compress in (False, True):
+        codec = wire_format.Codec(encoding, compress)
+        self.assertEqual(self.reply(codec, result), {u"request": u"Simulate",
+          u"result": result, u"id": 3})
+
+  def test_small_replies_are_not_compressed(self):
+    codec = wire_format.Codec("msgpack", True)
+    payload, binary = codec.encode("getApiStats", {}, None)
+    self.assertEqual(ord(payload[0]), wire_format.FLAG_MSGPACK)
+
+  def test_malformed_messages(self):
+    codec = wire_format.Codec("msgpack", True)
+    for message in (u"{bad", bytearray(), bytearray("\x02\xdc\x00"),
+        bytearray("\x01garbage"), bytearray("\x02\xc1")):
+      self.assertRaises(ValueError, codec.decode, message)
+
+if __name__ == "__main__":
+  unittest.main()
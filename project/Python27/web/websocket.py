@@ -26,11 +26,76 @@ import encrypt
 import base64
 import hashlib
 import json
-import string
 import extended_sbol
+import bulk_import
+import part_cache
+import part_search
+import sequence_search
+import similarity
+import dir_snapshot
+import json_cache
+import process_pool
+import wire_format
+import circuit_session
+import scheduler
+import api_registry
+from api_registry import takes, optional, value, text, number, integer,\
+    boolean, array, obj, choice, json_value
+import copy
+from gevent import getcurrent
+from gevent.pool import Pool
+try:
+  from gevent.lock import Semaphore
+except ImportError:
+  from gevent.coros import Semaphore
 
 logging = mlog.logging
 
+# requests with an id that one connection may run at the same time
+MAX_IN_FLIGHT = 8
+
+# apis that take the id of a circuit session in place of the gene_circuit
+CIRCUIT_APIS = frozenset(['Simulate'])
+
+# --------------------------------------------------------------------------
+##
+# @brief apis where only the latest request counts, with the function that
+#        gets the detail of the parameter a request changes, a request
+#        replaces the waiting one of its connection for the same circuit and
+#        parameter, with or without an id
+#
+# --------------------------------------------------------------------------
+LATEST_WINS = {
+  'updateGeneCircuit': lambda message: message['data']['detail'],
+  'updateCircuitSession': lambda message: message['detail'],
+}
+
+# apis whose running request is replaced too, their result depends on the
+# message alone, an updateCircuitSession that runs commits to its session
+# and the next patch of the client builds on it, so it always finishes
+# a replaced request runs to its end and its result is dropped, cancelling
+# it would kill its worker process and start another one for every slider
+# move
+REPLACE_RUNNING = frozenset(['updateGeneCircuit'])
+
+# --------------------------------------------------------------------------
+##
+# @brief get the key under which a newer request replaces an older one
+#
+# @param message  the validated message
+#
+# @returns   the key, None for the other apis and for updates without a
+#            detail, which fail like they always did
+#
+# --------------------------------------------------------------------------
+def latest_key(message):
+  try:
+    detail = LATEST_WINS[message['request']](message)
+    return (message['request'], message.get('session'), detail.get('type'),
+        detail.get('pro_id'))
+  except (KeyError, TypeError, AttributeError, ValueError):
+    return None
+
 # --------------------------------------------------------------------------
 ##
 # @brief  the class that provide all the apis for the websocket
@@ -46,6 +111,7 @@ class apis():
   # @returns   return whether the shared action success or not
   #
   # --------------------------------------------------------------------------
+  @takes(filename = value, filetype = value)
   def setFileShared(self,message):
     shared=sharedFiles(self.db)
     return shared.setFileShared(self.db.userId,message['filename'],message['filetype'])
@@ -57,6 +123,7 @@ class apis():
   # @returns   return the result of action
   #
   # --------------------------------------------------------------------------
+  @takes(part_id = value, uploaduser = value)
   def deleteUserPart(self,message):
     return self.db.deleteUserPart(message['part_id'],message['uploaduser'])
 
@@ -67,6 +134,8 @@ class apis():
   # @returns   return the result of action
   #
   # --------------------------------------------------------------------------
+  @takes(userName = value, code = value, filename = value,
+      filetype = value)
   def isExtractCodeRight(self,message):
     shared=sharedFiles(self.db)
     id=self.db.getUserIdByName(message['userName'])
@@ -75,161 +144,453 @@ class apis():
 	  return True
     else:
 	  return False
+  @takes(filename = value, filetype = value)
   def unsharedAFile(self,message):
     shared=sharedFiles(self.db)
     return shared.unsharedAFile(self.db.userId,message['filename'],message['filetype'])
+  @takes(type = value)
   def getuserPartByType(self,message):
     shared=sharedFiles(self.db)
     return shared.getSharedTypePart(message['type'])
+  @takes(name = value, number = value, CopyNumber = number)
   def addAplasmid_backbone(self,message):
-    return self.db.addAplasmidBackbone(message['name'],message['number'],string.atof(message['CopyNumber']))
+    return self.db.addAplasmidBackbone(message['name'],message['number'],message['CopyNumber'])
+  @takes(name = value, number = value, Efficiency = number)
   def addATerminator(self,message):
-    return self.db.addATerminator(message['name'],message['number'],string.atof(message['Efficiency']))
+    return self.db.addATerminator(message['name'],message['number'],message['Efficiency'])
+  @takes(name = value, number = value, MPPromoter = number,
+      LeakageRate = number, K1 = number, Type = value, Repressor = value,
+      Source = value, Activator = value, PoPS = number)
   def addAPromoter(self,message):
-    return self.db.addAPromoter(name=message['name'],number=message['number'],MPPromoter=string.atof(message['MPPromoter']),LeakageRate=string.atof(message['LeakageRate']),K1=string.atof(message['K1']),Type=message['Type'],Repressor=message['Repressor'],Source=message['Source'],Activator=message['Activator'],PoPS=string.atof(message['PoPS']))
+    return self.db.addAPromoter(name=message['name'],number=message['number'],MPPromoter=message['MPPromoter'],LeakageRate=message['LeakageRate'],K1=message['K1'],Type=message['Type'],Repressor=message['Repressor'],Source=message['Source'],Activator=message['Activator'],PoPS=message['PoPS'])
+  @takes(name = value, number = value, MPRBS = number, RIPS = number)
   def addARBS(self,message):
-    return self.db.addARBS(name=message['name'],number=message['number'],MPRBS=string.atof(message['MPRBS']),RIPS=string.atof(message['RIPS']))
+    return self.db.addARBS(name=message['name'],number=message['number'],MPRBS=message['MPRBS'],RIPS=message['RIPS'])
+  @takes(name = value, number = value, HillCoeff2 = number,
+      K2 = number)
   def addAnInducer(self,message):
-    return self.db.addAnInducer(message['name'],message['number'],string.atof(message['HillCoeff2']),string.atof(message['K2']))
+    return self.db.addAnInducer(message['name'],message['number'],message['HillCoeff2'],message['K2'])
+  @takes(name = value, number = value, HillCoeff1 = number,
+      K1 = number, K2 = number)
   def addARepressor(self,message):
-    return self.db.addARepressor(message['name'],message['number'],string.atof(message['HillCoeff1']),string.atof(message['K1']),string.atof(message['K2']))
+    return self.db.addARepressor(message['name'],message['number'],message['HillCoeff1'],message['K1'],message['K2'])
+  @takes(table = text, rows = array,
+      skip_invalid = optional(boolean, False))
+  def bulkImport(self,message):
+    try:
+      return bulk_import.import_rows(self.db,message['table'],message['rows'],
+          skip_invalid=message['skip_invalid'])
+    except bulk_import.InvalidRow as e:
+      return 'import aborted, nothing written: %s'%e
+  @takes(part_id = value, part_name = value, part_short_name = value,
+      part_short_desc = value, part_type = value, part_nickname = value,
+      part_author = value, sequence = text, Number = value, parts = value)
   def addAUserPart(self,message):
-    return self.db.addAUserPart(part_id=message['part_id'],part_name=message['part_name'],part_short_name=message['part_short_name'],part_short_desc=message['part_short_desc'],part_type=message['part_type'],part_nickname=message['part_nickname'],part_author=message['part_author'],sequence=message['sequence'],Number=message['Number'],parts=message['parts'])    
+    # look before storing, so the new part is not reported as its own copy
+    similar=similarity.near_duplicates(self.db,message['sequence'])
+    result=self.db.addAUserPart(part_id=message['part_id'],part_name=message['part_name'],part_short_name=message['part_short_name'],part_short_desc=message['part_short_desc'],part_type=message['part_type'],part_nickname=message['part_nickname'],part_author=message['part_author'],sequence=message['sequence'],Number=message['Number'],parts=message['parts'])
+    if similar:
+      return {'message':result,'similar':similar}
+    return result
+  @takes()
   def getRememberMeTicket(self,message):
     user.userSetRememberMe(self.db)
     return user.getRememberMeTicket(self.db,user.getLoginedUserName(self.db))
+  @takes(username = value, ticket = value)
   def userLoginByTicket(self,message):
 	return user.userLoginByTicket(self.db,message['username'],message['ticket'])
+  @takes(data = value)
   def indexSaveToGeneCircuit(self,message):
     self.db.indexSave=message['data']
     return "index save success"
+  @takes(data = text)
   def getBiobrickPath(self,message):
     return xmlParse.findFile(rootdir="web/biobrick/",key=message['data'])
+  @takes()
   def getIndexSave(self,message):
-    return group.dump_group(json.loads(self.db.indexSave),self.db)
+    return group.dump_group(json_value(self.db.indexSave),self.db)
+  @takes()
   def generateRandomsessionKey(self,message):   
     if self.db.encrypt==None:     
       self.db.encrypt=encrypt.Encrypt()
     return {'n':encrypt.dec2hex(self.db.encrypt.getPublicKey().n),'e':encrypt.dec2hex(self.db.encrypt.getPublicKey().e)}  
+  @takes(table_name = text)
   def get_part(self, message):
     return self.db.selectAllOfTable(tableName = message['table_name'])
+  @takes()
+  def getPartCacheStats(self, message):
+    return part_cache.CACHE.stats()
+  @takes()
+  def getSchedulerStats(self, message):
+    return scheduler.SCHEDULER.stats()
+  @takes()
+  def getApiStats(self, message):
+    return REGISTRY.stats()
+  @takes(query = text, page = optional(integer, 0),
+      page_size = optional(integer, 20))
+  def searchParts(self, message):
+    return part_search.search_parts(self.db, message['query'],
+        message['page'], message['page_size'])
+  @takes(sequence = sequence_search.searchable,
+      limit = optional(integer, 100))
+  def findPartsBySequence(self, message):
+    return sequence_search.find_parts_by_sequence(self.db,
+        message['sequence'], message['limit'])
+  @takes(sequence = text, top = optional(integer, 5))
+  def findSimilarParts(self, message):
+    return similarity.find_similar_parts(self.db, message['sequence'],
+        message['top'])
+  @takes(data = text)
   def userLogin(self,message):
     res=json.loads(self.db.encrypt.decrypt(message['data']))
     res['password']=encrypt.getPasswordSHA1(res['password'])
     return user.userLogin(self.db,name=res['name'],password=res['password'])
-  def getDirList(self,message={'dir':'biobrick'}): 
-    return xmlParse.get_allfiledirs(message['dir'])
-  def getBiobrick(self,message={'path':'biobrick/Terminators/BBa_B0010.xml'}):
-    return xmlParse.xmlBiobrick(message['path']).getJsonString()
+  @takes(dir = optional(text, 'web/biobrick'), version = optional(value),
+      page = optional(integer), page_size = optional(integer, 100))
+  def getDirList(self,message):
+    return dir_snapshot.list_dir(message['dir'],message['version'],
+        message['page'],message['page_size'])
+  @takes(path = optional(text, 'biobrick/Terminators/BBa_B0010.xml'),
+      fields = optional(array))
+  def getBiobrick(self,message):
+    return json_cache.part_entry(message['path'],message['fields']).literal
+  @takes(data = text, fileName = optional(value, 'default'),
+      fileType = optional(value, 'default'))
   def saveUserData(self,message):
-    message['data']=message['data'].replace('"','\'')
-    if message.has_key("fileName") and message.has_key("fileType"):
-      return user.saveUserData(self.db,message['data'],message['fileName'],message['fileType'])
-    elif message.has_key("fileName"):
-      return user.saveUserData(self.db,message['data'],message['fileName'],"default")
-    elif message.has_key("fileType"):
-      return user.saveUserData(self.db,message['data'],"default",message['fileType'])
-    else:
-      return user.saveUserData(self.db,message['data'],"default","default")
+    data=message['data'].replace('"','\'')
+    return user.saveUserData(self.db,data,message['fileName'],message['fileType'])
+  @takes(group_name = choice('administrator', 'guest'), name = value,
+      password = value, email = value, gender = integer, question = value,
+      answer = value)
   def registAUser(self,message):
-    if message['group_name']=='administrator':
-      group_id=2
-    elif message['group_name']=='guest':
-      group_id=1    
+    group_id={'administrator':2,'guest':1}[message['group_name']]
     self.db.rememberUser(message['name'],message['password'])
     message['password']=encrypt.getPasswordSHA1(message['password'])
-    ret= user.registAUser(self.db,name=message['name'],password=message['password'],email=message['email'],group_id=group_id,gender=string.atoi(message['gender']),question=message['question'],answer=message['answer'])
+    ret= user.registAUser(self.db,name=message['name'],password=message['password'],email=message['email'],group_id=group_id,gender=message['gender'],question=message['question'],answer=message['answer'])
     return ret
+  @takes()
   def getLoginedUserName(self,message):
     return user.getLoginedUserName(self.db)
   "ws.send(JSON.stringify({'request': 'getXmlJson','path':'web/biobrick/Terminators/BBa_B0010.xml'}));"
+  @takes(path = text, fields = optional(array))
   def getXmlJson(self,message):
-    xml=xmlParse.xmlBiobrick(path=message['path'])
-    return xml.getJsonString()
+    # with fields, e.g. ['summary'], only those parts of the file are sent
+    return json_cache.part_entry(message['path'],message['fields']).literal
+  @takes()
   def loginOut(self,message):
     return user.userLogout(self.db)
+  @takes()
   def getUserFileList(self,message):
     return user.getUserFileList(self.db)
+  @takes(name = value)
   def deleteUserData(self,message):
     return {"name":message["name"],
         "result":user.deleteUserData(self.db,message["name"])}
+  @takes(userInfo = value)
   def updateUserInfo(self,message):
     return user.updateUserInfo(self.db, message["userInfo"])
+  @takes(old = value, new = value)
   def updatePassword(self,message):
     ret= user.changeUserPassword(self.db, message["old"], message["new"])
     return ret
+  @takes(fileName = value, fileType = optional(value, 'default'))
   def loadUserFile(self,message):
-    if message.has_key("fileType"):
-  	  return user.loadUserData(self.db,message['fileName'],message['fileType'])
-    else:
-      return user.loadUserData(self.db,message['fileName'],"default")
+    return user.loadUserData(self.db,message['fileName'],message['fileType'])
+  @takes(isStochastic = boolean, isDelay = boolean,
+      gene_circuit = optional(json_value), session = optional(text),
+      corepind = value, stream = optional(boolean, False),
+      time = optional(number, 6000), dt = optional(number, 100),
+      chunk_steps = optional(integer, 200), interval = optional(number, 0.25))
   def Simulate(self, message):
     isStochastic = message["isStochastic"]
     isDelay = message["isDelay"]
-    gene_circuit = group.js_formatter(json.loads(message["gene_circuit"]))
+    gene_circuit = group.js_formatter(message["gene_circuit"])
     corepind = message["corepind"]
-    time = 6000
-    if message.has_key("time"):
-      time = message["time"]
-    dt = 100
-    if message.has_key("dt"):
-      time = message["dt"]
+    if message["stream"]:
+      # the curves are sent in chunks while they are computed, the last
+      # reply has done set and carries a summary, see Simulate_Stream
+      return Simulate_Function.Simulate_Stream(isStochastic, isDelay,\
+          gene_circuit, corepind, self.db, message["time"], message["dt"],\
+          message["chunk_steps"], message["interval"])
     return Simulate_Function.Simulate(isStochastic, isDelay,\
-        gene_circuit, corepind, self.db, time, dt)
+        gene_circuit, corepind, self.db, message["time"], message["dt"])
+  @takes(data = value)
   def getGroup(self, message):
     return group.dump_group(message["data"], self.db)
   def getPlasmidSbol_deprecated(self, message):
     sbol = component_union.get_sbol(message["component"], rule)
     ret = format_to_json(sbol)
     return ret
+  @takes(data = json_value)
   def updateGeneCircuit(self, message):
     ret = group.update_controller(self.db, message["data"])
     return ret
+  @takes(gene_circuit = optional(json_value),
+      session = optional(text), version = optional(integer),
+      patch = optional(array), detail = optional(obj))
+  def updateCircuitSession(self, message):
+    # the circuit stays here, the page sends its edits and gets the changes
+    # as json patches, it sends the whole circuit only to open a session
+    try:
+      if message['gene_circuit'] is not None:
+        session = circuit_session.SESSIONS.open(message['gene_circuit'])
+      else:
+        session = circuit_session.SESSIONS.get(message['session'])
+    except KeyError:
+      return {'session': message['session'], 'expired': True}
+    version = session.version if message['version'] is None else\
+        message['version']
+    try:
+      edited = session.edited(version, message['patch'])
+      if message['detail'] is None:
+        return session.commit(version, edited, edited)
+      circuit = dispatch(self, REGISTRY.validate({
+        'request': 'updateGeneCircuit', 'data': {'detail': message['detail'],
+          'gene_circuit': copy.deepcopy(edited)}}))
+      return session.commit(version, edited, circuit)
+    except circuit_session.VersionConflict:
+      return {'session': session.id, 'version': session.version,
+          'conflict': True}
+    except circuit_session.PatchError as e:
+      # the page has another circuit than it thinks, it sends it whole again
+      logging.warning("bad circuit patch, %s" % e)
+      return {'session': session.id, 'version': session.version,
+          'invalid': True}
+  @takes(requests = array)
+  def batch(self, message):
+    return run_batch(self, message['requests'])
+  @takes(userName = value)
   def getUserQuestion(self,message):
     return user.getUserQuestion(self.db,message['userName']) 
+  @takes(data = json_value, rule = optional(text, 'RFC10'))
   def getNewPartSequence(self,message):
-    if message.has_key("rule"):
-      rule = message["rule"]
-    else:
-      rule = "RFC10"
-    return get_new_part_sequence(json.loads(message['data']), rule)
+    return get_new_part_sequence(message['data'], message['rule'])
+  @takes(userName = value, password = value, answer = value)
   def forgetPasswordAndReset(self,message):
     self.db.rememberUser(message['userName'],message['password'])
     return user.resetUserPassword(self.db,message['userName'],message['answer'],message['password'])
+  @takes(data = json_value, rule = optional(text, 'RFC10'))
   def getPlasmidSbol(self, message):
-    if message.has_key("rule"):
-      rule = message["rule"]
-    else:
-      rule = "RFC10"
-    return plasmid.plasmid_sbol(self.db, json.loads(message['data']), rule)
+    return plasmid.plasmid_sbol(self.db, message['data'], message['rule'])
+  @takes(data = json_value)
   def loadSBOL(self,message):    
-    return group.dump_sbol(json.loads(message['data']), self.db)
+    return group.dump_sbol(message['data'], self.db)
+  @takes(part_id = value, rule = optional(text, 'RFC10'))
   def get_extended_sbol(self, message):
-    if message.has_key("rule"):
-      rule = message["rule"]
-    else:
-      rule = "RFC10"
     return extended_sbol.get_extended_sbol(self.db, message["part_id"],\
-        rule)
+        message["rule"])
+
+# --------------------------------------------------------------------------
+##
+# @brief the apis clients may request, with their arguments
+#
+# --------------------------------------------------------------------------
+REGISTRY = api_registry.Registry(apis)
 
-def handle_websocket(ws, db):
+def handle_websocket(ws, db, codec = None, client = None):
   logging.info("start handling websocket...")
-  while True:
-    message = ws.receive()
-    if message is None:
-      print "message is empty"
-      break
-    else:      
-      message = json.loads(message)
-      print message
-      api = apis(db)
+  try:
+    serve_websocket(ws, db, codec or wire_format.Codec(), client or id(ws))
+  finally:
+    # hand the connection of this websocket's greenlet back to the pool
+    db.release()
+
+# --------------------------------------------------------------------------
+##
+# @brief run the api a message asks for, in a worker process for the
+#        cpu-bound ones, and time it
+#
+# @param api       apis instance
+# @param message   the message, validated by REGISTRY
+# @param on_chunk  function called with the chunks of a streaming api, None
+#                  to drop them
+#
+# @returns   the result of the api, the final one for a streaming api
+#
+# --------------------------------------------------------------------------
+def dispatch(api, message, on_chunk = None):
+  handler = REGISTRY[message['request']]
+  if message['request'] in CIRCUIT_APIS and message['gene_circuit'] is None\
+      and message['session']:
+    message = dict(message, gene_circuit = circuit_session.current_circuit(
+      message['session']))
+  with handler.timed():
+    pool = process_pool.pool_for(message['request'])
+    if pool is not None:
+      return pool.call(message, on_chunk = on_chunk)
+    return process_pool.drain(handler.function(api, message), on_chunk)
+
+# --------------------------------------------------------------------------
+##
+# @brief run the api a message asks for once the scheduler admits it
+#
+# @param api       apis instance of the connection
+# @param message   the message, validated by REGISTRY
+# @param on_chunk  function called with the chunks of a streaming api
+# @param client    who sent the message, for the quota of the scheduler
+#
+# @returns   the result, "ERROR!" when the api failed and {'busy': true}
+#            when the scheduler turned it away
+#
+# --------------------------------------------------------------------------
+def call_api(api, message, on_chunk = None, client = None):
+  try:
+    with scheduler.SCHEDULER.admit(scheduler.request_class(message), client):
+      result = dispatch(api, message, on_chunk)
+  except scheduler.ServerBusy as e:
+    logging.warning("server busy, %s" % e)
+    result = {'busy': True}
+  except Exception as e:
+    logging.exception("%s failed" % message['request'])
+    result = "ERROR!"
+  logging.info("message is %s" % message)
+  return result
+
+# --------------------------------------------------------------------------
+##
+# @brief run the requests of a batch one after the other with one apis
+#        instance, their writes to the user database are committed once at
+#        the end
+#
+#        {'request': 'batch', 'requests': [{'request': 'getUserFileList'},
+#          {'request': 'get_part', 'table_name': 'promoter', 'id': 'p'}]}
+#
+# @param api       apis instance
+# @param requests  list of messages
+#
+# @returns   list with a reply per request, in order, holding its result or
+#            the error it failed with
+#
+# --------------------------------------------------------------------------
+def run_batch(api, requests):
+  replies = []
+  with api.db.pool.deferred_commit():
+    for message in requests:
+      reply = {'request': message.get('request')}
+      if message.get('id') is not None:
+        reply['id'] = message['id']
       try:
-        result = getattr(api, message['request'])(message)
+        message = REGISTRY.validate(message)
+        if message['request'] == 'batch':
+          raise ValueError('batches cannot be nested')
+        if message.get('stream'):
+          raise ValueError('streams cannot be batched')
+        result = dispatch(api, message)
+        if isinstance(result, json_cache.RawJson):
+          # only whole replies can carry raw json
+          result = json.loads(result)
+        reply['result'] = result
       except Exception as e:
-        print e
-        result = "ERROR!"
-      logging.info("message is %s" % message)
-      ret = json.dumps({'request':message['request'],'result': result})
-      print ret
-      logging.info("return %s" % ret)
+        reply['error'] = '%s: %s' % (type(e).__name__, e)
+      replies.append(reply)
+  return replies
+
+# --------------------------------------------------------------------------
+##
+# @brief read the messages of a websocket, a message with an "id" runs in
+#        its own greenlet and its reply carries the id and goes out when it
+#        is done, a message without one is answered before the next is read
+#        like it always was
+#
+#        requests of the LATEST_WINS apis run in their own greenlet with or
+#        without an id, a newer one with the same key supersedes the waiting
+#        one, and the running one of the REPLACE_RUNNING apis, which is
+#        answered with {'superseded': true} instead of its result
+#
+#        unknown and malformed requests are answered with {'error': reason}
+#        before any work is done for them
+#
+# @param ws      the websocket
+# @param db      database instance
+# @param codec   wire_format.Codec of the connection
+# @param client  who is connected, see scheduler.client_key
+#
+# --------------------------------------------------------------------------
+def serve_websocket(ws, db, codec, client):
+  api = apis(db)
+  running = Pool(MAX_IN_FLIGHT)
+  # replies of different greenlets must not interleave on the socket
+  send_lock = Semaphore()
+  def reply(message, result):
+    ret, binary = codec.encode(message.get('request'), result,
+        message.get('id'))
+    if binary:
+      logging.info("return %d bytes for %s" % (len(ret),
+        message.get('request')))
+      with send_lock:
+        ws.send(ret, True)
+      return
+    logging.info("return %s" % ret)
+    with send_lock:
       ws.send(ret)
+  def run(message):
+    try:
+      reply(message, call_api(api, message, lambda c: reply(message, c),
+        client))
+    finally:
+      db.release()
+  # key -> (greenlet, message) of the newest request of a LATEST_WINS api
+  latest = {}
+  # greenlets of run_latest that have started, the state of a greenlet
+  # tells whether it was scheduled but not whether it began to run
+  begun = set()
+  # running greenlets that were answered as superseded, their result is
+  # dropped
+  dropped = set()
+  def run_latest(key, message):
+    begun.add(getcurrent())
+    try:
+      try:
+        result = call_api(api, message, client = client)
+      finally:
+        db.release()
+    finally:
+      # no switch since the call returned, a newer request can not have
+      # superseded this greenlet between the checks and the reply
+      begun.discard(getcurrent())
+      if latest.get(key, (None, ))[0] is getcurrent():
+        del latest[key]
+    if getcurrent() in dropped:
+      dropped.discard(getcurrent())
+      return
+    reply(message, result)
+  def supersede(key, message):
+    if key in latest:
+      old, old_message = latest.pop(key)
+      if old not in begun:
+        # one that has not started yet never runs
+        old.kill(block = False)
+        reply(old_message, {'superseded': True})
+      elif message['request'] in REPLACE_RUNNING:
+        dropped.add(old)
+        reply(old_message, {'superseded': True})
+    latest[key] = (running.spawn(run_latest, key, message), message)
+  try:
+    while True:
+      message = ws.receive()
+      if message is None:
+        break
+      try:
+        message = codec.decode(message)
+        message = REGISTRY.validate(message)
+      except ValueError as e:
+        # malformed json or msgpack, or an api_registry.InvalidRequest
+        logging.warning("rejected %s" % e)
+        reply(message if isinstance(message, dict) else {}, {'error': str(e)})
+        continue
+      key = latest_key(message)
+      if key is not None:
+        supersede(key, message)
+      elif message.get('id') is not None:
+        # waits for a free slot once MAX_IN_FLIGHT requests are running
+        running.spawn(run, message)
+      else:
+        try:
+          reply(message, call_api(api, message, lambda c: reply(message, c),
+            client))
+        finally:
+          # a request without an id reads the shared login state afresh too
+          db.release()
+  finally:
+    # the client is gone, nobody waits for the replies any more
+    running.kill()
@@ -0,0 +1,314 @@
+##
+# @file wire_format.py
+# @brief encodings of the websocket messages, json text as before or
+#        msgpack, optionally deflated, chosen per connection
+# @author SYSU-Software
+# @version 1.0
+# @date 2026-10-19
+# @copyright 2013 SYSU-Software. All rights reserved.
+# This project is released under MIT License.
+#
+# usage: ws://host:5000/ws?encoding=msgpack&compress=deflate&floats=32
+#
+#        binary messages start with a flag byte, FLAG_MSGPACK when the rest
+#        is msgpack instead of utf-8 json and FLAG_DEFLATE when the rest is
+#        zlib compressed, text messages are json as they always were
+#
+
+import sys
+import json
+import zlib
+import array
+import struct
+import json_cache
+
+FLAG_DEFLATE = 0x01
+FLAG_MSGPACK = 0x02
+
+# msgpack extension types for lists of floats, raw little-endian arrays
+EXT_FLOAT64 = 1
+EXT_FLOAT32 = 2
+# float lists from this length are sent as arrays
+MIN_ARRAY = 8
+# replies from this size are compressed when the client asked for it
+COMPRESS_MIN = 1024
+
+# --------------------------------------------------------------------------
+##
+# @brief encode a float list as raw little-endian floats
+#
+# @param values   list of floats
+# @param float32  whether single precision is enough
+#
+# @returns   (extension type, bytes)
+#
+# --------------------------------------------------------------------------
+def float_array(values, float32 = False):
+  data = array.array("f" if float32 else "d", values)
+  if sys.byteorder == "big":
+    data.byteswap()
+  return (EXT_FLOAT32 if float32 else EXT_FLOAT64), data.tostring()
+
+# --------------------------------------------------------------------------
+##
+# @brief encode a value as msgpack, float lists become float arrays
+#
+# @param value    None, bool, int, float, str, unicode, list, tuple or dict
+# @param float32  send float arrays in single precision
+#
+# @returns   the msgpack bytes
+#
+# --------------------------------------------------------------------------
+def pack(value, float32 = False):
+  out = []
+  pack_into(out, value, float32)
+  return "".join(out)
+
+def pack_into(out, value, float32):
+  if value is None:
+    out.append("\xc0")
+  elif value is True:
+    out.append("\xc3")
+  elif value is False:
+    out.append("\xc2")
+  elif isinstance(value, (int, long)):
+    if 0 <= value < 0x80:
+      out.append(chr(value))
+    elif -0x20 <= value < 0:
+      out.append(struct.pack("b", value))
+    elif 0 <= value < 1 << 64:
+      out.append(struct.pack(">BQ", 0xcf, value) if value >> 32 else
+          struct.pack(">BI", 0xce, value))
+    elif -1 << 63 <= value < 0:
+      out.append(struct.pack(">Bq", 0xd3, value))
+    else:
+      raise ValueError("integer too large: %d" % value)
+  elif isinstance(value, float):
+    out.append(struct.pack(">Bd", 0xcb, value))
+  elif isinstance(value, (str, unicode)):
+    if isinstance(value, unicode):
+      value = value.encode("utf-8")
+    n = len(value)
+    if n < 32:
+      out.append(chr(0xa0 | n))
+    elif n < 1 << 8:
+      out.append(struct.pack(">BB", 0xd9, n))
+    elif n < 1 << 16:
+      out.append(struct.pack(">BH", 0xda, n))
+    else:
+      out.append(struct.pack(">BI", 0xdb, n))
+    out.append(value)
+  elif isinstance(value, (list, tuple)):
+    if len(value) >= MIN_ARRAY and all(type(v) is float for v in value):
+      ext, data = float_array(value, float32)
+      n = len(data)
+      if n < 1 << 8:
+        out.append(struct.pack(">BBb", 0xc7, n, ext))
+      elif n < 1 << 16:
+        out.append(struct.pack(">BHb", 0xc8, n, ext))
+      else:
+        out.append(struct.pack(">BIb", 0xc9, n, ext))
+      out.append(data)
+      return
+    n = len(value)
+    if n < 16:
+      out.append(chr(0x90 | n))
+    elif n < 1 << 16:
+      out.append(struct.pack(">BH", 0xdc, n))
+    else:
+      out.append(struct.pack(">BI", 0xdd, n))
+    for v in value:
+      pack_into(out, v, float32)
+  elif isinstance(value, dict):
+    n = len(value)
+    if n < 16:
+      out.append(chr(0x80 | n))
+    elif n < 1 << 16:
+      out.append(struct.pack(">BH", 0xde, n))
+    else:
+      out.append(struct.pack(">BI", 0xdf, n))
+    for k, v in value.iteritems():
+      pack_into(out, k, float32)
+      pack_into(out, v, float32)
+  else:
+    raise TypeError("cannot pack %r" % type(value))
+
+# formats of the fixed size msgpack types, by first byte
+FIXED = {
+  0xca: ">f", 0xcb: ">d",
+  0xcc: ">B", 0xcd: ">H", 0xce: ">I", 0xcf: ">Q",
+  0xd0: ">b", 0xd1: ">h", 0xd2: ">i", 0xd3: ">q",
+}
+
+# --------------------------------------------------------------------------
+##
+# @brief decode msgpack bytes, strings come back as unicode and float
+#        arrays as float lists
+#
+# @param data  the bytes
+#
+# @returns   the value
+#
+# --------------------------------------------------------------------------
+def unpack(data):
+  value, offset = unpack_from(str(data), 0)
+  if offset != len(data):
+    raise ValueError("%d bytes after the value" % (len(data) - offset))
+  return value
+
+def unpack_from(data, offset):
+  b = ord(data[offset])
+  offset += 1
+  if b < 0x80:
+    return b, offset
+  if b >= 0xe0:
+    return b - 0x100, offset
+  if b <= 0x8f:
+    return unpack_map(data, offset, b & 0x0f)
+  if b <= 0x9f:
+    return unpack_list(data, offset, b & 0x0f)
+  if b <= 0xbf:
+    return unpack_str(data, offset, b & 0x1f)
+  if b == 0xc0:
+    return None, offset
+  if b in (0xc2, 0xc3):
+    return b == 0xc3, offset
+  if b in FIXED:
+    fmt = FIXED[b]
+    return struct.unpack_from(fmt, data, offset)[0],\
+        offset + struct.calcsize(fmt)
+  if b in (0xc4, 0xc5, 0xc6, 0xd9, 0xda, 0xdb):
+    fmt = ">" + "BHI"[(b - 0xc4) % 3 if b < 0xc7 else b - 0xd9]
+    n = struct.unpack_from(fmt, data, offset)[0]
+    offset += struct.calcsize(fmt)
+    if b >= 0xd9:
+      return unpack_str(data, offset, n)
+    return data[offset:offset + n], offset + n
+  if b in (0xc7, 0xc8, 0xc9):
+    fmt = ">" + "BHI"[b - 0xc7] + "b"
+    n, ext = struct.unpack_from(fmt, data, offset)
+    offset += struct.calcsize(fmt)
+    if ext not in (EXT_FLOAT64, EXT_FLOAT32):
+      raise ValueError("unknown extension type %d" % ext)
+    values = array.array("d" if ext == EXT_FLOAT64 else "f")
+    values.fromstring(data[offset:offset + n])
+    if sys.byteorder == "big":
+      values.byteswap()
+    return values.tolist(), offset + n
+  if b in (0xdc, 0xdd):
+    fmt = ">H" if b == 0xdc else ">I"
+    n = struct.unpack_from(fmt, data, offset)[0]
+    return unpack_list(data, offset + struct.calcsize(fmt), n)
+  if b in (0xde, 0xdf):
+    fmt = ">H" if b == 0xde else ">I"
+    n = struct.unpack_from(fmt, data, offset)[0]
+    return unpack_map(data, offset + struct.calcsize(fmt), n)
+  raise ValueError("unsupported msgpack type 0x%02x" % b)
+
+def unpack_str(data, offset, n):
+  return data[offset:offset + n].decode("utf-8"), offset + n
+
+def unpack_list(data, offset, n):
+  values = []
+  for i in xrange(n):
+    value, offset = unpack_from(data, offset)
+    values.append(value)
+  return values, offset
+
+def unpack_map(data, offset, n):
+  values = {}
+  for i in xrange(n):
+    key, offset = unpack_from(data, offset)
+    values[key], offset = unpack_from(data, offset)
+  return values, offset
+
+# --------------------------------------------------------------------------
+##
+# @brief  the encoding of one websocket connection
+# ----------------------------------------------------------------------------
+class Codec(object):
+  # --------------------------------------------------------------------------
+  ##
+  # @brief set up an encoding
+  #
+  # @param encoding  "json" or "msgpack"
+  # @param compress  deflate replies of COMPRESS_MIN bytes and more
+  # @param float32   send float arrays in single precision
+  #
+  # --------------------------------------------------------------------------
+  def __init__(self, encoding = "json", compress = False, float32 = False):
+    self.msgpack = encoding == "msgpack"
+    self.compress = compress
+    self.float32 = float32
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief decode a message of the client, text is json, binary messages
+  #        carry the flag byte
+  #
+  # @param message  unicode or bytearray as the websocket returned it
+  #
+  # @returns   the decoded message
+  #
+  # @throws ValueError  for a malformed message
+  #
+  # --------------------------------------------------------------------------
+  def decode(self, message):
+    if isinstance(message, unicode):
+      return json.loads(message)
+    try:
+      flags = message[0]
+      data = str(message[1:])
+      if flags & FLAG_DEFLATE:
+        data = zlib.decompress(data)
+      if flags & FLAG_MSGPACK:
+        return unpack(data)
+    except (IndexError, TypeError, struct.error, zlib.error) as e:
+      # empty, truncated or garbled
+      raise ValueError("malformed message: %s" % e)
+    return json.loads(data)
+
+  # --------------------------------------------------------------------------
+  ##
+  # @brief encode a reply
+  #
+  # @param request     name of the request
+  # @param result      result of the api
+  # @param request_id  id the client gave the request, None for none
+  #
+  # @returns   (payload, whether it goes in a binary message)
+  #
+  # --------------------------------------------------------------------------
+  def encode(self, request, result, request_id = None):
+    if not self.msgpack:
+      text = json_cache.envelope(request, result, request_id)
+      if not self.compress or len(text) < COMPRESS_MIN:
+        return text, False
+      return chr(FLAG_DEFLATE) + zlib.compress(text), True
+    if isinstance(result, json_cache.RawJson):
+      result = json.loads(result)
+    reply = {'request': request, 'result': result}
+    if request_id is not None:
+      reply['id'] = request_id
+    data = pack(reply, self.float32)
+    if self.compress and len(data) >= COMPRESS_MIN:
+      return chr(FLAG_MSGPACK | FLAG_DEFLATE) + zlib.compress(data), True
+    return chr(FLAG_MSGPACK) + data, True
+
+# --------------------------------------------------------------------------
+##
+# @brief pick the encoding of a connection from the query string of its
+#        handshake, old hixie websockets have no binary messages and stay
+#        with json text
+#
+# @param args  the query arguments, e.g. request.args
+# @param ws    the websocket
+#
+# @returns   the Codec
+#
+# --------------------------------------------------------------------------
+def negotiate(args, ws):
+  if not hasattr(ws, "OPCODE_BINARY"):
+    return Codec()
+  return Codec(args.get("encoding", "json"),
+      args.get("compress") == "deflate", args.get("floats") == "32")
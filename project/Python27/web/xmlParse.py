@@ -10,6 +10,8 @@ import xml.dom.minidom
 import xmltodict
 import json
 import sys, os, stat
+import part_index
+import dir_snapshot
 # --------------------------------------------------------------------------
 ##
 # @brief  get a file's path by its name
@@ -21,11 +23,7 @@ import sys, os, stat
 #
 # --------------------------------------------------------------------------
 def findFile(rootdir="web\\biobrick\\",key="BBa_J61008"):
-	for root,dirs,files in os.walk(rootdir):
-		for file in files:
-			a,b=os.path.splitext(file)
-			if a==key:
-				return os.path.join(root,file)
+	return part_index.find_file(key+".xml",rootdir)
 # --------------------------------------------------------------------------
 ##
 # @brief  list all the files and dirs of the path
@@ -95,18 +93,7 @@ def list_all_fileanddir(path):
 #
 # --------------------------------------------------------------------------
 def get_allfiledirs(path="biobrick"):
-    if os.path.isfile(path):
-        return {'path':path,'files':'','pathIsAFile':'true'}
-    res = []
-    dict={}
-    dict['path']=path
-    dict['files']=getAllInPath(path,res)
-    for i in xrange(len(dict['files'])):
-      dict['files'][i] = dict['files'][i].replace('/', '\\')
-    dict['path'] = dict['path'].replace('/', '\\')
-    print dict['files']
-    dict['pathIsAFile']='false'
-    return dict
+    return dir_snapshot.list_dir(path)
 # --------------------------------------------------------------------------
 ##
 # @brief  list all the files and dirs of the path